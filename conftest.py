@@ -0,0 +1,11 @@
+# conftest.py - Shared pytest setup
+import os
+
+# Keep Kivy quiet and headless, and out of pytest's command line
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+os.environ.setdefault('KIVY_NO_FILELOG', '1')
+os.environ.setdefault('KIVY_GL_BACKEND', 'mock')
+os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+# Never reach the real database from a test
+os.environ.setdefault('RIPPLE_FIREBASE_URL', 'http://127.0.0.1:9/')
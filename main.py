@@ -1,6 +1,6 @@
 from kivy.app import App
-from kivy.uix.screenmanager import ScreenManager
 from kivy.config import Config
+from kivy.clock import Clock
 
 # Configure the app before importing other modules
 Config.set('graphics', 'width', '400')
@@ -8,52 +8,70 @@ Config.set('graphics', 'height', '600')
 Config.set('graphics', 'minimum_width', '350')
 Config.set('graphics', 'minimum_height', '500')
 
-# Import your screen classes
-from screens.start import StartScreen
-from screens.signup import SignupScreen
-from screens.login import LoginScreen
-from screens.main_page import MainPage
-from screens.create_event import CreateEventScreen
-from screens.my_events import MyEventsScreen
-from screens.event_registration import EventRegistrationScreen
+from utils.app_config import AppConfig
+from utils.enhanced_screen_manager import EnhancedScreenManager
+from utils.data_manager import firebase_client, outbox
+from utils.email_sender import email_outbox
+from utils.firebase_stream import EventStreamSync
+from utils.task_runner import task_runner
+
+# Screen name -> (screen class path, screens likely to be opened from it, built ahead when idle)
+SCREENS = {
+    'start': ('screens.start.StartScreen', ['login', 'signup']),
+    'signup': ('screens.signup.SignupScreen', ['login']),
+    'login': ('screens.login.LoginScreen', ['main']),
+    'main': ('screens.main_page.MainPage', ['event_registration', 'my_events', 'create_event']),
+    'create_event': ('screens.create_event.CreateEventScreen', None),
+    'my_events': ('screens.my_events.MyEventsScreen', None),
+    'event_registration': ('screens.event_registration.EventRegistrationScreen', None),
+}
 
 class RippleApp(App):
+    event_sync = None
+    # Account signed in through the login screen, without its password
+    current_user = None
+
     def build(self):
-        # Create the screen manager
-        sm = ScreenManager()
-        
-        # Add the start screen (first screen)
-        start_screen = StartScreen(name='start')
-        sm.add_widget(start_screen)
-        
-        # Add the signup screen
-        signup_screen = SignupScreen(name='signup')
-        sm.add_widget(signup_screen)
-        
-        # Add the login screen
-        login_screen = LoginScreen(name='login')
-        sm.add_widget(login_screen)
-        
-        # Add the main page (home/events list)
-        main_page = MainPage(name='main')
-        sm.add_widget(main_page)
-        
-        # Add the create event screen
-        create_event_screen = CreateEventScreen(name='create_event')
-        sm.add_widget(create_event_screen)
+        # Create the screen manager; screens run their I/O through it
+        sm = EnhancedScreenManager()
+        sm.app = self
         
-        # Add the my events screen
-        my_events_screen = MyEventsScreen(name='my_events')
-        sm.add_widget(my_events_screen)
-        
-        # Add the event registration screen
-        event_registration_screen = EventRegistrationScreen(name='event_registration')
-        sm.add_widget(event_registration_screen)
+        # Screens are imported and built the first time they are shown
+        for name, (screen_class, next_screens) in SCREENS.items():
+            sm.register_screen(name, screen_class, next_screens)
         
         # Set the initial screen
         sm.current = 'start'  # Start with the start screen
         
         return sm
 
+    def on_start(self):
+        # Send writes queued while offline as soon as Firebase is reachable
+        if AppConfig.ENABLE_OFFLINE_MODE:
+            outbox.start()
+        # Deliver emails left queued by the last run
+        if email_outbox.pending_count():
+            email_outbox.start()
+        
+        # Listen for event changes so screens refresh from local data
+        if AppConfig.ENABLE_REALTIME_SYNC:
+            self.event_sync = EventStreamSync(firebase_client, on_update=self.on_remote_events)
+            self.event_sync.start()
+
+    def on_stop(self):
+        if self.event_sync:
+            self.event_sync.stop()
+        outbox.stop()
+        email_outbox.stop()
+        task_runner.shutdown()
+
+    def on_remote_events(self, changed, removed_ids):
+        # Called from the listener thread, so hop back to the UI thread
+        Clock.schedule_once(lambda dt: self.refresh_events_screen())
+
+    def refresh_events_screen(self):
+        if self.root and self.root.current == 'main':
+            self.root.current_screen.load_events()
+
 if __name__ == '__main__':
     RippleApp().run()
\ No newline at end of file
@@ -6,8 +6,9 @@ from kivy.uix.button import Button
 from kivy.uix.label import Label
 from kivy.metrics import dp
 from kivy.uix.popup import Popup
+from kivy.clock import Clock
 
-from utils.email_sender import send_event_email
+from utils.email_sender import queue_event_email
 from utils.storage import save_event
 
 class CreateEventScreen(Screen):
@@ -67,18 +68,28 @@ class CreateEventScreen(Screen):
             'description': description
         }
 
-        save_event(event)
+        # Save and queue the email off the UI thread
+        self.manager.run_task(self.save_and_notify, event, on_result=self.complete_submit,
+                              on_error=self.on_submit_error, loading="Creating event...")
 
-        # Optional: Send email notification
+    def save_and_notify(self, event):
+        """Save the event and queue its email; runs on a worker thread"""
+        if not save_event(event):
+            return None
+        
+        # Optional: Send email notification in the background
         recipient_email = "admin@rippleapp.com"  # Change to actual admin email
-        try:
-            success = send_event_email(title, date, recipient_email)
-            if success:
-                self.show_popup("Success", "Event created and notification sent!")
-            else:
-                self.show_popup("Success", "Event created! (Email notification failed)")
-        except:
-            self.show_popup("Success", "Event created!")
+        return bool(queue_event_email(event['title'], event['date'], recipient_email,
+                                      self.on_email_status))
+
+    def complete_submit(self, email_queued):
+        if email_queued is None:
+            self.show_popup("Error", "Could not save the event. Please try again.")
+            return
+        if email_queued:
+            self.show_popup("Success", "Event created! Sending notification...")
+        else:
+            self.show_popup("Success", "Event created! (Email notification failed)")
 
         # Clear form
         self.name_input.text = ""
@@ -88,6 +99,15 @@ class CreateEventScreen(Screen):
         self.location_input.text = ""
         self.description_input.text = ""
 
+    def on_submit_error(self, error):
+        self.show_popup("Error", f"Could not save the event: {error}")
+
+    def on_email_status(self, message_id, status, error):
+        # Called from the email worker thread
+        if status == 'failed':
+            Clock.schedule_once(lambda dt: self.show_popup(
+                "Notification", "The event email could not be sent."))
+
     def go_back(self, instance):
         self.manager.current = 'main'
 
@@ -1,4 +1,5 @@
 # screens/event_registration.py
+from kivy.app import App
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.textinput import TextInput
@@ -58,14 +59,25 @@ class EventRegistrationScreen(Screen):
             return
         
         registration = {
+            'event_id': self.event.get('id'),
             'event_title': self.event.get('title', ''),
             'event_date': self.event.get('date', ''),
             'name': name,
             'email': email,
             'phone': phone
         }
+        user = getattr(App.get_running_app(), 'current_user', None)
+        if user and user.get('id'):
+            registration['user_id'] = user['id']
         
-        save_registration(registration)
+        self.manager.run_task(save_registration, registration, on_result=self.complete_registration,
+                              on_error=lambda error: self.complete_registration(False),
+                              loading="Registering...")
+    
+    def complete_registration(self, saved):
+        if not saved:
+            self.show_popup("Error", "Could not register - you may already be registered for this event.")
+            return
         self.show_popup("Success", "Successfully registered for the event!")
         
         # Clear form
@@ -1,3 +1,4 @@
+from kivy.app import App
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.textinput import TextInput
@@ -10,8 +11,9 @@ from kivy.uix.popup import Popup
 from kivy.clock import Clock
 from kivy.graphics import Color, Rectangle, Ellipse
 from kivy.animation import Animation
+from kivy.logger import Logger
 
-from utils.storage import load_users
+from utils.storage import get_user_by_email
 
 class FloatingElement(Widget):
     def __init__(self, **kwargs):
@@ -248,10 +250,6 @@ class LoginScreen(Screen):
         # Show loading state
         self.show_loading_state(True)
 
-        # Debug: Print input values
-        print(f"DEBUG: Email input: '{email}'")
-        print(f"DEBUG: Password input: '{password}'")
-
         if not email or not password:
             self.show_loading_state(False)
             self.show_popup("Missing Information", "Please enter both email and password.")
@@ -263,63 +261,44 @@ class LoginScreen(Screen):
             self.show_popup("Invalid Email", "Please enter a valid email address.")
             return
 
-        # Debug: Try to load users
-        try:
-            users = load_users()
-            print(f"DEBUG: Raw users data: {users}")
-            print(f"DEBUG: Users type: {type(users)}")
-        except Exception as e:
-            print(f"DEBUG: Error loading users: {e}")
-            self.show_loading_state(False)
-            self.show_popup("Connection Error", f"Could not load user data: {str(e)}")
-            return
+        # Read and check the accounts off the UI thread
+        self.manager.run_task(self.find_user, email, password, on_result=self.complete_login,
+                              on_error=self.on_login_error, loading="Signing in...")
 
-        # Handle case where users is None or not a list
-        if users is None:
-            print("DEBUG: No users data found")
-            self.show_loading_state(False)
-            self.show_popup("No Accounts Found", "No user accounts found. Please sign up first.")
-            return
-        
-        if not isinstance(users, list):
-            print(f"DEBUG: Users data is not a list, it's: {type(users)}")
-            self.show_loading_state(False)
-            self.show_popup("Data Error", "Invalid user data format.")
-            return
+    def find_user(self, email, password):
+        """Account matching the credentials, or None; runs on a worker thread"""
+        # Only the account with this email is read, not the whole users file
+        user = get_user_by_email(email)
+
+        if user is None:
+            return None
+
+        if not isinstance(user, dict):
+            raise ValueError("Invalid user data format.")
 
-        # Clean and debug users
-        clean_users = [u for u in users if u and isinstance(u, dict)]
-        print(f"DEBUG: Clean users count: {len(clean_users)}")
-        
-        for i, user in enumerate(clean_users):
-            print(f"DEBUG: User {i}: {user}")
-        
-        # Try to find matching user with detailed debugging
-        matching_user = None
-        for user in clean_users:
-            user_email = user.get('email', '').lower().strip()
-            user_password = user.get('password', '').strip()
-            
-            print(f"DEBUG: Comparing '{email.lower()}' with '{user_email}'")
-            print(f"DEBUG: Comparing passwords: '{password}' with '{user_password}'")
-            
-            if user_email == email.lower() and user_password == password:
-                matching_user = user
-                break
-        
-        # Simulate a brief delay for better UX
-        Clock.schedule_once(lambda dt: self.complete_login(matching_user), 0.5)
+        if user.get('password', '').strip() == password:
+            return user
+        return None
+
+    def on_login_error(self, error):
+        Logger.warning(f"Login: Could not check the account - {error}")
+        self.show_loading_state(False)
+        if isinstance(error, ValueError):
+            self.show_popup("Data Error", str(error))
+        else:
+            self.show_popup("Connection Error", f"Could not load user data: {str(error)}")
     
     def complete_login(self, matching_user):
         self.show_loading_state(False)
         
         if matching_user:
-            print("DEBUG: Login successful!")
+            user = dict(matching_user)
+            user.pop('password', None)
+            App.get_running_app().current_user = user
             self.show_popup("Success", "Login successful! Welcome back.")
             # Redirect after showing success message
             Clock.schedule_once(lambda dt: setattr(self.manager, 'current', 'main'), 1.5)
         else:
-            print("DEBUG: Login failed - no matching user found")
             self.show_popup("Login Failed", "Incorrect email or password. Please try again.")
     
     def show_loading_state(self, loading):
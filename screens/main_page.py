@@ -1,19 +1,34 @@
 # screens/main_page.py (enhanced)
+import json
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
-from kivy.uix.scrollview import ScrollView
-from kivy.uix.gridlayout import GridLayout
 from kivy.uix.label import Label
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.metrics import dp
+from kivy.factory import Factory
+from kivy.logger import Logger
 from kivy.uix.popup import Popup
 from kivy.graphics import Color, RoundedRectangle, Line
 from kivy.uix.widget import Widget
-from utils.storage import load_events
+from utils.storage import list_events
+from utils.task_runner import task_runner
+
+EVENT_CARD_HEIGHT = dp(140)
+
+
+def event_version(event):
+    """Value that changes whenever an event does: its updated_at, or its content if it has none"""
+    return event.get('updated_at') or json.dumps(event, sort_keys=True, default=str)
+
 
 class EventCard(BoxLayout):
-    def __init__(self, event, callback, **kwargs):
-        super().__init__(orientation='vertical', size_hint_y=None, height=dp(140), **kwargs)
+    def __init__(self, event=None, callback=None, **kwargs):
+        super().__init__(orientation='vertical', size_hint_y=None, height=EVENT_CARD_HEIGHT, **kwargs)
+        self.event = None
+        self.callback = callback
         
         # Create card background
         with self.canvas.before:
@@ -37,8 +52,7 @@ class EventCard(BoxLayout):
         content_layout = BoxLayout(orientation='vertical', padding=dp(15), spacing=dp(5))
         
         # Title
-        title_label = Label(
-            text=f"[b][color=2c3e50]{event.get('title', 'No Title')}[/color][/b]",
+        title_label = self.title_label = Label(
             markup=True,
             size_hint_y=None,
             height=dp(30),
@@ -52,8 +66,7 @@ class EventCard(BoxLayout):
         # Date and location info
         info_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(20), spacing=dp(10))
         
-        date_label = Label(
-            text=f"[color=7f8c8d]📅 {event.get('date', 'N/A')}[/color]",
+        date_label = self.date_label = Label(
             markup=True,
             size_hint_x=0.5,
             font_size=14,
@@ -63,8 +76,7 @@ class EventCard(BoxLayout):
         date_label.bind(size=date_label.setter('text_size'))
         info_layout.add_widget(date_label)
         
-        location_label = Label(
-            text=f"[color=7f8c8d]📍 {event.get('location', 'N/A')}[/color]",
+        location_label = self.location_label = Label(
             markup=True,
             size_hint_x=0.5,
             font_size=14,
@@ -77,10 +89,7 @@ class EventCard(BoxLayout):
         content_layout.add_widget(info_layout)
         
         # Description preview
-        description = event.get('description', 'No Description')
-        preview = description[:80] + "..." if len(description) > 80 else description
-        desc_label = Label(
-            text=f"[color=95a5a6]{preview}[/color]",
+        desc_label = self.desc_label = Label(
             markup=True,
             size_hint_y=None,
             height=dp(35),
@@ -101,7 +110,7 @@ class EventCard(BoxLayout):
             color=(1, 1, 1, 1),
             font_size=14
         )
-        details_btn.bind(on_release=lambda x: callback(event))
+        details_btn.bind(on_release=self.show_details)
         
         with details_btn.canvas.before:
             Color(0.2, 0.6, 0.9, 1)
@@ -113,6 +122,23 @@ class EventCard(BoxLayout):
         content_layout.add_widget(details_btn)
         
         self.add_widget(content_layout)
+        
+        if event is not None:
+            self.set_event(event)
+    
+    def set_event(self, event):
+        """Show an event's details on this card"""
+        self.event = event
+        self.title_label.text = f"[b][color=2c3e50]{event.get('title', 'No Title')}[/color][/b]"
+        self.date_label.text = f"[color=7f8c8d]📅 {event.get('date', 'N/A')}[/color]"
+        self.location_label.text = f"[color=7f8c8d]📍 {event.get('location', 'N/A')}[/color]"
+        description = event.get('description', 'No Description')
+        preview = description[:80] + "..." if len(description) > 80 else description
+        self.desc_label.text = f"[color=95a5a6]{preview}[/color]"
+    
+    def show_details(self, instance):
+        if self.callback and self.event is not None:
+            self.callback(self.event)
     
     def update_graphics(self, instance, value):
         self.rect.size = self.size
@@ -121,6 +147,160 @@ class EventCard(BoxLayout):
         self.shadow.pos = (self.x + 2, self.y - 2)
         self.border.rounded_rectangle = (self.x, self.y, self.width, self.height, 10)
 
+class RecycleEventCard(RecycleDataViewBehavior, EventCard):
+    """EventCard reused by EventListView for whichever event scrolls into view"""
+    
+    # (key, version) of the row on display, so rebinding the same row is free
+    shown = None
+    
+    def refresh_view_attrs(self, rv, index, data):
+        self.callback = data.get('callback')
+        shown = (data.get('key'), data.get('version'))
+        if shown != self.shown:
+            self.shown = shown
+            self.set_event(data['event'])
+
+
+class LoadMoreRow(RecycleDataViewBehavior, Button):
+    """Last row of a paged EventListView"""
+    
+    def __init__(self, **kwargs):
+        super().__init__(
+            text="Load More Events",
+            background_normal='',
+            background_color=(0.2, 0.6, 0.9, 1),
+            color=(1, 1, 1, 1),
+            font_size=15,
+            **kwargs
+        )
+        self.callback = None
+        self.bind(on_release=lambda x: self.callback and self.callback())
+    
+    def refresh_view_attrs(self, rv, index, data):
+        self.callback = data.get('callback')
+
+
+class EmptyEventsRow(RecycleDataViewBehavior, BoxLayout):
+    """Placeholder shown when there are no events"""
+    
+    def __init__(self, **kwargs):
+        super().__init__(orientation='vertical', spacing=dp(10), **kwargs)
+        
+        empty_icon = Label(
+            text="📅",
+            font_size=48,
+            size_hint_y=None,
+            height=dp(60)
+        )
+        self.add_widget(empty_icon)
+        
+        empty_label = Label(
+            text="[b][color=7f8c8d]No events available yet[/color][/b]",
+            markup=True,
+            font_size=18,
+            size_hint_y=None,
+            height=dp(30)
+        )
+        self.add_widget(empty_label)
+        
+        empty_sublabel = Label(
+            text="[color=95a5a6]Be the first to create an event in your community![/color]",
+            markup=True,
+            font_size=14,
+            size_hint_y=None,
+            height=dp(20)
+        )
+        self.add_widget(empty_sublabel)
+    
+    def refresh_view_attrs(self, rv, index, data):
+        pass
+
+
+# Rows pick their view class by name through the Factory
+Factory.register('RecycleEventCard', cls=RecycleEventCard)
+Factory.register('LoadMoreRow', cls=LoadMoreRow)
+Factory.register('EmptyEventsRow', cls=EmptyEventsRow)
+
+
+class EventListView(RecycleView):
+    """Scrolling list of event cards that only creates widgets for the rows on screen.
+    
+    Each row is a plain dict; the view classes above are reused as the list
+    scrolls, so memory and layout cost stay flat however many events it holds.
+    """
+    
+    def __init__(self, callback=None, **kwargs):
+        super().__init__(**kwargs)
+        self.callback = callback
+        
+        layout = RecycleBoxLayout(
+            viewclass=RecycleEventCard,
+            key_viewclass='viewclass',
+            orientation='vertical',
+            default_size=(None, EVENT_CARD_HEIGHT),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+            spacing=dp(15)
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+    
+    def event_rows(self, events):
+        """Row data for a list of event records, keyed by event ID"""
+        return [{
+            'event': event,
+            'callback': self.callback,
+            'key': event.get('id') or ('', i),
+            'version': event_version(event)
+        } for i, event in enumerate(events)]
+    
+    def event_count(self):
+        return sum(1 for row in self.data if 'event' in row)
+    
+    def set_events(self, events, load_more=None):
+        """Show these events, touching only the rows that changed; returns how many did.
+        
+        load_more adds a trailing button that calls it. When the new rows have
+        the same keys in the same order as the shown ones, only the changed
+        rows are assigned, so the RecycleView re-measures just those rows and
+        rebinds the cards on screen. Any other change replaces the rows.
+        """
+        if not events:
+            rows = [{'viewclass': 'EmptyEventsRow', 'height': dp(200)}]
+        else:
+            rows = self.event_rows(events) + self._load_more_rows(load_more)
+        
+        if [self._row_key(row) for row in self.data] != [self._row_key(row) for row in rows]:
+            self.data = rows
+            return len(rows)
+        
+        changed = 0
+        for index, (shown, row) in enumerate(zip(self.data, rows)):
+            if self._row_state(shown) == self._row_state(row):
+                continue
+            # Item assignment reports a modified slice, which refresh_from_data handles
+            self.data[index] = row
+            changed += 1
+        return changed
+    
+    def append_events(self, events, load_more=None):
+        """Add a page of events after the current rows"""
+        rows = [row for row in self.data if row.get('viewclass') is None]
+        self.data = rows + self.event_rows(events) + self._load_more_rows(load_more)
+    
+    def _row_key(self, row):
+        return (row.get('viewclass'), row.get('key'))
+    
+    def _row_state(self, row):
+        # Events are compared by version rather than field by field
+        return {name: value for name, value in row.items() if name != 'event'}
+    
+    def _load_more_rows(self, load_more):
+        if not load_more:
+            return []
+        return [{'viewclass': 'LoadMoreRow', 'height': dp(45), 'callback': load_more}]
+
+
 class MainPage(Screen):
     def __init__(self, **kwargs):
         super(MainPage, self).__init__(**kwargs)
@@ -170,11 +350,13 @@ class MainPage(Screen):
         events_header.bind(size=events_header.setter('text_size'))
         scroll_container.add_widget(events_header)
         
-        self.scroll = ScrollView()
-        self.events_grid = GridLayout(cols=1, size_hint_y=None, spacing=dp(15))
-        self.events_grid.bind(minimum_height=self.events_grid.setter('height'))
-        self.scroll.add_widget(self.events_grid)
-        scroll_container.add_widget(self.scroll)
+        self.events_list = EventListView(callback=self.show_event_details)
+        self.events_list.bind(scroll_y=self.on_scroll)
+        
+        # Cursor for the next page of events, None once everything is shown
+        self.next_cursor = None
+        self.loading_more = False
+        scroll_container.add_widget(self.events_list)
         
         self.layout.add_widget(scroll_container)
 
@@ -230,45 +412,54 @@ class MainPage(Screen):
         self.load_events()
 
     def load_events(self):
-        self.events_grid.clear_widgets()
-        events = load_events()
-        
-        if not events:
-            # Enhanced empty state
-            empty_layout = BoxLayout(orientation='vertical', size_hint_y=None, height=dp(200), spacing=dp(10))
-            
-            empty_icon = Label(
-                text="📅",
-                font_size=48,
-                size_hint_y=None,
-                height=dp(60)
-            )
-            empty_layout.add_widget(empty_icon)
-            
-            empty_label = Label(
-                text="[b][color=7f8c8d]No events available yet[/color][/b]",
-                markup=True,
-                font_size=18,
-                size_hint_y=None,
-                height=dp(30)
-            )
-            empty_layout.add_widget(empty_label)
-            
-            empty_sublabel = Label(
-                text="[color=95a5a6]Be the first to create an event in your community![/color]",
-                markup=True,
-                font_size=14,
-                size_hint_y=None,
-                height=dp(20)
-            )
-            empty_layout.add_widget(empty_sublabel)
-            
-            self.events_grid.add_widget(empty_layout)
+        # A page requested for the old list is of no use to the new one
+        task_runner.cancel('main:more_events')
+        self.loading_more = False
+        self.manager.run_task(self.fetch_events, self.events_list.event_count(),
+                              on_result=self.show_events, key='main:events',
+                              loading="Loading events...")
+
+    def fetch_events(self, count=0):
+        """Pages of events until at least count are fetched; runs on a worker thread.
+        
+        Refetching as many events as are shown keeps the rows lined up, so a
+        refresh only touches the cards whose events changed.
+        """
+        events, cursor = list_events()
+        while cursor and len(events) < count:
+            page, cursor = list_events(cursor)
+            events.extend(page)
+        return events, cursor
+
+    def show_events(self, page):
+        events, self.next_cursor = page
+        self.events_list.set_events(events, self._load_more_callback())
+
+    def load_more_events(self):
+        """Fetch the next page of events and append it to the list"""
+        if not self.next_cursor or self.loading_more:
             return
+        self.loading_more = True
+        self.manager.run_task(list_events, self.next_cursor, on_result=self.append_events,
+                              on_error=self.on_load_more_error, key='main:more_events', loading=None)
+
+    def append_events(self, page):
+        events, self.next_cursor = page
+        self.loading_more = False
+        self.events_list.append_events(events, self._load_more_callback())
+
+    def on_load_more_error(self, error):
+        # Leave the button in place so the page can be requested again
+        self.loading_more = False
+        Logger.error(f"MainPage: Error loading more events - {error}")
+
+    def _load_more_callback(self):
+        return self.load_more_events if self.next_cursor else None
 
-        for event in events:
-            event_card = EventCard(event, self.show_event_details)
-            self.events_grid.add_widget(event_card)
+    def on_scroll(self, instance, scroll_y):
+        # Fetch the next page when the list is scrolled to the bottom
+        if scroll_y <= 0 and self.next_cursor:
+            self.load_more_events()
 
     def show_event_details(self, event):
         content = BoxLayout(orientation='vertical', padding=dp(20), spacing=dp(15))
@@ -1,21 +1,27 @@
 # screens/my_events.py (enhanced)
+from kivy.app import App
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.scrollview import ScrollView
-from kivy.uix.gridlayout import GridLayout
 from kivy.uix.label import Label
 from kivy.uix.widget import Widget
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.metrics import dp
 from kivy.uix.button import Button
+from kivy.factory import Factory
 from kivy.graphics import Color, RoundedRectangle
-from utils.storage import load_registrations
+from kivy.logger import Logger
+from utils.storage import get_user_registrations
+
+REGISTRATION_CARD_HEIGHT = dp(140)
 
 class EventCard(BoxLayout):
-    def __init__(self, event_data, **kwargs):
+    def __init__(self, event_data=None, **kwargs):
         super().__init__(**kwargs)
         self.orientation = 'vertical'
         self.size_hint_y = None
-        self.height = dp(140)
+        self.height = REGISTRATION_CARD_HEIGHT
         self.padding = dp(15)
         self.spacing = dp(8)
         
@@ -36,8 +42,7 @@ class EventCard(BoxLayout):
         self.bind(size=self.update_graphics, pos=self.update_graphics)
         
         # Event title
-        title_label = Label(
-            text=f"[b][color=2c3e50]{event_data.get('event_title', 'No Title')}[/color][/b]",
+        title_label = self.title_label = Label(
             markup=True,
             size_hint_y=None,
             height=dp(30),
@@ -54,8 +59,7 @@ class EventCard(BoxLayout):
         # Left column - Event info
         left_column = BoxLayout(orientation='vertical', size_hint_x=0.5)
         
-        date_label = Label(
-            text=f"[color=7f8c8d]📅 Date: [/color][color=34495e]{event_data.get('event_date', 'N/A')}[/color]",
+        date_label = self.date_label = Label(
             markup=True,
             size_hint_y=None,
             height=dp(25),
@@ -81,8 +85,7 @@ class EventCard(BoxLayout):
         # Right column - Personal info
         right_column = BoxLayout(orientation='vertical', size_hint_x=0.5)
         
-        name_label = Label(
-            text=f"[color=7f8c8d]👤 Name: [/color][color=34495e]{event_data.get('name', 'N/A')}[/color]",
+        name_label = self.name_label = Label(
             markup=True,
             size_hint_y=None,
             height=dp(20),
@@ -93,8 +96,7 @@ class EventCard(BoxLayout):
         name_label.bind(size=name_label.setter('text_size'))
         right_column.add_widget(name_label)
         
-        email_label = Label(
-            text=f"[color=7f8c8d]📧 Email: [/color][color=34495e]{event_data.get('email', 'N/A')}[/color]",
+        email_label = self.email_label = Label(
             markup=True,
             size_hint_y=None,
             height=dp(20),
@@ -105,8 +107,7 @@ class EventCard(BoxLayout):
         email_label.bind(size=email_label.setter('text_size'))
         right_column.add_widget(email_label)
         
-        phone_label = Label(
-            text=f"[color=7f8c8d]📱 Phone: [/color][color=34495e]{event_data.get('phone', 'N/A')}[/color]",
+        phone_label = self.phone_label = Label(
             markup=True,
             size_hint_y=None,
             height=dp(20),
@@ -120,6 +121,17 @@ class EventCard(BoxLayout):
         details_layout.add_widget(left_column)
         details_layout.add_widget(right_column)
         self.add_widget(details_layout)
+        
+        if event_data is not None:
+            self.set_registration(event_data)
+    
+    def set_registration(self, event_data):
+        """Show a registration's details on this card"""
+        self.title_label.text = f"[b][color=2c3e50]{event_data.get('event_title', 'No Title')}[/color][/b]"
+        self.date_label.text = f"[color=7f8c8d]📅 Date: [/color][color=34495e]{event_data.get('event_date', 'N/A')}[/color]"
+        self.name_label.text = f"[color=7f8c8d]👤 Name: [/color][color=34495e]{event_data.get('name', 'N/A')}[/color]"
+        self.email_label.text = f"[color=7f8c8d]📧 Email: [/color][color=34495e]{event_data.get('email', 'N/A')}[/color]"
+        self.phone_label.text = f"[color=7f8c8d]📱 Phone: [/color][color=34495e]{event_data.get('phone', 'N/A')}[/color]"
     
     def update_graphics(self, *args):
         self.rect.size = self.size
@@ -183,6 +195,63 @@ class EmptyStateCard(BoxLayout):
         self.rect.size = self.size
         self.rect.pos = self.pos
 
+class RecycleRegistrationCard(RecycleDataViewBehavior, EventCard):
+    """EventCard reused by RegistrationListView for whichever registration scrolls into view"""
+    
+    def refresh_view_attrs(self, rv, index, data):
+        self.set_registration(data['registration'])
+
+class EmptyRegistrationsRow(RecycleDataViewBehavior, EmptyStateCard):
+    """Placeholder shown when the user has no registrations"""
+    
+    def refresh_view_attrs(self, rv, index, data):
+        pass
+
+class RegistrationsErrorRow(RecycleDataViewBehavior, Label):
+    """Message shown in place of the list when registrations can't be loaded"""
+    
+    def __init__(self, **kwargs):
+        super().__init__(markup=True, halign='center', valign='middle', **kwargs)
+        self.bind(size=self.setter('text_size'))
+    
+    def refresh_view_attrs(self, rv, index, data):
+        self.text = f"[color=e74c3c]Error loading events: {data['message']}[/color]"
+
+# Rows pick their view class by name through the Factory
+Factory.register('RecycleRegistrationCard', cls=RecycleRegistrationCard)
+Factory.register('EmptyRegistrationsRow', cls=EmptyRegistrationsRow)
+Factory.register('RegistrationsErrorRow', cls=RegistrationsErrorRow)
+
+class RegistrationListView(RecycleView):
+    """Scrolling list of registration cards that only creates widgets for the rows on screen"""
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        
+        layout = RecycleBoxLayout(
+            viewclass=RecycleRegistrationCard,
+            key_viewclass='viewclass',
+            orientation='vertical',
+            default_size=(None, REGISTRATION_CARD_HEIGHT),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+            spacing=dp(15),
+            padding=(0, dp(10))
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+    
+    def set_registrations(self, registrations):
+        """Replace the rows with these registration records"""
+        if not registrations:
+            self.data = [{'viewclass': 'EmptyRegistrationsRow', 'height': dp(200)}]
+            return
+        self.data = [{'registration': registration} for registration in registrations]
+    
+    def show_error(self, message):
+        """Replace the rows with an error message"""
+        self.data = [{'viewclass': 'RegistrationsErrorRow', 'height': dp(50), 'message': message}]
+
 class MyEventsScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -225,12 +294,9 @@ class MyEventsScreen(Screen):
         
         self.layout.add_widget(header_layout)
 
-        # Events scroll view
-        self.scroll = ScrollView(size_hint=(1, 0.75))
-        self.events_grid = GridLayout(cols=1, size_hint_y=None, spacing=dp(15), padding=(0, dp(10)))
-        self.events_grid.bind(minimum_height=self.events_grid.setter('height'))
-        self.scroll.add_widget(self.events_grid)
-        self.layout.add_widget(self.scroll)
+        # Registrations list, recycled as it scrolls
+        self.events_list = RegistrationListView(size_hint=(1, 0.75))
+        self.layout.add_widget(self.events_list)
 
         # Back button with improved styling
         back_btn = Button(
@@ -253,30 +319,16 @@ class MyEventsScreen(Screen):
         self.load_my_events()
 
     def load_my_events(self):
-        self.events_grid.clear_widgets()
-        
-        try:
-            registrations = load_registrations()
-            
-            if not registrations:
-                # Show empty state
-                empty_card = EmptyStateCard()
-                self.events_grid.add_widget(empty_card)
-                return
-
-            # Show registered events
-            for reg in registrations:
-                event_card = EventCard(reg)
-                self.events_grid.add_widget(event_card)
-                
-        except Exception as e:
-            # Error handling
-            error_label = Label(
-                text=f"[color=e74c3c]Error loading events: {str(e)}[/color]",
-                markup=True,
-                size_hint_y=None,
-                height=dp(50),
-                halign='center',
-                valign='middle'
-            )
-            self.events_grid.add_widget(error_label)
\ No newline at end of file
+        # Only the signed-in user's registrations, looked up by user ID
+        user = getattr(App.get_running_app(), 'current_user', None)
+        if not user or not user.get('id'):
+            self.events_list.set_registrations([])
+            return
+        self.manager.run_task(get_user_registrations, user['id'],
+                              on_result=self.events_list.set_registrations,
+                              on_error=self.on_load_error, key='my_events:registrations',
+                              loading="Loading your events...")
+    
+    def on_load_error(self, error):
+        Logger.error(f"MyEvents: Error loading registrations - {error}")
+        self.events_list.show_error(str(error))
\ No newline at end of file
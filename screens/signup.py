@@ -322,39 +322,42 @@ class SignupScreen(Screen):
             self.show_popup("Weak Password", "Password must be at least 6 characters long.")
             return
 
-        # Check for existing users
-        try:
-            users = load_users() or []
-            clean_users = [u for u in users if u and isinstance(u, dict)]
+        # Check for existing users and save off the UI thread
+        self.manager.run_task(self.create_account, username, email, password,
+                              on_result=self.complete_signup, on_error=self.on_signup_error,
+                              loading="Creating account...")
 
-            if any(u.get('username', '').lower() == username.lower() for u in clean_users):
-                self.show_loading_state(False)
-                self.show_popup("Username Taken", "This username is already taken. Please choose another.")
-                return
+    def create_account(self, username, email, password):
+        """Save a new account; returns (title, message) if it was refused. Runs on a worker thread"""
+        users = load_users() or []
+        clean_users = [u for u in users if u and isinstance(u, dict)]
 
-            if any(u.get('email', '').lower() == email.lower() for u in clean_users):
-                self.show_loading_state(False)
-                self.show_popup("Email Registered", "This email is already registered. Please use a different email or sign in.")
-                return
+        if any(u.get('username', '').lower() == username.lower() for u in clean_users):
+            return ("Username Taken", "This username is already taken. Please choose another.")
 
-            # Create new user
-            user = {
-                'username': username,
-                'email': email,
-                'password': password
-            }
+        if any(u.get('email', '').lower() == email.lower() for u in clean_users):
+            return ("Email Registered", "This email is already registered. Please use a different email or sign in.")
 
-            save_user(user)
-            
-            # Simulate brief delay for better UX
-            Clock.schedule_once(lambda dt: self.complete_signup(), 0.5)
-            
-        except Exception as e:
-            self.show_loading_state(False)
-            self.show_popup("Error", f"An error occurred: {str(e)}")
+        # Create new user
+        user = {
+            'username': username,
+            'email': email,
+            'password': password
+        }
+
+        if not save_user(user):
+            return ("Error", "Could not save your account. Please try again.")
+        return None
+
+    def on_signup_error(self, error):
+        self.show_loading_state(False)
+        self.show_popup("Error", f"An error occurred: {str(error)}")
     
-    def complete_signup(self):
+    def complete_signup(self, refusal=None):
         self.show_loading_state(False)
+        if refusal:
+            self.show_popup(*refusal)
+            return
         self.show_popup("Welcome to Ripple!", "Account created successfully! Please sign in to continue.")
         # Clear form
         self.username_input.text = ""
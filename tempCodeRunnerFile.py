@@ -17,6 +17,7 @@ from screens.event_registration import EventRegistrationScreen
 from screens.my_events import MyEventsScreen
 from utils.data_manager import DataManager
 from utils.location_services import LocationService
+from utils.app_config import AppConfig
 import os
 from utils.data_manager import DataManager
 
@@ -93,44 +94,42 @@ class RippleApp(App):
                 if hasattr(main_screen, 'refresh_events'):
                     main_screen.refresh_events()
     
-    def get_events_by_location(self, radius_km=50):
+    def get_events_by_location(self, radius_km=AppConfig.DEFAULT_SEARCH_RADIUS):
         """Get events filtered by user location"""
         if not self.data_manager:
             return []
         
-        all_events = self.data_manager.get_all_events()
+        user_lat = self.user_location.get('latitude') if self.user_location else None
+        user_lon = self.user_location.get('longitude') if self.user_location else None
         
-        if not self.user_location or not all_events:
-            return all_events
+        if not (user_lat and user_lon):
+            return self.data_manager.get_all_events()
         
-        # Filter events by location
-        filtered_events = []
-        user_lat = self.user_location.get('latitude')
-        user_lon = self.user_location.get('longitude')
+        # The spatial index narrows the events down to those in nearby grid
+        # cells, so exact distances are only computed for these candidates
+        candidates = self.data_manager.get_events_near(
+            user_lat, user_lon, radius_km, include_unlocated=True
+        )
         
-        if user_lat and user_lon:
-            for event in all_events:
-                event_lat = event.get('latitude')
-                event_lon = event.get('longitude')
-                
-                if event_lat and event_lon:
-                    distance = self.location_service.calculate_distance(
-                        user_lat, user_lon, event_lat, event_lon
-                    )
-                    if distance <= radius_km:
-                        event['distance'] = round(distance, 1)
-                        filtered_events.append(event)
-                else:
-                    # Include events without location data
-                    event['distance'] = None
-                    filtered_events.append(event)
-        else:
-            filtered_events = all_events
+        located_events = []
+        unlocated_events = []
+        for event in candidates:
+            if event.get('latitude') and event.get('longitude'):
+                located_events.append(event)
+            else:
+                # Include events without location data
+                event['distance'] = None
+                unlocated_events.append(event)
         
-        # Sort by distance (events with distance first, then others)
-        filtered_events.sort(key=lambda x: (x['distance'] is None, x.get('distance', float('inf'))))
+        # Distances for all candidates in one batch, nearest first
+        filtered_events = []
+        for event, distance in self.location_service.rank_by_distance(
+                user_lat, user_lon, located_events, radius_km):
+            event['distance'] = round(distance, 1)
+            filtered_events.append(event)
         
-        return filtered_events
+        # Events with distance first, then others
+        return filtered_events + unlocated_events
     
     def get_user_events(self):
         """Get events registered by current user"""
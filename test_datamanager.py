@@ -1,11 +1,12 @@
 import json
+import sys
 import time
 from datetime import datetime, timedelta
 from utils.data_manager import DataManager
 
 class DatabaseTestSuite:
-    def __init__(self):
-        self.dm = DataManager()
+    def __init__(self, backend=None):
+        self.dm = DataManager(backend=backend)
         self.test_results = []
         self.test_users = []
         self.test_events = []
@@ -510,7 +511,9 @@ class DatabaseTestSuite:
 
 def main():
     """Main function to run the test suite"""
-    test_suite = DatabaseTestSuite()
+    # Optional backend argument: python test_datamanager.py [json|sqlite]
+    backend = sys.argv[1] if len(sys.argv) > 1 else None
+    test_suite = DatabaseTestSuite(backend=backend)
     test_suite.run_all_tests()
 
 
@@ -0,0 +1,185 @@
+# test_email_sender.py - EmailOutbox delivery against a local SMTP sink
+import socketserver
+import threading
+import time
+import pytest
+from utils.email_sender import EmailOutbox, build_event_email
+
+
+class SMTPSink:
+    """Minimal SMTP server that keeps the messages it accepts.
+
+    reject is a list of reply lines sent instead of "250" to the next MAIL
+    commands, and hang_up_after closes each session after that many messages.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = 0
+        self.reject = []
+        self.hang_up_after = None
+        self._lock = threading.Lock()
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                sink.serve(self)
+
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def serve(self, handler):
+        with self._lock:
+            self.sessions += 1
+        reply = lambda line: handler.wfile.write(line.encode('ascii') + b"\r\n")
+        reply("220 sink ready")
+        sent, recipients = 0, []
+        while True:
+            line = handler.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                reply("250 sink")
+            elif verb == 'MAIL':
+                with self._lock:
+                    rejection = self.reject.pop(0) if self.reject else None
+                reply(rejection or "250 OK")
+                recipients = []
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[1].strip(' <>'))
+                reply("250 OK")
+            elif verb == 'DATA':
+                reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    data_line = handler.rfile.readline()
+                    if data_line in (b".\r\n", b".\n", b""):
+                        break
+                    data.append(data_line)
+                with self._lock:
+                    self.messages.append((recipients, b"".join(data).decode('utf-8')))
+                reply("250 Queued")
+                sent += 1
+                if self.hang_up_after and sent >= self.hang_up_after:
+                    return
+            elif verb == 'QUIT':
+                reply("221 Bye")
+                return
+            else:
+                reply("250 OK")
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def sink():
+    sink = SMTPSink()
+    yield sink
+    sink.stop()
+
+
+def make_outbox(port, tmp_path, **kwargs):
+    return EmailOutbox(host='127.0.0.1', port=port, username=None, password=None, use_tls=False,
+                       sender_email='ripple@example.com', file_path=str(tmp_path / 'email_outbox.json'),
+                       backoff_base=0.05, backoff_max=0.1, timeout=5, **kwargs)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def queue(outbox, recipient, statuses):
+    message = build_event_email('Beach Cleanup', '2030-06-01', recipient, outbox.sender_email)
+    return outbox.enqueue(recipient, message.as_string(),
+                          lambda message_id, status, error: statuses.append((recipient, status)))
+
+
+def test_messages_share_one_smtp_session(sink, tmp_path):
+    outbox = make_outbox(sink.port, tmp_path)
+    statuses = []
+    try:
+        for i in range(3):
+            assert queue(outbox, f'user{i}@example.com', statuses)
+        assert wait_for(lambda: len(statuses) == 3)
+    finally:
+        outbox.stop()
+    assert sorted(statuses) == [(f'user{i}@example.com', 'sent') for i in range(3)]
+    assert [recipients for recipients, _ in sink.messages] == [[f'user{i}@example.com'] for i in range(3)]
+    assert 'Subject: New Event Created: Beach Cleanup' in sink.messages[0][1]
+    assert sink.sessions == 1
+    assert outbox.sessions_opened == 1
+    assert outbox.pending_count() == 0
+
+
+def test_temporary_failure_is_retried(sink, tmp_path):
+    sink.reject = ["451 Try again later"]
+    outbox = make_outbox(sink.port, tmp_path)
+    statuses = []
+    try:
+        queue(outbox, 'robin@example.com', statuses)
+        assert wait_for(lambda: ('robin@example.com', 'sent') in statuses)
+    finally:
+        outbox.stop()
+    assert statuses == [('robin@example.com', 'retrying'), ('robin@example.com', 'sent')]
+    assert len(sink.messages) == 1
+
+
+def test_message_fails_after_max_attempts(sink, tmp_path):
+    sink.reject = ["550 No such user"] * 2
+    outbox = make_outbox(sink.port, tmp_path, max_attempts=2)
+    statuses = []
+    try:
+        queue(outbox, 'nobody@example.com', statuses)
+        assert wait_for(lambda: ('nobody@example.com', 'failed') in statuses)
+    finally:
+        outbox.stop()
+    assert statuses == [('nobody@example.com', 'retrying'), ('nobody@example.com', 'failed')]
+    assert sink.messages == []
+    assert outbox.pending_count() == 0
+
+
+def test_dropped_session_is_reopened(sink, tmp_path):
+    sink.hang_up_after = 1
+    outbox = make_outbox(sink.port, tmp_path)
+    statuses = []
+    try:
+        queue(outbox, 'first@example.com', statuses)
+        assert wait_for(lambda: len(statuses) == 1)
+        queue(outbox, 'second@example.com', statuses)
+        assert wait_for(lambda: len(statuses) == 2)
+    finally:
+        outbox.stop()
+    assert [status for _, status in statuses] == ['sent', 'sent']
+    assert sink.sessions == 2
+
+
+def test_queued_mail_survives_a_restart(sink, tmp_path):
+    # Nothing listens on the discard port, so the first run can't deliver
+    offline = make_outbox(9, tmp_path, max_attempts=10)
+    statuses = []
+    try:
+        queue(offline, 'robin@example.com', statuses)
+        assert wait_for(lambda: statuses)
+    finally:
+        offline.stop()
+    assert statuses == [('robin@example.com', 'retrying')]
+
+    outbox = make_outbox(sink.port, tmp_path)
+    try:
+        assert outbox.pending_count() == 1
+        outbox.start()
+        assert wait_for(lambda: outbox.pending_count() == 0)
+    finally:
+        outbox.stop()
+    assert [recipients for recipients, _ in sink.messages] == [['robin@example.com']]
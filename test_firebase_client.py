@@ -0,0 +1,193 @@
+# test_firebase_client.py - FirebaseClient against a scripted local HTTP server
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from utils.firebase_client import CircuitBreaker, FirebaseClient, FirebaseError
+
+
+class ScriptedServer:
+    """HTTP server answering each request with the next scripted (status, body, headers)"""
+
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+        self.connections = set()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                server.answer(self)
+
+            do_PUT = do_POST = do_PATCH = do_DELETE = do_GET
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+
+    def script(self, *responses):
+        with self._lock:
+            self.responses.extend(responses)
+
+    def answer(self, handler):
+        length = int(handler.headers.get('Content-Length') or 0)
+        if length:
+            handler.rfile.read(length)
+        with self._lock:
+            self.requests.append((handler.command, handler.path))
+            self.connections.add(handler.client_address)
+            status, body, headers = (self.responses.pop(0) if self.responses
+                                     else (200, json.dumps({}), {}))
+        payload = body.encode('utf-8')
+        handler.send_response(status)
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.send_header('Content-Length', str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = ScriptedServer()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client(server):
+    client = FirebaseClient(server.url, timeout=5, backoff_base=0.01, backoff_max=0.05)
+    yield client
+    client.close()
+
+
+def test_non_json_response_is_one_failed_call(server, client):
+    server.script(*[(200, '<html>maintenance</html>', {'Content-Type': 'text/html'})] * 6)
+
+    for _ in range(6):
+        with pytest.raises(FirebaseError):
+            client.get('events')
+
+    metrics = client.get_metrics()['GET']
+    assert (metrics['calls'], metrics['failures'], metrics['retries']) == (6, 6, 0)
+    assert len(server.requests) == 6
+    # The server answered, so it is not treated as an outage
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_json_response_is_returned_and_counted(server, client):
+    server.script((200, json.dumps({'a': {'title': 'Picnic'}}), {}))
+
+    assert client.get('events') == {'a': {'title': 'Picnic'}}
+    assert server.requests == [('GET', '/events.json')]
+    metrics = client.get_metrics()['GET']
+    assert (metrics['calls'], metrics['failures']) == (1, 0)
+
+
+def test_json_null_is_returned_not_a_failure(server, client):
+    server.script((200, 'null', {}))
+
+    assert client.get('events/missing') is None
+    metrics = client.get_metrics()['GET']
+    assert (metrics['calls'], metrics['failures']) == (1, 0)
+
+
+def test_idempotent_calls_retry_transient_errors(server, client):
+    server.script((503, 'busy', {}), (429, 'slow down', {'Retry-After': '0'}),
+                  (200, json.dumps('ok'), {}))
+
+    assert client.put('events/a/title', 'Picnic') == 'ok'
+    assert len(server.requests) == 3
+    metrics = client.get_metrics()['PUT']
+    assert (metrics['calls'], metrics['failures'], metrics['retries']) == (1, 0, 2)
+
+
+def test_post_is_not_retried_after_the_server_answered(server, client):
+    server.script((503, 'busy', {}))
+
+    with pytest.raises(FirebaseError):
+        client.post('events', {'title': 'Picnic'})
+    assert len(server.requests) == 1
+
+
+def test_client_errors_are_not_retried(server, client):
+    server.script((401, json.dumps({'error': 'Permission denied'}), {}))
+
+    with pytest.raises(FirebaseError):
+        client.get('events')
+    assert len(server.requests) == 1
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_opens_on_outage_and_probes_after_reset(server):
+    client = FirebaseClient(server.url, timeout=5, max_retries=0,
+                            failure_threshold=2, reset_timeout=0.2)
+    try:
+        server.script((503, 'down', {}), (503, 'down', {}))
+        with pytest.raises(FirebaseError):
+            client.get('events')
+        with pytest.raises(FirebaseError):
+            client.get('events')
+        assert client.breaker.state == CircuitBreaker.OPEN
+
+        # Refused without touching the network
+        with pytest.raises(FirebaseError):
+            client.get('events')
+        assert len(server.requests) == 2
+        assert client.get_metrics()['GET']['rejected'] == 1
+
+        # One probe after the timeout; a failed probe reopens the circuit
+        time.sleep(0.25)
+        assert client.breaker.state == CircuitBreaker.HALF_OPEN
+        server.script((503, 'down', {}))
+        with pytest.raises(FirebaseError):
+            client.get('events')
+        assert client.breaker.state == CircuitBreaker.OPEN
+        assert len(server.requests) == 3
+
+        time.sleep(0.25)
+        assert client.get('events') == {}
+        assert client.breaker.state == CircuitBreaker.CLOSED
+    finally:
+        client.close()
+
+
+def test_unreachable_server_opens_the_breaker():
+    client = FirebaseClient('http://127.0.0.1:9/', timeout=1, max_retries=1,
+                            backoff_base=0.01, failure_threshold=1, reset_timeout=30)
+    try:
+        with pytest.raises(FirebaseError):
+            client.get('events')
+        assert client.breaker.state == CircuitBreaker.OPEN
+        started = time.perf_counter()
+        with pytest.raises(FirebaseError):
+            client.get('events')
+        assert time.perf_counter() - started < 0.05
+        metrics = client.get_metrics()['GET']
+        assert (metrics['calls'], metrics['retries'], metrics['rejected']) == (2, 1, 1)
+    finally:
+        client.close()
+
+
+def test_calls_reuse_one_pooled_connection(server, client):
+    for i in range(5):
+        client.put(f'events/e{i}', {'title': f'Event {i}'})
+    client.get('events')
+
+    assert len(server.requests) == 6
+    assert len(server.connections) == 1
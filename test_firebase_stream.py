@@ -0,0 +1,229 @@
+# test_firebase_stream.py - Realtime event sync tests
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from utils import storage
+from utils.firebase_client import FirebaseClient
+from utils.firebase_emulator import FirebaseEmulator
+from utils.firebase_stream import EventStreamSync, FirebaseStream
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(storage, 'STORAGE_MODE', 'json')
+    storage.clear_cache()
+    storage._stores.clear()
+    yield
+    storage.clear_cache()
+    storage._stores.clear()
+
+
+def remote_event(event_id, updated_at, title):
+    return {'id': event_id, 'title': title, 'date': '2030-01-01', 'updated_at': updated_at,
+            'created_at': '2030-01-01T00:00:00', 'is_active': True}
+
+
+def test_stream_merge_keeps_newer_local_events(local_storage):
+    sync = EventStreamSync(FirebaseClient('http://127.0.0.1:9/'))
+    sync.apply('put', '/', {'a': remote_event('a', '2030-01-02T00:00:00', 'first')})
+    assert storage.get_event_by_id('a')['title'] == 'first'
+
+    # An older copy, e.g. replayed when the stream reconnects, is ignored
+    assert sync.apply('put', '/a', remote_event('a', '2030-01-01T00:00:00', 'older')) == 0
+    assert storage.get_event_by_id('a')['title'] == 'first'
+
+    assert sync.apply('patch', '/a', {'title': 'newer', 'updated_at': '2030-01-03T00:00:00'}) == 1
+    assert storage.get_event_by_id('a')['title'] == 'newer'
+
+    assert sync.apply('put', '/a', None) == 1
+    assert storage.get_event_by_id('a') is None
+
+
+def test_first_snapshot_drops_events_deleted_while_closed(local_storage):
+    sync = EventStreamSync(FirebaseClient('http://127.0.0.1:9/'))
+    sync.apply('put', '/', {'a': remote_event('a', '2030-01-02T00:00:00', 'kept'),
+                            'b': remote_event('b', '2030-01-02T00:00:00', 'deleted')})
+    # Created here and not yet sent, so never seen on the stream
+    assert storage.save_event(remote_event('c', '2030-01-02T00:00:00', 'local'))
+
+    # The app restarts after b was deleted remotely
+    sync = EventStreamSync(FirebaseClient('http://127.0.0.1:9/'))
+    assert sync.apply('put', '/', {'a': remote_event('a', '2030-01-02T00:00:00', 'kept')}) == 1
+    assert storage.get_event_by_id('a')['title'] == 'kept'
+    assert storage.get_event_by_id('b') is None
+    assert storage.get_event_by_id('c')['title'] == 'local'
+
+    # Later snapshots are compared with the mirror as before
+    assert sync.apply('put', '/', {}) == 1
+    assert storage.get_event_by_id('a') is None
+    assert storage.get_event_by_id('c')['title'] == 'local'
+
+
+class GzipStreamHandler(BaseHTTPRequestHandler):
+    """Sends one put event, gzipped whenever the client allows it, as servers may"""
+    protocol_version = 'HTTP/1.1'
+    body = b'event: put\ndata: {"path": "/", "data": {"a": 1}}\n\n'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = self.body
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SilentStreamHandler(BaseHTTPRequestHandler):
+    """Sends one put event on a kept-alive chunked stream, then nothing for a minute"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        body = b'event: put\ndata: {"path": "/", "data": null}\n\n'
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(body), body))
+        self.wfile.flush()
+        time.sleep(60)
+
+
+def test_stream_asks_for_an_uncompressed_body():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), GzipStreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    received = []
+    arrived = threading.Event()
+
+    def on_change(event, path, data):
+        received.append((event, path, data))
+        arrived.set()
+
+    client = FirebaseClient(f"http://127.0.0.1:{server.server_address[1]}/")
+    stream = FirebaseStream(client, 'events', on_change)
+    try:
+        stream.start()
+        assert arrived.wait(5)
+    finally:
+        stream.stop()
+        server.shutdown()
+        server.server_close()
+        client.close()
+    assert received[0] == ('put', '/', {'a': 1})
+
+
+def test_stop_does_not_wait_for_the_next_keep_alive():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SilentStreamHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    connected = threading.Event()
+    client = FirebaseClient(f"http://127.0.0.1:{server.server_address[1]}/")
+    stream = FirebaseStream(client, 'events', lambda *args: connected.set())
+    try:
+        stream.start()
+        assert connected.wait(5)
+        started = time.monotonic()
+        stream.stop()
+        assert time.monotonic() - started < 1
+        assert not stream.is_running()
+    finally:
+        server.shutdown()
+        server.server_close()
+        client.close()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def test_stream_sync_follows_the_emulator(local_storage):
+    emulator = FirebaseEmulator(data={'events': {'a': remote_event('a', '2030-01-01T00:00:00', 'Picnic')}})
+    emulator.start()
+    client = FirebaseClient(emulator.url)
+    updates = []
+    sync = EventStreamSync(client, on_update=lambda changed, removed: updates.append(removed))
+    try:
+        sync.start()
+        assert wait_for(lambda: storage.get_event_by_id('a') is not None)
+        assert sync.stream.connected
+
+        emulator.set('events/b', remote_event('b', '2030-01-02T00:00:00', 'Hike'))
+        assert wait_for(lambda: storage.get_event_by_id('b') is not None)
+
+        # Writes from another client arrive as deltas below the listened path
+        client.patch('events/a', {'title': 'Beach Picnic', 'updated_at': '2030-01-03T00:00:00'})
+        assert wait_for(lambda: storage.get_event_by_id('a')['title'] == 'Beach Picnic')
+
+        client.delete('events/b')
+        assert wait_for(lambda: storage.get_event_by_id('b') is None)
+        assert updates[-1] == ['b']
+    finally:
+        sync.stop()
+        emulator.stop()
+        client.close()
+    assert not sync.stream.is_running()
+
+
+def test_stream_reconnects_after_the_server_drops(local_storage):
+    emulator = FirebaseEmulator().start()
+    client = FirebaseClient(emulator.url)
+    sync = EventStreamSync(client)
+    sync.stream.backoff_base = 0.05
+    sync.stream.backoff_max = 0.1
+    try:
+        emulator.fail_next(2)
+        sync.start()
+        emulator.set('events/a', remote_event('a', '2030-01-01T00:00:00', 'Picnic'))
+        assert wait_for(lambda: storage.get_event_by_id('a') is not None)
+        assert emulator.request_count >= 3
+    finally:
+        sync.stop()
+        emulator.stop()
+        client.close()
+
+
+def test_stream_reconnects_after_a_broken_read():
+    class BrokenStreamHandler(SilentStreamHandler):
+        def do_GET(self):
+            # A chunk header promising more than is sent, then a hang-up
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            self.wfile.write(b"ff\r\nevent: put\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), BrokenStreamHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = FirebaseClient(f"http://127.0.0.1:{server.server_address[1]}/")
+    stream = FirebaseStream(client, 'events', lambda *args: None, backoff_base=0.01, backoff_max=0.02)
+    attempts = []
+    listen = stream._listen
+    stream._listen = lambda: attempts.append(1) or listen()
+    try:
+        stream.start()
+        assert wait_for(lambda: len(attempts) >= 3)
+        assert stream.is_running()
+    finally:
+        stream.stop()
+        server.shutdown()
+        server.server_close()
+        client.close()
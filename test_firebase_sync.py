@@ -0,0 +1,322 @@
+# test_firebase_sync.py - DataManager against the Firebase emulator
+from concurrent.futures import wait
+import threading
+import time
+import pytest
+from utils import data_manager
+from utils.app_config import AppConfig
+from utils.data_manager import DataManager
+from utils.firebase_client import SERVER_TIMESTAMP, FirebaseClient
+from utils.firebase_emulator import FirebaseEmulator
+from utils.outbox import Outbox
+
+# Nothing listens on the discard port, so every call fails at once
+OFFLINE_URL = 'http://127.0.0.1:9/'
+
+
+def remote_event(event_id, **fields):
+    event = {
+        'id': event_id,
+        'title': f'Event {event_id}',
+        'description': '',
+        'date': '2030-01-01',
+        'time': '10:00',
+        'location': 'Town Hall',
+        'category': 'Community',
+        'max_participants': 10,
+        'current_participants': 0,
+        'creator_id': 'creator-1',
+        'creator_name': 'Casey',
+        'created_at': '2030-01-01T00:00:00',
+        'updated_at': '2030-01-01T00:00:00',
+        'is_active': True
+    }
+    event.update(fields)
+    return event
+
+
+@pytest.fixture
+def emulator():
+    emulator = FirebaseEmulator().start()
+    yield emulator
+    emulator.stop()
+
+
+@pytest.fixture
+def online(emulator, monkeypatch):
+    client = FirebaseClient(emulator.url, max_retries=0)
+    monkeypatch.setattr(data_manager, 'firebase_client', client)
+    yield client
+    client.close()
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    client = FirebaseClient(OFFLINE_URL, timeout=1, max_retries=0)
+    monkeypatch.setattr(data_manager, 'firebase_client', client)
+    yield client
+    client.close()
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def manager(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data').mkdir()
+    manager = DataManager(backend=request.param)
+    yield manager
+    # Let background syncs and refreshes finish before the directory goes away
+    wait_for_background(manager)
+    if manager.db:
+        manager.db.close()
+
+
+@pytest.fixture
+def remote_outbox(online, tmp_path, monkeypatch):
+    outbox = Outbox(online, file_path=str(tmp_path / 'outbox.json'))
+    monkeypatch.setattr(data_manager, 'outbox', outbox)
+    return outbox
+
+
+def wait_for_background(manager):
+    tasks = list(manager._refresh_tasks.values()) + [manager._sync_task]
+    wait([task.future for task in tasks if task], timeout=10)
+
+
+def seed_local(manager, *events):
+    assert manager.merge_events([dict(event) for event in events]) == len(events)
+
+
+SEEDED = [
+    remote_event('a', category='Music', creator_id='u1', date='2030-03-01'),
+    remote_event('b', category='Sports', creator_id='u2', date='2030-04-01'),
+    remote_event('c', category='Music', creator_id='u2', date='2030-05-01'),
+    remote_event('d', category='Music', creator_id='u1', date='2030-04-15', is_active=False),
+]
+
+
+def test_queries_refresh_just_their_events_from_firebase(manager, emulator, online):
+    emulator.set('events', {event['id']: event for event in SEEDED})
+    # Keep the full sync out of the way
+    manager._last_sync = time.monotonic()
+
+    # Served from local storage, which has nothing yet
+    assert manager.get_events_by_category('Music') == []
+    wait_for_background(manager)
+    assert sorted(e['id'] for e in manager.get_events_by_category('Music')) == ['a', 'c']
+    assert manager.get_event_keys() == ['a', 'c']
+
+    manager.get_events_by_creator('u2')
+    manager.get_events_in_date_range('2030-04-01', '2030-05-01')
+    wait_for_background(manager)
+    assert sorted(e['id'] for e in manager.get_events_by_creator('u2')) == ['b', 'c']
+    assert sorted(e['id'] for e in manager.get_events_in_date_range('2030-04-01', '2030-05-01')) == ['b', 'c']
+
+
+def test_queries_fall_back_to_local_events(manager, offline):
+    seed_local(manager, *SEEDED)
+
+    assert sorted(e['id'] for e in manager.get_events_by_category('Music')) == ['a', 'c']
+    assert sorted(e['id'] for e in manager.get_events_by_creator('u2')) == ['b', 'c']
+    assert sorted(e['id'] for e in manager.get_events_in_date_range('2030-04-01', '2030-05-01')) == ['b', 'c']
+    assert manager.get_event_keys() == ['a', 'b', 'c']
+
+
+@pytest.mark.parametrize('connection', ['online', 'offline'])
+def test_events_page_walks_every_event_once(manager, emulator, connection, request):
+    events = [remote_event(f'e{i:02d}') for i in range(7)]
+    if connection == 'online':
+        emulator.set('events', {event['id']: event for event in events})
+    else:
+        seed_local(manager, *events)
+    request.getfixturevalue(connection)
+    # Online, only the pages are fetched
+    manager._last_sync = time.monotonic()
+
+    seen, start_after = [], None
+    while True:
+        manager.get_events_page(start_after, limit=3)
+        wait_for_background(manager)
+        page, start_after = manager.get_events_page(start_after, limit=3)
+        assert len(page) <= 3
+        seen.extend(event['id'] for event in page)
+        if start_after is None:
+            break
+    assert seen == [event['id'] for event in events]
+
+
+def new_event(manager, max_participants=10):
+    return manager.create_event({
+        'title': 'Beach Cleanup',
+        'description': 'Bring gloves',
+        'date': '2030-06-01',
+        'time': '10:00',
+        'location': 'North Beach',
+        'max_participants': max_participants,
+        'creator_id': 'creator-1',
+        'creator_name': 'Casey'
+    })
+
+
+def test_writes_reach_firebase_through_the_outbox(manager, emulator, remote_outbox):
+    event = new_event(manager)
+    assert remote_outbox.pending_count() == 1
+    assert remote_outbox.flush() == 1
+    remote = emulator.get(f"events/{event['id']}")
+    created_stamp = remote.pop('server_updated_at')
+    assert isinstance(created_stamp, int)
+    assert remote == event
+
+    assert manager.update_event(event['id'], {'title': 'Dune Cleanup', 'unknown': 1})
+    registration = manager.register_for_event({
+        'user_id': 'user-1', 'event_id': event['id'],
+        'name': 'Robin', 'email': 'robin@example.com', 'phone': ''
+    })
+    assert registration is not None
+    remote_outbox.flush()
+    remote = emulator.get(f"events/{event['id']}")
+    assert remote['title'] == 'Dune Cleanup'
+    assert 'unknown' not in remote
+    assert remote['current_participants'] == 1
+    assert remote['updated_at'] == manager.get_event_by_id(event['id'])['updated_at']
+    assert remote['server_updated_at'] > created_stamp
+    assert emulator.get(f"registrations/{registration['id']}") == registration
+
+    assert manager.cancel_registration('user-1', event['id'])
+    assert manager.cancel_event(event['id'])
+    remote_outbox.flush()
+    remote = emulator.get(f"events/{event['id']}")
+    assert remote['is_active'] is False
+    assert remote['current_participants'] == 0
+    assert emulator.get('registrations') is None
+    assert remote_outbox.pending_count() == 0
+
+
+def test_writes_wait_in_the_outbox_while_firebase_is_down(manager, emulator, remote_outbox):
+    event = new_event(manager)
+    manager.update_event(event['id'], {'title': 'Dune Cleanup'})
+
+    emulator.fail_next(1)
+    assert remote_outbox.flush() == 0
+    assert remote_outbox.pending_count() == 1
+    assert emulator.get('events') is None
+
+    # The field update was folded into the queued event
+    assert remote_outbox.flush() == 1
+    assert emulator.get(f"events/{event['id']}")['title'] == 'Dune Cleanup'
+
+
+def test_merge_keeps_the_newer_copy(manager):
+    seed_local(manager,
+               remote_event('older', updated_at='2030-01-01T00:00:00', title='local'),
+               remote_event('same', updated_at='2030-01-02T00:00:00', title='local'),
+               remote_event('newer', updated_at='2030-01-03T00:00:00', title='local'))
+
+    changed = manager.merge_events([
+        remote_event('older', updated_at='2030-01-02T00:00:00', title='remote'),
+        remote_event('same', updated_at='2030-01-02T00:00:00', title='remote'),
+        remote_event('newer', updated_at='2030-01-02T00:00:00', title='remote'),
+        remote_event('added', title='remote'),
+    ])
+
+    assert changed == 2
+    titles = {event['id']: event['title'] for event in manager.get_all_events()}
+    assert titles == {'older': 'remote', 'same': 'local', 'newer': 'local', 'added': 'remote'}
+
+
+def test_is_newer_or_same():
+    manager = DataManager.__new__(DataManager)
+    stamp = {'updated_at': '2030-01-02T00:00:00'}
+    assert manager._is_newer_or_same(stamp, {'updated_at': '2030-01-01T00:00:00'})
+    assert manager._is_newer_or_same(stamp, dict(stamp))
+    assert not manager._is_newer_or_same(stamp, {'updated_at': '2030-01-03T00:00:00'})
+    # A remote copy without a timestamp never wins, one without a local timestamp always does
+    assert manager._is_newer_or_same(stamp, {})
+    assert not manager._is_newer_or_same({}, stamp)
+
+
+def test_get_all_events_pulls_remote_changes(manager, emulator, online):
+    emulator.set('events', {'a': remote_event('a', server_updated_at=SERVER_TIMESTAMP)})
+
+    manager.get_all_events()
+    wait([manager._sync_task.future], timeout=10)
+    assert [event['id'] for event in manager.get_all_events()] == ['a']
+    assert manager.load_sync_state() == {'events': emulator.get('events/a/server_updated_at')}
+
+    # Later syncs ask only for events Firebase stamped since the watermark
+    emulator.set('events/b', remote_event('b', server_updated_at=SERVER_TIMESTAMP))
+    emulator.set('events/a/title', 'unstamped edit')
+    assert manager.sync_events() == 1
+    events = {event['id']: event for event in manager.get_all_events()}
+    assert sorted(events) == ['a', 'b']
+    assert events['a']['title'] == 'Event a'
+    assert manager.load_sync_state() == {'events': emulator.get('events/b/server_updated_at')}
+
+
+def test_sync_keeps_edits_from_devices_with_slow_clocks(manager, emulator, online):
+    emulator.set('events/a', remote_event('a', updated_at='2030-01-05T00:00:00',
+                                          server_updated_at=SERVER_TIMESTAMP))
+    assert manager.sync_events() == 1
+
+    # Written later by a device whose clock runs a day behind
+    emulator.set('events/b', remote_event('b', updated_at='2030-01-04T00:00:00',
+                                          server_updated_at=SERVER_TIMESTAMP))
+    assert manager.sync_events() == 1
+    assert sorted(event['id'] for event in manager.get_all_events()) == ['a', 'b']
+
+
+def test_direct_writes_are_stamped_by_the_server(manager, emulator, online, monkeypatch):
+    monkeypatch.setattr(AppConfig, 'ENABLE_OFFLINE_MODE', False)
+    event = new_event(manager)
+    created_stamp = emulator.get(f"events/{event['id']}/server_updated_at")
+
+    assert manager.update_event(event['id'], {'title': 'Dune Cleanup'})
+    remote = emulator.get(f"events/{event['id']}")
+    assert remote['title'] == 'Dune Cleanup'
+    assert remote['server_updated_at'] > created_stamp
+
+
+def test_events_cache_expires_only_on_the_sqlite_backend(manager, monkeypatch):
+    new_event(manager)
+    monkeypatch.setattr(AppConfig, 'CACHE_EXPIRY_TIME', 0)
+    manager.get_all_events()
+    assert len(manager.get_all_events()) == 1
+
+    stats = manager.get_cache_stats()
+    # The expired list is reloaded on a thread; let it finish before the database closes
+    for thread in threading.enumerate():
+        if thread.name == 'events-cache-refresh':
+            thread.join(timeout=10)
+    if manager.backend == 'sqlite':
+        assert (stats['hits'], stats['stale']) == (0, 1)
+    else:
+        # The events file's signature tells when the cached list is out of date
+        assert (stats['hits'], stats['stale']) == (1, 0)
+
+
+def test_background_merge_waits_for_an_open_transaction(manager):
+    seed_local(manager, remote_event('a'))
+    merged = []
+    with manager.transaction():
+        manager.update_event('a', {'title': 'Local'})
+        thread = threading.Thread(target=lambda: merged.append(manager.merge_events([remote_event('b')])))
+        thread.start()
+        thread.join(timeout=0.5)
+        # The merge neither joins the transaction nor writes around it
+        assert thread.is_alive()
+    thread.join(timeout=10)
+
+    assert merged == [1]
+    titles = {event['id']: event['title'] for event in manager.get_all_events()}
+    assert titles == {'a': 'Local', 'b': 'Event b'}
+
+
+def test_concurrent_writes_keep_every_update(manager):
+    seed_local(manager, remote_event('a', max_participants=100))
+    threads = [threading.Thread(target=manager.update_event_participants, args=('a', 1))
+               for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert manager.get_event_by_id('a')['current_participants'] == 20
@@ -0,0 +1,121 @@
+# test_indexes.py - GeoGridIndex and DataManager.get_events_near radius queries
+from concurrent.futures import wait
+import math
+import random
+import pytest
+from utils import data_manager
+from utils.data_manager import DataManager
+from utils.firebase_client import FirebaseClient
+from utils.indexes import EARTH_RADIUS_KM, GeoGridIndex, bounding_box
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+def place(event_id, latitude, longitude, **fields):
+    return {'id': event_id, 'latitude': latitude, 'longitude': longitude, **fields}
+
+
+def ids(records):
+    return sorted(record['id'] for record in records)
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def manager(request, tmp_path, monkeypatch):
+    # Background syncs fail at once instead of retrying the unreachable default URL
+    monkeypatch.setattr(data_manager, 'firebase_client',
+                        FirebaseClient('http://127.0.0.1:9/', timeout=1, max_retries=0))
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data').mkdir()
+    manager = DataManager(backend=request.param)
+    yield manager
+    # Let a background sync finish before the directory goes away
+    if manager._sync_task:
+        wait([manager._sync_task.future], timeout=10)
+    if manager.db:
+        manager.db.close()
+
+
+def test_nearby_returns_the_cells_around_the_circle():
+    index = GeoGridIndex([place('near', 51.51, -0.13), place('town', 51.75, -1.25),
+                          place('far', 48.86, 2.35), {'id': 'nowhere'}])
+
+    assert ids(index.nearby(51.5074, -0.1278, 5)) == ['near']
+    assert ids(index.nearby(51.5074, -0.1278, 100)) == ['near', 'town']
+    assert ids(index.nearby(51.5074, -0.1278, 400)) == ['far', 'near', 'town']
+    assert ids(index.unlocated.values()) == ['nowhere']
+
+
+def test_points_on_cell_boundaries_are_found_from_either_side():
+    # 0.5 degree cells, so these sit exactly on cell edges and corners
+    index = GeoGridIndex([place('edge', 51.0, 1.5), place('corner', 51.5, 2.0)], cell_degrees=0.5)
+
+    for latitude, longitude in [(50.99, 1.49), (51.01, 1.51), (51.49, 1.99), (51.51, 2.01)]:
+        assert 'edge' in ids(index.nearby(latitude, longitude, 60))
+        assert 'corner' in ids(index.nearby(latitude, longitude, 60))
+
+
+def test_nearby_wraps_across_the_antimeridian():
+    index = GeoGridIndex([place('east', -17.8, 179.9), place('west', -17.8, -179.9),
+                          place('date-line', -17.8, 180.0), place('far', -17.8, 170.0)])
+
+    # About 20 km apart across the date line, in either direction
+    assert ids(index.nearby(-17.8, 179.95, 30)) == ['date-line', 'east', 'west']
+    assert ids(index.nearby(-17.8, -179.95, 30)) == ['date-line', 'east', 'west']
+    assert ids(index.nearby(-17.8, -180.0, 30)) == ['date-line', 'east', 'west']
+
+
+def test_nearby_covers_every_longitude_around_a_pole():
+    index = GeoGridIndex([place('a', 89.9, 10.0), place('b', 89.9, -170.0),
+                          place('pole', 90.0, 45.0), place('south', -89.9, 10.0)])
+
+    # The circle contains the north pole, so the far side of it is close
+    assert ids(index.nearby(89.9, 10.0, 30)) == ['a', 'b', 'pole']
+    assert ids(index.nearby(90.0, 45.0, 30)) == ['a', 'b', 'pole']
+    assert ids(index.nearby(-90.0, 0.1, 30)) == ['south']
+    lat_min, lat_max, lon_ranges = bounding_box(89.9, 10.0, 30)
+    assert (lat_max, lon_ranges) == (90.0, [(-180.0, 180.0)])
+
+
+def test_nearby_never_misses_a_point_inside_the_radius():
+    rnd = random.Random(7)
+    for _ in range(300):
+        latitude = rnd.choice([rnd.uniform(-90, 90), rnd.uniform(80, 90), rnd.uniform(-90, -80)])
+        longitude = rnd.choice([rnd.uniform(-180, 180), rnd.uniform(170, 180), rnd.uniform(-180, -170)])
+        radius = rnd.choice([1, 25, 200, 1500])
+        points = [place(str(i), max(-90.0, min(90.0, latitude + rnd.uniform(-1, 1) * radius / 90)),
+                        (longitude + rnd.uniform(-30, 30) + 180) % 360 - 180)
+                  for i in range(40)]
+        index = GeoGridIndex(points)
+
+        found = set(ids(index.nearby(latitude, longitude, radius)))
+        inside = {point['id'] for point in points
+                  if distance_km(latitude, longitude, point['latitude'], point['longitude']) <= radius}
+        assert inside <= found, (latitude, longitude, radius)
+
+
+def test_nearby_follows_changes():
+    index = GeoGridIndex([place('a', 51.5, -0.1)], where=lambda record: record.get('is_active', True))
+
+    index.apply(changed=[place('a', 48.86, 2.35)])
+    assert ids(index.nearby(51.5, -0.1, 10)) == []
+    assert ids(index.nearby(48.86, 2.35, 10)) == ['a']
+
+    index.apply(changed=[place('a', 48.86, 2.35, is_active=False)])
+    assert ids(index.nearby(48.86, 2.35, 10)) == []
+
+
+def test_events_near_across_the_antimeridian_and_a_pole(manager):
+    events = [place('fiji-east', -17.8, 179.9), place('fiji-west', -17.8, -179.9),
+              place('arctic', 89.9, -170.0), place('london', 51.51, -0.13),
+              place('closed', -17.8, 179.95, is_active=False), place('nowhere', None, None)]
+    assert manager.merge_events([dict(event, updated_at='2030-01-01T00:00:00') for event in events]) == 6
+
+    assert ids(manager.get_events_near(-17.8, 179.95, 30)) == ['fiji-east', 'fiji-west']
+    assert ids(manager.get_events_near(-17.8, -179.95, 30)) == ['fiji-east', 'fiji-west']
+    assert ids(manager.get_events_near(89.9, 10.0, 30)) == ['arctic']
+    assert ids(manager.get_events_near(51.5074, -0.1278, 5)) == ['london']
+    assert ids(manager.get_events_near(51.5074, -0.1278, 5, include_unlocated=True)) == ['london', 'nowhere']
@@ -0,0 +1,61 @@
+# test_location_services.py - Distance ranking, with and without NumPy
+import math
+import pytest
+from utils import location_services
+from utils.location_services import LocationService
+
+LONDON = (51.5074, -0.1278)
+PARIS = (48.8566, 2.3522)
+BERLIN = (52.5200, 13.4050)
+
+
+@pytest.fixture(params=['python', 'numpy'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    monkeypatch.setattr(location_services, 'NUMPY_AVAILABLE', request.param == 'numpy')
+    return request.param
+
+
+def place(event_id, coordinates):
+    latitude, longitude = coordinates
+    return {'id': event_id, 'latitude': latitude, 'longitude': longitude}
+
+
+def test_distances_match_the_scalar_haversine(backend):
+    distances = LocationService.calculate_distances(*LONDON, [PARIS[0], BERLIN[0]], [PARIS[1], BERLIN[1]])
+
+    assert distances == pytest.approx([LocationService.calculate_distance(*LONDON, *PARIS),
+                                       LocationService.calculate_distance(*LONDON, *BERLIN)])
+    assert distances[0] == pytest.approx(343.5, abs=1)
+
+
+def test_invalid_coordinates_are_infinitely_far(backend):
+    latitudes = [None, 0, 'north', float('nan'), {}, str(PARIS[0])]
+    longitudes = [PARIS[1]] * 5 + [str(PARIS[1])]
+
+    distances = LocationService.calculate_distances(*LONDON, latitudes, longitudes)
+
+    assert distances[:5] == [math.inf] * 5
+    assert distances[5] == pytest.approx(343.5, abs=1)
+    assert LocationService.calculate_distances(None, LONDON[1], [PARIS[0]], [PARIS[1]]) == [math.inf]
+
+
+def test_rank_by_distance_orders_nearest_first(backend):
+    events = [place('berlin', BERLIN), place('nowhere', (None, None)),
+              place('paris', PARIS), place('also-paris', PARIS), place('bad', ('x', 'y'))]
+
+    ranked = LocationService.rank_by_distance(*LONDON, events)
+
+    # Ties keep their order, and events without usable coordinates go last
+    assert [event['id'] for event, _ in ranked] == ['paris', 'also-paris', 'berlin', 'nowhere', 'bad']
+    assert [distance for _, distance in ranked][-2:] == [math.inf, math.inf]
+
+
+def test_rank_by_distance_drops_events_outside_the_radius(backend):
+    events = [place('berlin', BERLIN), place('paris', PARIS), place('nowhere', (None, None))]
+
+    ranked = LocationService.rank_by_distance(*LONDON, events, radius_km=500)
+
+    assert [event['id'] for event, _ in ranked] == ['paris']
+    assert ranked[0][1] == pytest.approx(343.5, abs=1)
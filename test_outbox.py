@@ -0,0 +1,88 @@
+# test_outbox.py - Offline write queue against the Firebase emulator
+import time
+import pytest
+from utils.firebase_client import FirebaseClient
+from utils.firebase_emulator import FirebaseEmulator
+from utils.outbox import Outbox
+
+
+@pytest.fixture
+def emulator():
+    emulator = FirebaseEmulator().start()
+    yield emulator
+    emulator.stop()
+
+
+@pytest.fixture
+def client(emulator):
+    client = FirebaseClient(emulator.url, max_retries=0)
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def outbox(client, tmp_path):
+    return Outbox(client, file_path=str(tmp_path / 'outbox.json'), flush_interval=0.1)
+
+
+def test_writes_are_coalesced_before_sending(outbox, emulator):
+    outbox.enqueue('events/a', {'title': 'Picnic', 'is_active': True})
+    outbox.enqueue('events/a/title', 'Beach Picnic')
+    outbox.enqueue('events/b/title', 'Hike')
+    outbox.enqueue('events/b', {'title': 'Long Hike'})
+    assert outbox.pending_count() == 2
+
+    assert outbox.flush() == 2
+    assert emulator.request_count == 1
+    assert emulator.get('events') == {
+        'a': {'title': 'Beach Picnic', 'is_active': True},
+        'b': {'title': 'Long Hike'}
+    }
+
+
+def test_flush_sends_batches_of_max_paths(client, emulator, tmp_path):
+    outbox = Outbox(client, file_path=str(tmp_path / 'outbox.json'), max_paths=3)
+    for i in range(7):
+        outbox.enqueue(f'events/e{i}/title', f'Event {i}')
+
+    assert outbox.flush() == 7
+    assert emulator.request_count == 3
+    assert len(emulator.get('events')) == 7
+
+
+def test_failed_flush_keeps_writes_on_disk(outbox, client, emulator, tmp_path):
+    outbox.enqueue('events/a', {'title': 'Picnic'})
+    emulator.fail_next(1)
+    assert outbox.flush() == 0
+
+    # A new outbox on the same file, as after a restart, still has the write
+    reloaded = Outbox(client, file_path=str(tmp_path / 'outbox.json'))
+    assert reloaded.pending_count() == 1
+    assert reloaded.flush() == 1
+    assert emulator.get('events/a') == {'title': 'Picnic'}
+    assert reloaded.pending_count() == 0
+
+
+def test_none_deletes_the_remote_value(outbox, emulator):
+    emulator.set('registrations/r1', {'event_id': 'a'})
+    outbox.enqueue('registrations/r1', None)
+
+    assert outbox.flush() == 1
+    assert emulator.get('registrations') is None
+
+
+def test_worker_delivers_in_the_background(outbox, emulator):
+    delivered = []
+    outbox.on_flush = delivered.append
+    emulator.fail_next(1)
+    outbox.start()
+    try:
+        outbox.enqueue('events/a/title', 'Picnic')
+        deadline = time.monotonic() + 5
+        while outbox.pending_count() and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        outbox.stop()
+    assert outbox.pending_count() == 0
+    assert delivered == [1]
+    assert emulator.get('events/a/title') == 'Picnic'
@@ -0,0 +1,81 @@
+# test_sqlite_store.py - SQLite backend registration tests
+from concurrent.futures import wait
+import pytest
+from utils import data_manager
+from utils.data_manager import DataManager
+from utils.firebase_client import FirebaseClient
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    # Background syncs fail at once instead of retrying the unreachable default URL
+    monkeypatch.setattr(data_manager, 'firebase_client',
+                        FirebaseClient('http://127.0.0.1:9/', timeout=1, max_retries=0))
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data').mkdir()
+    manager = DataManager(backend='sqlite')
+    yield manager
+    # Let a background sync finish before the directory goes away
+    if manager._sync_task:
+        wait([manager._sync_task.future], timeout=10)
+    manager.db.close()
+
+
+def make_event(manager, max_participants=2):
+    return manager.create_event({
+        'title': 'Beach Cleanup',
+        'description': 'Bring gloves',
+        'date': '2030-06-01',
+        'time': '10:00',
+        'location': 'North Beach',
+        'max_participants': max_participants,
+        'creator_id': 'creator-1',
+        'creator_name': 'Casey'
+    })
+
+
+def register(manager, event_id, user_id):
+    return manager.register_for_event({
+        'user_id': user_id,
+        'event_id': event_id,
+        'name': f'User {user_id}',
+        'email': f'{user_id}@example.com',
+        'phone': ''
+    })
+
+
+def test_register_and_cancel_update_participants(manager):
+    event = make_event(manager)
+    created_at = event['updated_at']
+
+    registration = register(manager, event['id'], 'user-1')
+    assert registration is not None
+    stored = manager.get_event_by_id(event['id'])
+    assert stored['current_participants'] == 1
+    assert stored['updated_at'] >= created_at
+    assert [reg['event_id'] for reg in manager.get_user_registrations('user-1')] == [event['id']]
+
+    assert manager.cancel_registration('user-1', event['id']) is True
+    stored = manager.get_event_by_id(event['id'])
+    assert stored['current_participants'] == 0
+    assert stored['updated_at'] >= registration['registered_at']
+    assert manager.get_user_registrations('user-1') == []
+
+
+def test_register_twice_and_cancel_missing(manager):
+    event = make_event(manager)
+
+    assert register(manager, event['id'], 'user-1') is not None
+    assert register(manager, event['id'], 'user-1') is None
+    assert manager.get_event_by_id(event['id'])['current_participants'] == 1
+
+    assert manager.cancel_registration('user-2', event['id']) is False
+    assert manager.get_event_by_id(event['id'])['current_participants'] == 1
+
+
+def test_full_event_rejects_registration(manager):
+    event = make_event(manager, max_participants=1)
+
+    assert register(manager, event['id'], 'user-1') is not None
+    assert register(manager, event['id'], 'user-2') is None
+    assert len(manager.get_event_registrations(event['id'])) == 1
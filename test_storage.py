@@ -0,0 +1,292 @@
+# test_storage.py - utils.storage in each storage mode
+import hashlib
+import os
+import threading
+import pytest
+from utils import log_store, shard_store, storage
+from utils.indexes import SortedIndex
+from utils.shard_store import ShardStore
+
+STORAGE_MODES = ['json', 'jsonl', 'sharded']
+
+
+@pytest.fixture(params=STORAGE_MODES)
+def mode(request, tmp_path, monkeypatch):
+    """Empty data directory used with each storage mode in turn"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(storage, 'STORAGE_MODE', request.param)
+    storage.clear_cache()
+    storage._stores.clear()
+    yield request.param
+    storage.clear_cache()
+    storage._stores.clear()
+
+
+def make_event(event_id, **fields):
+    event = {
+        'id': event_id,
+        'title': f'Event {event_id}',
+        'description': '',
+        'date': '2030-01-01',
+        'location': 'Town Hall',
+        'category': 'Community',
+        'created_at': f'2030-01-01T00:00:{event_id[-2:]}' if event_id[-2:].isdigit() else '2030-01-01T00:00:00',
+        'is_active': True
+    }
+    event.update(fields)
+    return event
+
+
+def fail_writes(monkeypatch):
+    """Make every layout's file writes fail"""
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(storage, '_write_records', fail)
+    # The log and shard stores only open files to write them while the cache is warm
+    monkeypatch.setattr(log_store, 'open', fail, raising=False)
+    monkeypatch.setattr(shard_store, 'open', fail, raising=False)
+
+
+def test_failed_write_leaves_cached_records_alone(mode, monkeypatch):
+    assert storage.save_event(make_event('e01'))
+    event = storage.get_event_by_id('e01')
+    listed = storage.list_events()[0][0]
+    snapshot = dict(event)
+
+    with monkeypatch.context() as patch:
+        fail_writes(patch)
+        assert storage.update_event('e01', {'title': 'Renamed'}) is False
+        assert storage.cancel_event('e01') is False
+        assert storage.update_event_participants('e01', 1) is False
+        assert storage.merge_remote_events([make_event('e01', title='Remote',
+                                                       updated_at='2031-01-01T00:00:00')]) == 0
+
+    assert event == snapshot
+    assert listed == snapshot
+    assert storage.get_event_by_id('e01') == snapshot
+    assert storage.load_all_events() == [snapshot]
+
+
+def test_writes_replace_records_instead_of_editing_them(mode):
+    storage.save_event(make_event('e01'))
+    before = storage.get_event_by_id('e01')
+
+    assert storage.update_event('e01', {'title': 'Renamed'})
+    assert before['title'] == 'Event e01'
+    assert storage.get_event_by_id('e01')['title'] == 'Renamed'
+
+
+def test_sorted_index_apply_moves_changed_records():
+    events = [make_event(f'e{n:02d}') for n in range(5)]
+    index = SortedIndex('created_at', events, where=lambda event: event['is_active'])
+
+    index.apply([make_event('e01', created_at='2030-01-02T00:00:00'),
+                 make_event('e03', is_active=False),
+                 make_event('e07')],
+                [events[0]])
+
+    expected = SortedIndex('created_at', [events[2], events[4], make_event('e07'),
+                                          make_event('e01', created_at='2030-01-02T00:00:00')])
+    assert [event['id'] for event in index.records] == ['e02', 'e04', 'e07', 'e01']
+    assert index.keys == expected.keys
+
+
+def test_list_events_follows_writes(mode):
+    for n in range(4):
+        storage.save_event(make_event(f'e{n:02d}'))
+    assert [event['id'] for event in storage.list_events()[0]] == ['e00', 'e01', 'e02', 'e03']
+
+    storage.update_event('e00', {'created_at': '2030-01-02T00:00:00'})
+    storage.cancel_event('e02')
+    storage.save_event(make_event('e04'))
+
+    assert [event['id'] for event in storage.list_events()[0]] == ['e01', 'e03', 'e04', 'e00']
+
+
+def test_shard_update_rewrites_only_touched_shards(tmp_path):
+    store = ShardStore(str(tmp_path / 'events'), 'id', order_field='created_at', shard_count=4)
+    events = [make_event(f'e{n:02d}') for n in range(12)]
+    store.rewrite(events)
+    target = events[3]
+    others = [i for i in range(store.shard_count) if i != store.record_shard(target)]
+    before = {i: os.stat(store.shard_path(i)).st_mtime_ns for i in others}
+
+    store.update([dict(target, title='Renamed'), make_event('e99')], [events[5]])
+
+    loaded = {event['id']: event for event in store.load()}
+    assert loaded['e03']['title'] == 'Renamed'
+    assert 'e99' in loaded and 'e05' not in loaded
+    assert len(loaded) == 12
+    untouched = [i for i in others if i not in (store.record_shard(events[5]),
+                                                store.record_shard(make_event('e99')))]
+    assert all(os.stat(store.shard_path(i)).st_mtime_ns == before[i] for i in untouched)
+
+
+def test_user_lookup_reads_one_shard(mode, monkeypatch):
+    for name in ('ann', 'bob', 'cy'):
+        storage.save_user({'email': f'{name}@example.com', 'username': name,
+                           'password': hashlib.sha256(name.encode()).hexdigest()})
+    storage.clear_cache()
+    monkeypatch.setattr(ShardStore, 'load', lambda self: pytest.fail("read every shard"))
+
+    assert storage.get_user_by_email('BOB@example.com')['username'] == 'bob'
+    assert storage.get_user_by_email('dee@example.com') is None
+    assert storage.authenticate_user('cy@example.com', 'cy')['username'] == 'cy'
+    assert storage.authenticate_user('cy@example.com', 'bob') is None
+
+
+def test_saved_events_load_back(mode):
+    assert storage.save_event(make_event('e01'))
+    assert storage.save_event(make_event('e02', title='Beach Cleanup'))
+    assert storage.cancel_event('e01')
+
+    assert [event['id'] for event in storage.load_events()] == ['e02']
+    assert [event['id'] for event in storage.load_all_events()] == ['e01', 'e02']
+    assert storage.get_event_by_id('e01') is None
+    assert storage.get_event_by_id('e02')['title'] == 'Beach Cleanup'
+
+
+def test_list_events_pages_with_cursor(mode):
+    for n in range(7):
+        storage.save_event(make_event(f'e{n:02d}'))
+    storage.cancel_event('e03')
+
+    pages, cursor = [], None
+    while True:
+        events, cursor = storage.list_events(cursor, limit=2)
+        pages.append([event['id'] for event in events])
+        if cursor is None:
+            break
+
+    assert pages == [['e00', 'e01'], ['e02', 'e04'], ['e05', 'e06']]
+    newest, _ = storage.list_events(limit=3, sort='-created_at')
+    assert [event['id'] for event in newest] == ['e06', 'e05', 'e04']
+
+
+def test_search_events(mode):
+    storage.save_event(make_event('e01', title='Beach Cleanup', category='Environment'))
+    storage.save_event(make_event('e02', title='Book Club', description='Monthly beach reads'))
+    storage.save_event(make_event('e03', title='Beach Volleyball', is_active=False))
+
+    assert {event['id'] for event in storage.search_events('beach')} == {'e01', 'e02'}
+    assert [event['id'] for event in storage.search_events('beach clean')] == ['e01']
+    assert [event['id'] for event in storage.search_events('bea', 'Environment')] == ['e01']
+    assert storage.search_events('tennis') == []
+
+    storage.update_event('e02', {'description': 'Monthly novels'})
+    assert [event['id'] for event in storage.search_events('beach')] == ['e01']
+
+
+def test_events_by_date_range(mode):
+    storage.save_event(make_event('e01', date='2030-03-01'))
+    storage.save_event(make_event('e02', date='2030-03-15'))
+    storage.save_event(make_event('e03', date='2030-04-01'))
+    storage.save_event(make_event('e04', date='2030-03-10', is_active=False))
+
+    in_march = storage.get_events_by_date_range('2030-03-01', '2030-03-31')
+    assert [event['id'] for event in in_march] == ['e01', 'e02']
+    assert storage.get_events_by_date_range('2031-01-01', '2031-12-31') == []
+
+
+def test_registration_counts(mode):
+    storage.save_event(make_event('e01'))
+    storage.save_event(make_event('e02'))
+    assert storage.save_registration({'user_id': 'u1', 'event_id': 'e01'})
+    assert storage.save_registration({'user_id': 'u2', 'event_id': 'e01'})
+    assert storage.save_registration({'user_id': 'u1', 'event_id': 'e02'})
+    assert not storage.save_registration({'user_id': 'u1', 'event_id': 'e01'})
+
+    assert storage.get_registration_count('e01') == 2
+    assert storage.is_user_registered('u2', 'e01')
+    assert storage.get_event_by_id('e01')['current_participants'] == 2
+
+    assert storage.cancel_registration('u2', 'e01')
+    assert storage.get_registration_count('e01') == 1
+    assert not storage.is_user_registered('u2', 'e01')
+    assert storage.get_registration_count('e02') == 1
+
+
+def test_batch_flushes_once_and_reads_staged_writes(mode, monkeypatch):
+    persisted = []
+    persist = storage._persist
+    monkeypatch.setattr(storage, '_persist',
+                        lambda file_path, *args, **kwargs: (persisted.append(file_path),
+                                                            persist(file_path, *args, **kwargs)))
+
+    with storage.batch():
+        for n in range(5):
+            storage.save_event(make_event(f'e{n:02d}'))
+        storage.update_event('e02', {'title': 'Renamed'})
+        assert storage.get_event_by_id('e02')['title'] == 'Renamed'
+        assert persisted == []
+
+    assert persisted == [storage.EVENTS_FILE]
+    storage.clear_cache()
+    assert len(storage.load_events()) == 5
+    assert storage.get_event_by_id('e02')['title'] == 'Renamed'
+
+
+def test_failed_batch_discards_staged_writes(mode):
+    storage.save_event(make_event('e01'))
+
+    with pytest.raises(RuntimeError):
+        with storage.batch():
+            storage.save_event(make_event('e02'))
+            raise RuntimeError("abort")
+
+    assert [event['id'] for event in storage.load_events()] == ['e01']
+
+
+def test_batch_leaves_other_threads_alone(mode):
+    storage.save_event(make_event('e01'))
+    seen = {}
+
+    def other_thread():
+        seen['title'] = storage.get_event_by_id('e01')['title']
+        storage.save_event(make_event('e02'))
+
+    with storage.batch():
+        storage.update_event('e01', {'title': 'Staged'})
+        # Neither blocked by the open batch nor shown its staged writes
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        assert seen['title'] == 'Event e01'
+
+    # The other thread's write is kept when the batch is flushed on top of it
+    storage.clear_cache()
+    assert [event['id'] for event in storage.load_events()] == ['e01', 'e02']
+    assert storage.get_event_by_id('e01')['title'] == 'Staged'
+
+
+def test_registration_flushes_with_its_participant_count(mode, monkeypatch):
+    storage.save_event(make_event('e01'))
+    persisted = []
+    persist = storage._persist
+    monkeypatch.setattr(storage, '_persist',
+                        lambda file_path, *args, **kwargs: (persisted.append((file_path, kwargs.get('sync'))),
+                                                            persist(file_path, *args, **kwargs)))
+
+    assert storage.save_registration({'user_id': 'u1', 'event_id': 'e01'})
+    assert persisted == [(storage.REGISTRATIONS_FILE, True), (storage.EVENTS_FILE, True)]
+    assert storage.cancel_registration('u1', 'e01')
+    assert persisted[2:] == [(storage.REGISTRATIONS_FILE, True), (storage.EVENTS_FILE, True)]
+
+    storage.clear_cache()
+    assert storage.get_registration_count('e01') == 0
+    assert storage.get_event_by_id('e01')['current_participants'] == 0
+
+
+def test_reload_after_clear_cache(mode):
+    storage.save_event(make_event('e01'))
+    storage.save_registration({'user_id': 'u1', 'event_id': 'e01'})
+    storage.update_event('e01', {'title': 'Renamed'})
+    cached = storage.load_all_events()
+
+    storage.clear_cache()
+    storage._stores.clear()
+
+    assert storage.load_all_events() == cached
+    assert storage.get_event_by_id('e01')['title'] == 'Renamed'
+    assert storage.get_registration_count('e01') == 1
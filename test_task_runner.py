@@ -0,0 +1,28 @@
+# test_task_runner.py - TaskRunner cancellation
+import threading
+from utils.task_runner import TaskRunner
+
+
+def test_superseding_a_queued_task_does_not_block():
+    runner = TaskRunner(max_workers=1)
+    release = threading.Event()
+    busy = runner.submit(release.wait, 5)
+    submitted = []
+
+    def submit_twice():
+        # The first keyed task is still queued behind busy when the second replaces it
+        submitted.append(runner.submit(lambda: 'old', key='load'))
+        submitted.append(runner.submit(lambda: 'new', key='load'))
+
+    thread = threading.Thread(target=submit_twice, daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+    release.set()
+    assert not thread.is_alive()
+    try:
+        old, new = submitted
+        assert old.cancelled and old.future.cancelled()
+        assert new.future.result(timeout=5) == 'new'
+        assert busy.future.result(timeout=5) is True
+    finally:
+        runner.shutdown()
@@ -32,6 +32,8 @@ class AppConfig:
     DATA_RETENTION_DAYS = 365
     AUTO_CLEANUP_ENABLED = True
     MAX_DATA_SIZE_MB = 100
+    STORAGE_MODE = "json"  # "json" (one array per file), "jsonl" (append-only logs) or "sharded" (hashed shard files)
+    DATA_BACKEND = "json"  # DataManager backend: "json" or "sqlite"
     
     # Security Settings
     PASSWORD_MIN_LENGTH = 6
@@ -55,6 +57,7 @@ class AppConfig:
     API_BASE_URL = ""
     API_TIMEOUT = 30
     ENABLE_OFFLINE_MODE = True
+    ENABLE_REALTIME_SYNC = True  # Stream event changes from Firebase while the app runs
     
     @classmethod
     def get_config(cls) -> Dict[str, Any]:
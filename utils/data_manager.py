@@ -1,14 +1,30 @@
 # utils/data_manager.py
+import bisect
 import json
 import os
+import threading
+import time
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import hashlib
 from kivy.logger import Logger
-import requests
+from utils.app_config import AppConfig
+from utils.firebase_client import SERVER_TIMESTAMP, FirebaseClient, FirebaseError
+from utils.outbox import Outbox
+from utils.sqlite_store import EVENT_COLUMNS, SQLiteStore
+from utils.storage import is_newer_or_same
+from utils.task_runner import task_runner
+from utils.indexes import (SortedIndex, SearchIndex, DateIndex, GeoGridIndex, bounding_box,
+                           tokenize, parse_sort, encode_cursor, decode_cursor)
 
-FIREBASE_DB_URL = "https://ripple-7338e-default-rtdb.firebaseio.com/"
+# Set RIPPLE_FIREBASE_URL to use another database, e.g. utils/firebase_emulator.py
+FIREBASE_DB_URL = os.environ.get('RIPPLE_FIREBASE_URL', "https://ripple-7338e-default-rtdb.firebaseio.com/")
+# Shared client so every Firebase call reuses the same pooled connections
+firebase_client = FirebaseClient(FIREBASE_DB_URL)
+# Remote writes that failed while offline, sent again when the connection returns
+outbox = Outbox(firebase_client)
 # Add these methods to your existing DataManager class in utils/data_manager.py
 
 def register_user(self, user_data):
@@ -54,16 +70,6 @@ def authenticate_user_internal(self, email: str, password: str):
     
     return None
 
-def get_events_by_category(self, category):
-    """Get events filtered by category"""
-    events = self.get_all_events()
-    return [event for event in events if event.get('category') == category]
-
-def get_events_by_creator(self, creator_id):
-    """Get events created by a specific user"""
-    events = self.get_all_events()
-    return [event for event in events if event.get('creator_id') == creator_id]
-
 def get_user_created_events(self, user_id):
     """Get events created by a user - alias for get_events_by_creator"""
     return self.get_events_by_creator(user_id)
@@ -177,126 +183,70 @@ def cancel_event(self, event_id):
     
     return False
 
-# Fix your existing create_event method to work with Firebase and JSON
-def create_event(self, event_data):
-    """Enhanced create_event method that works with both Firebase and JSON"""
-    # Try Firebase first
-    firebase_result = firebase_post("events", event_data)
-    firebase_success = firebase_result is not None
-    
-    # Also save to JSON as backup/local storage
-    events = self.load_json(self.events_file)
-    
-    # If the event doesn't have an ID, generate one
-    if 'id' not in event_data:
-        event_data['id'] = self.generate_id()
-    
-    new_event = {
-        'id': event_data.get('id', self.generate_id()),
-        'title': event_data['title'],
-        'description': event_data['description'],
-        'date': event_data['date'],
-        'time': event_data['time'],
-        'location': event_data['location'],
-        'category': event_data.get('category', 'General'),
-        'max_participants': event_data.get('max_participants', 50),
-        'current_participants': 0,
-        'creator_id': event_data['creator_id'],
-        'creator_name': event_data.get('creator_name', ''),
-        'latitude': event_data.get('latitude'),
-        'longitude': event_data.get('longitude'),
-        'city': event_data.get('city', ''),
-        'country': event_data.get('country', ''),
-        'created_at': self.get_timestamp(),
-        'is_active': True
-    }
-    
-    events.append(new_event)
-    json_success = self.save_json(self.events_file, events)
-    
-    # Return True if either Firebase or JSON succeeded
-    return firebase_success or json_success
-
-def get_all_events(self):
-    """Enhanced get_all_events that tries Firebase first, falls back to JSON"""
-    # Try Firebase first
-    firebase_events = firebase_get("events")
-    if firebase_events:
-        events_list = []
-        for event_id, event_data in firebase_events.items():
-            if isinstance(event_data, dict):
-                event_data['id'] = event_data.get('id', event_id)
-                events_list.append(event_data)
-        
-        # Also sync with local JSON
-        self.save_json(self.events_file, events_list)
-        return events_list
-    
-    # Fallback to JSON
-    events = self.load_json(self.events_file)
-    return [event for event in events if event.get('is_active', True)]
-
-
-
 def firebase_get(path):
-    url = f"{FIREBASE_DB_URL}{path}.json"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        print(f"Firebase GET error: {e}")
-        return None
+    return firebase_client.get(path)
 
 def firebase_put(path, data):
-    url = f"{FIREBASE_DB_URL}{path}.json"
-    try:
-        response = requests.put(url, json=data)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        print(f"Firebase PUT error: {e}")
-        return None
+    return firebase_client.put(path, data)
 
 def firebase_post(path, data):
-    url = f"{FIREBASE_DB_URL}{path}.json"
-    try:
-        response = requests.post(url, json=data)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        print(f"Firebase POST error: {e}")
-        return None
+    return firebase_client.post(path, data)
 
 def firebase_patch(path, data):
-    url = f"{FIREBASE_DB_URL}{path}.json"
-    try:
-        response = requests.patch(url, json=data)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        print(f"Firebase PATCH error: {e}")
-        return None
+    return firebase_client.patch(path, data)
+
+def firebase_query(path, **filters):
+    return firebase_client.query(path, **filters)
+
+def firebase_events_list(firebase_events):
+    """Turn a Firebase events object into a list, sorted by key, with each ID set"""
+    events_list = []
+    for event_id, event_data in sorted(firebase_events.items()):
+        if isinstance(event_data, dict):
+            event_data['id'] = event_data.get('id', event_id)
+            events_list.append(event_data)
+    return events_list
 
 
 class DataManager:
-    def create_event(self, event_data):
-        result = firebase_post("events", event_data)
-        return result is not None
-    
-    def get_all_events(self):
-        events = firebase_get("events")
-        if events:
-            return [v for v in events.values()]
-        return []
-    def __init__(self):
+    def __init__(self, backend: str = None):
         self.data_dir = 'data'
         self.users_file = os.path.join(self.data_dir, 'users.json')
         self.events_file = os.path.join(self.data_dir, 'events.json')
         self.registrations_file = os.path.join(self.data_dir, 'registrations.json')
         self.categories_file = os.path.join(self.data_dir, 'categories.json')
+        self.db_file = os.path.join(self.data_dir, 'ripple.db')
+        self.sync_state_file = os.path.join(self.data_dir, 'sync_state.json')
+        
+        # "json" keeps the flat files, "sqlite" stores everything in db_file
+        self.backend = backend or os.environ.get('RIPPLE_DATA_BACKEND', AppConfig.DATA_BACKEND)
+        self.db = None
+        # File contents written inside transaction(), keyed by path, and the
+        # thread that opened it; other threads read and write the files directly
+        self._pending_writes = None
+        self._transaction_thread = None
+        # Held across every read-modify-write of local data, so writes from the
+        # UI and from background syncs don't overwrite each other
+        self._lock = threading.RLock()
+        # Indexes over active events, keyed by name, with the (mtime, size)
+        # of the events file they were built from
+        self._event_indexes = {}
+        self._index_lock = threading.RLock()
+        # Active events list served by get_all_events, with hit/miss counters
+        self._events_cache = None
+        self._events_cache_lock = threading.Lock()
+        self._events_generation = 0
+        self._events_refreshing = False
+        self._cache_stats = {'hits': 0, 'misses': 0, 'stale': 0, 'refreshes': 0}
+        # Background pull of remote changes started by get_all_events, and when
+        self._sync_task = None
+        self._last_sync = None
+        # Background Firebase queries started by the remote query methods, by name
+        self._refresh_tasks = {}
         
         self.initialize_files()
+        if self.backend == 'sqlite':
+            self.initialize_database()
     
     def initialize_files(self):
         """Initialize JSON files if they don't exist"""
@@ -317,8 +267,59 @@ class DataManager:
                 self.save_json(file_path, default_data)
                 Logger.info(f"DataManager: Initialized {file_path}")
     
+    def initialize_database(self):
+        """Open the SQLite backend, importing the JSON files the first time"""
+        self.db = SQLiteStore(self.db_file)
+        if self.db.is_empty():
+            self.db.import_records(
+                users=self.load_json(self.users_file),
+                events=self.load_json(self.events_file),
+                registrations=self.load_json(self.registrations_file),
+                categories=self.load_json(self.categories_file)
+            )
+    
+    @contextmanager
+    def transaction(self):
+        """Group writes so each touched file is written once when the block exits.
+        
+        With the SQLite backend the block runs as a single transaction. If the
+        block raises, its writes are discarded. Writes from other threads wait
+        until the block exits, and never see or join its staged writes.
+        """
+        if self.db:
+            with self._lock, self.db.transaction():
+                yield
+            return
+        
+        with self._lock:
+            if self._pending() is not None:
+                yield
+                return
+            
+            self._pending_writes = {}
+            self._transaction_thread = threading.get_ident()
+            try:
+                yield
+            except BaseException:
+                self._pending_writes = self._transaction_thread = None
+                raise
+            
+            pending = self._pending_writes
+            self._pending_writes = self._transaction_thread = None
+            for file_path, data in pending.items():
+                self.save_json(file_path, data)
+    
+    def _pending(self) -> Optional[Dict]:
+        """Writes staged by the open transaction, if this thread opened it"""
+        if self._transaction_thread == threading.get_ident():
+            return self._pending_writes
+        return None
+    
     def load_json(self, file_path: str) -> List[Dict]:
         """Load data from JSON file"""
+        pending = self._pending()
+        if pending is not None and file_path in pending:
+            return pending[file_path]
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 return json.load(f)
@@ -326,14 +327,36 @@ class DataManager:
             Logger.error(f"DataManager: Error loading {file_path}: {e}")
             return []
     
-    def save_json(self, file_path: str, data: List[Dict]):
-        """Save data to JSON file"""
+    def save_json(self, file_path: str, data: List[Dict], changed: List[Dict] = None):
+        """Save data to JSON file (atomically, via a temp file).
+        
+        For the events file, changed lists the events this write added or
+        modified so the event indexes can be updated instead of rebuilt.
+        """
+        pending = self._pending()
+        if pending is not None:
+            pending[file_path] = data
+            if file_path == self.events_file:
+                with self._index_lock:
+                    self._event_indexes.clear()
+            return True
+        
+        base_signature = self._file_signature(file_path)
+        tmp_path = f"{file_path}.tmp"
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
+            if file_path == self.events_file:
+                self._update_event_indexes(base_signature, changed)
+                self.invalidate_events_cache()
             return True
         except Exception as e:
             Logger.error(f"DataManager: Error saving {file_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
             return False
     
     def hash_password(self, password: str) -> str:
@@ -351,33 +374,41 @@ class DataManager:
     # User management
     def create_user(self, user_data: Dict) -> Optional[Dict]:
         """Create a new user"""
-        users = self.load_json(self.users_file)
+        with self._lock:
+            users = [] if self.db else self.load_json(self.users_file)
         
-        # Check if user already exists
-        if any(user['email'].lower() == user_data['email'].lower() for user in users):
-            return None
+            # Check if user already exists
+            if any(user['email'].lower() == user_data['email'].lower() for user in users):
+                return None
         
-        new_user = {
-            'id': self.generate_id(),
-            'name': user_data['name'],
-            'email': user_data['email'].lower(),
-            'password': self.hash_password(user_data['password']),
-            'phone': user_data.get('phone', ''),
-            'preferences': user_data.get('preferences', {}),
-            'created_at': self.get_timestamp()
-        }
+            new_user = {
+                'id': self.generate_id(),
+                'name': user_data['name'],
+                'email': user_data['email'].lower(),
+                'password': self.hash_password(user_data['password']),
+                'phone': user_data.get('phone', ''),
+                'preferences': user_data.get('preferences', {}),
+                'created_at': self.get_timestamp()
+            }
         
-        users.append(new_user)
-        if self.save_json(self.users_file, users):
-            # Return user without password
-            user_return = new_user.copy()
-            del user_return['password']
-            return user_return
+            if self.db:
+                # The unique email index rejects duplicates
+                return self.db.create_user(new_user)
         
-        return None
+            users.append(new_user)
+            if self.save_json(self.users_file, users):
+                # Return user without password
+                user_return = new_user.copy()
+                del user_return['password']
+                return user_return
+        
+            return None
     
     def authenticate_user(self, email: str, password: str) -> Optional[Dict]:
         """Authenticate user login"""
+        if self.db:
+            return self.db.authenticate_user(email, self.hash_password(password))
+        
         users = self.load_json(self.users_file)
         hashed_password = self.hash_password(password)
         
@@ -392,20 +423,22 @@ class DataManager:
     
     def update_user_preferences(self, user_id: str, preferences: Dict) -> bool:
         """Update user preferences"""
-        users = self.load_json(self.users_file)
+        if self.db:
+            return self.db.update_user_preferences(user_id, preferences)
         
-        for user in users:
-            if user['id'] == user_id:
-                user['preferences'] = preferences
-                return self.save_json(self.users_file, users)
+        with self._lock:
+            users = self.load_json(self.users_file)
         
-        return False
+            for user in users:
+                if user['id'] == user_id:
+                    user['preferences'] = preferences
+                    return self.save_json(self.users_file, users)
+        
+            return False
     
     # Event management
     def create_event(self, event_data: Dict) -> Optional[Dict]:
         """Create a new event"""
-        events = self.load_json(self.events_file)
-        
         new_event = {
             'id': self.generate_id(),
             'title': event_data['title'],
@@ -423,22 +456,174 @@ class DataManager:
             'city': event_data.get('city', ''),
             'country': event_data.get('country', ''),
             'created_at': self.get_timestamp(),
+            'updated_at': self.get_timestamp(),
             'is_active': True
         }
         
-        events.append(new_event)
-        if self.save_json(self.events_file, events):
-            return new_event
+        with self._lock:
+            if self.db:
+                created = self._events_written(self.db.create_event(new_event))
+            else:
+                events = self.load_json(self.events_file)
+                events.append(new_event)
+                created = new_event if self.save_json(self.events_file, events, changed=[new_event]) else None
         
-        return None
+        if created:
+            self._send_remote(f"events/{new_event['id']}",
+                              {**new_event, 'server_updated_at': SERVER_TIMESTAMP})
+        return created
     
     def get_all_events(self) -> List[Dict]:
-        """Get all active events"""
+        """Get all active events, served from a cache.
+        
+        Writes through DataManager drop the cached list. With the JSON backend
+        it is also dropped when the events file changes on disk, and is valid
+        until then. The SQLite database has no such signature, so there the
+        list expires after AppConfig.CACHE_EXPIRY_TIME and is still returned
+        while a background thread reloads it. Changes made in Firebase are
+        pulled in the background, at most once per CACHE_EXPIRY_TIME.
+        """
+        self._sync_in_background()
+        pending = self._pending()
+        if pending is not None and self.events_file in pending:
+            return self._load_active_events()
+        
+        signature = None if self.db else self._file_signature(self.events_file)
+        with self._events_cache_lock:
+            cached = self._events_cache
+            if cached is None or cached['signature'] != signature:
+                self._cache_stats['misses'] += 1
+                cached = None
+            elif not self.db or time.monotonic() - cached['loaded_at'] < AppConfig.CACHE_EXPIRY_TIME:
+                self._cache_stats['hits'] += 1
+            else:
+                self._cache_stats['stale'] += 1
+                self._revalidate_events_cache()
+        
+        if cached is None:
+            cached = self._refresh_events_cache()
+        return [event.copy() for event in cached['events']]
+    
+    def get_cache_stats(self) -> Dict:
+        """Hit, miss, stale and background refresh counts of the events cache"""
+        with self._events_cache_lock:
+            stats = dict(self._cache_stats)
+            cached = self._events_cache
+        stats['age'] = round(time.monotonic() - cached['loaded_at'], 1) if cached else None
+        return stats
+    
+    def invalidate_events_cache(self):
+        with self._events_cache_lock:
+            self._events_cache = None
+            self._events_generation += 1
+    
+    def _events_written(self, result):
+        """Drop the events cache after a write, passing the write's result through"""
+        self.invalidate_events_cache()
+        return result
+    
+    def _load_active_events(self) -> List[Dict]:
+        if self.db:
+            return self.db.get_all_events()
+        
         events = self.load_json(self.events_file)
         return [event for event in events if event.get('is_active', True)]
     
+    def _refresh_events_cache(self) -> Dict:
+        """Load the events and cache them, unless a write happened meanwhile"""
+        with self._events_cache_lock:
+            generation = self._events_generation
+        signature = None if self.db else self._file_signature(self.events_file)
+        cached = {'signature': signature, 'loaded_at': time.monotonic(),
+                  'events': self._load_active_events()}
+        with self._events_cache_lock:
+            if generation == self._events_generation:
+                self._events_cache = cached
+        return cached
+    
+    def _revalidate_events_cache(self):
+        """Start a background reload of the expired cache; call with the cache lock held"""
+        if self._events_refreshing:
+            return
+        self._events_refreshing = True
+        self._cache_stats['refreshes'] += 1
+        
+        def refresh():
+            try:
+                self._refresh_events_cache()
+            finally:
+                with self._events_cache_lock:
+                    self._events_refreshing = False
+        
+        threading.Thread(target=refresh, name="events-cache-refresh", daemon=True).start()
+    
+    def list_events(self, cursor: str = None, limit: int = None,
+                    sort: str = 'created_at') -> Tuple[List[Dict], Optional[str]]:
+        """Get one page of active events and the cursor for the next page.
+        
+        sort is a field name, prefixed with "-" for descending order. The
+        returned cursor is None on the last page.
+        """
+        limit = max(1, min(limit or AppConfig.MAX_EVENTS_PER_LOAD, AppConfig.MAX_EVENTS_PER_LOAD))
+        try:
+            field, descending = parse_sort(sort)
+            after = decode_cursor(cursor, sort) if cursor else None
+        except ValueError as e:
+            Logger.error(f"DataManager: Invalid event page request - {e}")
+            return [], None
+        
+        if self.db:
+            events, last_key = self.db.list_events(field, descending, after, limit)
+        else:
+            with self._index_lock:
+                index = self._event_index(f'sorted_{field}', lambda events: SortedIndex(
+                    field, events, where=lambda event: event.get('is_active', True)))
+                events, last_key = index.page(after, limit, descending)
+                events = [event.copy() for event in events]
+        return events, encode_cursor(sort, last_key) if last_key else None
+    
+    def _event_index(self, name: str, builder):
+        """Index over active events, rebuilt when the events file changes on disk.
+        
+        Writes update indexes in place, so use it with _index_lock held.
+        """
+        pending = self._pending()
+        if pending is not None and self.events_file in pending:
+            return builder(self.get_all_events())
+        signature = self._file_signature(self.events_file)
+        cached = self._event_indexes.get(name)
+        if cached is None or cached[0] != signature:
+            cached = (signature, builder(self.get_all_events()))
+            self._event_indexes[name] = cached
+        return cached[1]
+    
+    def _update_event_indexes(self, base_signature, changed: List[Dict] = None):
+        """Bring event indexes up to date after this process wrote the events file.
+        
+        Indexes built from the version the write replaced are updated with the
+        changed events if they support it; all others are dropped.
+        """
+        signature = self._file_signature(self.events_file)
+        with self._index_lock:
+            for name, (index_signature, index) in list(self._event_indexes.items()):
+                if changed is not None and index_signature == base_signature and hasattr(index, 'apply'):
+                    index.apply(changed)
+                    self._event_indexes[name] = (signature, index)
+                else:
+                    del self._event_indexes[name]
+    
+    def _file_signature(self, file_path: str):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
     def get_event_by_id(self, event_id: str) -> Optional[Dict]:
         """Get specific event by ID"""
+        if self.db:
+            return self.db.get_event_by_id(event_id)
+        
         events = self.load_json(self.events_file)
         
         for event in events:
@@ -449,129 +634,425 @@ class DataManager:
     
     def search_events(self, query: str, category: str = None) -> List[Dict]:
         """Search events by query and/or category"""
-        events = self.get_all_events()
-        results = []
+        if self.db:
+            return self.db.search_events(query, category)
         
-        query_lower = query.lower() if query else ""
+        if query and tokenize(query):
+            with self._index_lock:
+                index = self._event_index('search', lambda events: SearchIndex(
+                    events, where=lambda event: event.get('is_active', True)))
+                events = [event.copy() for event in index.search(query)]
+        else:
+            events = self.get_all_events()
         
-        for event in events:
-            # Check category filter
-            if category and event.get('category') != category:
-                continue
-            
-            # Check query in title, description, or location
-            if (query_lower in event['title'].lower() or 
-                query_lower in event['description'].lower() or
-                query_lower in event['location'].lower()):
-                results.append(event)
+        # Check category filter
+        return [event for event in events if not category or event.get('category') == category]
+    
+    def get_events_near(self, latitude: float, longitude: float, radius_km: float,
+                        include_unlocated: bool = False) -> List[Dict]:
+        """Get active events that may lie within radius_km of a point.
+        
+        The candidates come from a spatial index and can include events just
+        outside the radius, so callers still check the exact distance. With
+        include_unlocated, events without coordinates are added at the end.
+        """
+        if self.db:
+            lat_min, lat_max, lon_ranges = bounding_box(latitude, longitude, radius_km)
+            return self.db.get_events_in_box(lat_min, lat_max, lon_ranges, include_unlocated)
         
-        return results
+        with self._index_lock:
+            index = self._event_index('geo', lambda events: GeoGridIndex(
+                events, where=lambda event: event.get('is_active', True)))
+            events = index.nearby(latitude, longitude, radius_km)
+            if include_unlocated:
+                events += index.unlocated.values()
+            return [event.copy() for event in events]
     
     def update_event_participants(self, event_id: str, increment: int = 1) -> bool:
         """Update event participant count"""
-        events = self.load_json(self.events_file)
+        with self._lock:
+            if self.db:
+                return self._events_written(
+                    self.db.update_event_participants(event_id, increment, self.get_timestamp()))
         
-        for event in events:
-            if event['id'] == event_id:
-                event['current_participants'] = max(0, event['current_participants'] + increment)
-                return self.save_json(self.events_file, events)
+            events = self.load_json(self.events_file)
         
-        return False
+            for event in events:
+                if event['id'] == event_id:
+                    event['current_participants'] = max(0, event['current_participants'] + increment)
+                    event['updated_at'] = self.get_timestamp()
+                    return self.save_json(self.events_file, events, changed=[event])
+        
+            return False
     
-    # Registration management
-    def register_for_event(self, registration_data: Dict) -> Optional[Dict]:
-        """Register user for an event"""
-        registrations = self.load_json(self.registrations_file)
+    def update_event(self, event_id: str, update_data: Dict) -> bool:
+        """Update the given fields of an existing event"""
+        updated_at = self.get_timestamp()
+        with self._lock:
+            if self.db:
+                changes = {key: value for key, value in update_data.items() if key in EVENT_COLUMNS}
+                updated = self._events_written(
+                    self.db.update_event(event_id, {**update_data, 'updated_at': updated_at}))
+            else:
+                events = self.load_json(self.events_file)
+                changes, updated = {}, False
+                for event in events:
+                    if event.get('id') == event_id:
+                        # Update the fields provided in update_data
+                        for key, value in update_data.items():
+                            if key in event:
+                                event[key] = value
+                                changes[key] = value
+                        event['updated_at'] = updated_at
+                        updated = self.save_json(self.events_file, events, changed=[event])
+                        break
         
-        # Check if user already registered for this event
-        if any(reg['user_id'] == registration_data['user_id'] and 
-               reg['event_id'] == registration_data['event_id'] 
-               for reg in registrations):
-            return None
+        if updated:
+            changes.pop('id', None)
+            self._send_event_fields(event_id, {**changes, 'updated_at': updated_at})
+        return updated
+    
+    def cancel_event(self, event_id: str) -> bool:
+        """Cancel an event, keeping it on file as inactive"""
+        updated_at = self.get_timestamp()
+        with self._lock:
+            if self.db:
+                cancelled = self._events_written(self.db.cancel_event(event_id, updated_at))
+            else:
+                events = self.load_json(self.events_file)
+                cancelled = False
+                for event in events:
+                    if event.get('id') == event_id:
+                        event['is_active'] = False  # Mark as inactive instead of deleting
+                        event['updated_at'] = updated_at
+                        cancelled = self.save_json(self.events_file, events, changed=[event])
+                        break
         
-        # Get event details
-        event = self.get_event_by_id(registration_data['event_id'])
-        if not event:
+        if cancelled:
+            self._send_event_fields(event_id, {'is_active': False, 'updated_at': updated_at})
+        return cancelled
+    
+    def _send_remote(self, path: str, value) -> bool:
+        """Pass a local write on to Firebase.
+        
+        In offline mode it goes through the outbox, which coalesces writes and
+        keeps retrying until they land; otherwise it is sent right away.
+        """
+        if AppConfig.ENABLE_OFFLINE_MODE:
+            return outbox.enqueue(path, value)
+        try:
+            if value is None:
+                firebase_client.delete(path)
+            else:
+                firebase_put(path, value)
+        except FirebaseError:
+            return False
+        return True
+    
+    def _send_event_fields(self, event_id: str, fields: Dict):
+        """Pass changed fields of an event on to Firebase, leaving the others alone.
+        
+        Firebase stamps server_updated_at with its own clock, which is what
+        sync_events watermarks on.
+        """
+        fields = {**fields, 'server_updated_at': SERVER_TIMESTAMP}
+        if AppConfig.ENABLE_OFFLINE_MODE:
+            for field, value in fields.items():
+                outbox.enqueue(f"events/{event_id}/{field}", value)
+            return
+        # One update, so a reader never sees the new stamp without the fields
+        try:
+            firebase_patch(f"events/{event_id}", fields)
+        except FirebaseError:
+            Logger.warning(f"DataManager: Could not send changes to event {event_id}")
+    
+    def _send_participant_count(self, event_id: str):
+        event = self.get_event_by_id(event_id)
+        if event:
+            self._send_event_fields(event_id, {'current_participants': event['current_participants'],
+                                               'updated_at': event.get('updated_at')})
+    
+    # Remote sync
+    def _sync_in_background(self):
+        """Run sync_events on the task runner unless it ran within CACHE_EXPIRY_TIME"""
+        now = time.monotonic()
+        with self._events_cache_lock:
+            if self._last_sync is not None and now - self._last_sync < AppConfig.CACHE_EXPIRY_TIME:
+                return
+            self._last_sync = now
+        self._sync_task = task_runner.submit(self.sync_events, key=f"sync_events:{id(self)}")
+    
+    def sync_events(self) -> Optional[int]:
+        """Pull events changed in Firebase since the last sync into local storage.
+        
+        The watermark is the latest server_updated_at seen, a time Firebase
+        sets from its own clock on every write, so clock skew between devices
+        can't make a sync skip edits. Only events stamped at or after it are
+        downloaded; the first sync downloads everything. Returns the number of
+        local events that changed, or None if Firebase could not be reached.
+        """
+        watermark = self.load_sync_state().get('events')
+        if not isinstance(watermark, int) or isinstance(watermark, bool):
+            # Missing, or a client timestamp from before server stamps were used
+            watermark = None
+        try:
+            if watermark is not None:
+                firebase_events = firebase_query("events", order_by="server_updated_at", start_at=watermark)
+            else:
+                firebase_events = firebase_get("events")
+        except FirebaseError:
             return None
+        if not isinstance(firebase_events, dict):
+            # An empty node; nothing has changed
+            firebase_events = {}
         
-        # Check if event is full
-        if event['current_participants'] >= event['max_participants']:
+        events = firebase_events_list(firebase_events)
+        changed = self.merge_events(events)
+        if changed is None:
             return None
         
-        new_registration = {
-            'id': self.generate_id(),
-            'user_id': registration_data['user_id'],
-            'event_id': registration_data['event_id'],
-            'event_title': event['title'],
-            'event_date': event['date'],
-            'event_time': event['time'],
-            'event_location': event['location'],
-            'name': registration_data['name'],
-            'email': registration_data['email'],
-            'phone': registration_data['phone'],
-            'registered_at': self.get_timestamp()
-        }
+        stamps = [event.get('server_updated_at') for event in events]
+        latest = max((stamp for stamp in stamps if isinstance(stamp, int) and not isinstance(stamp, bool)),
+                     default=watermark)
+        if latest != watermark:
+            with self._lock:
+                state = self.load_sync_state()
+                state['events'] = latest
+                self.save_json(self.sync_state_file, state)
+        if changed:
+            Logger.info(f"DataManager: Synced {changed} changed events from Firebase")
+        return changed
+    
+    def merge_events(self, events: List[Dict]) -> Optional[int]:
+        """Store remote events by ID unless the local copy is as new.
         
-        registrations.append(new_registration)
-        if self.save_json(self.registrations_file, registrations):
-            # Update event participant count
-            self.update_event_participants(registration_data['event_id'], 1)
-            return new_registration
+        Nothing is written when no event changed. Returns the number of events
+        added or replaced, or None if they could not be saved.
+        """
+        with self._lock:
+            if self.db:
+                return self._events_written(self.db.upsert_events(events))
         
-        return None
+            stored = self.load_json(self.events_file)
+            by_id = {event.get('id'): event for event in stored}
+            changed = []
+            for event in events:
+                existing = by_id.get(event.get('id'))
+                if existing is None:
+                    stored.append(event)
+                    by_id[event.get('id')] = event
+                    changed.append(event)
+                elif existing != event and not self._is_newer_or_same(existing, event):
+                    existing.clear()
+                    existing.update(event)
+                    changed.append(existing)
+        
+            if not changed:
+                return 0
+            return len(changed) if self.save_json(self.events_file, stored, changed=changed) else None
+    
+    def _is_newer_or_same(self, local: Dict, remote: Dict) -> bool:
+        return is_newer_or_same(local, remote)
+    
+    def load_sync_state(self) -> Dict:
+        """Watermarks of the last remote sync, keyed by collection"""
+        if not os.path.exists(self.sync_state_file):
+            return {}
+        state = self.load_json(self.sync_state_file)
+        return state if isinstance(state, dict) else {}
+    
+    # Registration management
+    def register_for_event(self, registration_data: Dict) -> Optional[Dict]:
+        """Register user for an event"""
+        with self._lock:
+            # Check if user already registered for this event
+            if self.db:
+                if self.db.is_registered(registration_data['user_id'], registration_data['event_id']):
+                    return None
+            else:
+                registrations = self.load_json(self.registrations_file)
+                if any(reg['user_id'] == registration_data['user_id'] and 
+                       reg['event_id'] == registration_data['event_id'] 
+                       for reg in registrations):
+                    return None
+        
+            # Get event details
+            event = self.get_event_by_id(registration_data['event_id'])
+            if not event:
+                return None
+        
+            # Check if event is full
+            if event['current_participants'] >= event['max_participants']:
+                return None
+        
+            new_registration = {
+                'id': self.generate_id(),
+                'user_id': registration_data['user_id'],
+                'event_id': registration_data['event_id'],
+                'event_title': event['title'],
+                'event_date': event['date'],
+                'event_time': event['time'],
+                'event_location': event['location'],
+                'name': registration_data['name'],
+                'email': registration_data['email'],
+                'phone': registration_data['phone'],
+                'registered_at': self.get_timestamp()
+            }
+        
+            if self.db:
+                # Inserts and bumps the participant count in one transaction
+                registered = self._events_written(
+                    self.db.register_for_event(new_registration, new_registration['registered_at']))
+            else:
+                registrations.append(new_registration)
+                registered = None
+                if self.save_json(self.registrations_file, registrations):
+                    # Update event participant count
+                    self.update_event_participants(registration_data['event_id'], 1)
+                    registered = new_registration
+        
+        if registered:
+            self._send_remote(f"registrations/{new_registration['id']}", new_registration)
+            self._send_participant_count(new_registration['event_id'])
+        return registered
     
     def get_user_registrations(self, user_id: str) -> List[Dict]:
         """Get all registrations for a user"""
+        if self.db:
+            return self.db.get_user_registrations(user_id)
+        
         registrations = self.load_json(self.registrations_file)
         return [reg for reg in registrations if reg['user_id'] == user_id]
     
     def get_event_registrations(self, event_id: str) -> List[Dict]:
         """Get all registrations for an event"""
+        if self.db:
+            return self.db.get_event_registrations(event_id)
+        
         registrations = self.load_json(self.registrations_file)
         return [reg for reg in registrations if reg['event_id'] == event_id]
     
     def cancel_registration(self, user_id: str, event_id: str) -> bool:
         """Cancel user registration for an event"""
-        registrations = self.load_json(self.registrations_file)
-        
-        for i, reg in enumerate(registrations):
-            if reg['user_id'] == user_id and reg['event_id'] == event_id:
-                registrations.pop(i)
-                if self.save_json(self.registrations_file, registrations):
-                    # Update event participant count
-                    self.update_event_participants(event_id, -1)
-                    return True
-                break
+        with self._lock:
+            if self.db:
+                registration = next((reg for reg in self.db.get_user_registrations(user_id)
+                                     if reg['event_id'] == event_id), None)
+                cancelled = registration is not None and self._events_written(
+                    self.db.cancel_registration(user_id, event_id, self.get_timestamp()))
+            else:
+                registrations = self.load_json(self.registrations_file)
+                registration, cancelled = None, False
+                for i, reg in enumerate(registrations):
+                    if reg['user_id'] == user_id and reg['event_id'] == event_id:
+                        registration = registrations.pop(i)
+                        if self.save_json(self.registrations_file, registrations):
+                            # Update event participant count
+                            self.update_event_participants(event_id, -1)
+                            cancelled = True
+                        break
         
-        return False
+        if cancelled:
+            if registration.get('id'):
+                self._send_remote(f"registrations/{registration['id']}", None)
+            self._send_participant_count(event_id)
+        return cancelled
     
     # Category management
     def get_categories(self) -> List[str]:
         """Get all event categories"""
+        if self.db:
+            return self.db.get_categories()
+        
         return self.load_json(self.categories_file)
     
     def add_category(self, category: str) -> bool:
         """Add new category"""
-        categories = self.load_json(self.categories_file)
+        if self.db:
+            return self.db.add_category(category)
         
-        if category not in categories:
-            categories.append(category)
-            categories.sort()
-            return self.save_json(self.categories_file, categories)
+        with self._lock:
+            categories = self.load_json(self.categories_file)
         
-        return False
+            if category not in categories:
+                categories.append(category)
+                categories.sort()
+                return self.save_json(self.categories_file, categories)
+        
+            return False
     
     # Analytics and insights
     def get_popular_events(self, limit: int = 10) -> List[Dict]:
         """Get most popular events by registration count"""
+        if self.db:
+            return self.db.get_popular_events(limit)
+        
         events = self.get_all_events()
         events.sort(key=lambda x: x['current_participants'], reverse=True)
         return events[:limit]
     
     def get_events_by_date_range(self, start_date: str, end_date: str) -> List[Dict]:
         """Get events within date range"""
-        events = self.get_all_events()
-        return [
-            event for event in events 
-            if start_date <= event['date'] <= end_date
-        ]
\ No newline at end of file
+        if self.db:
+            return self.db.get_events_by_date_range(start_date, end_date)
+        
+        with self._index_lock:
+            index = self._event_index('by_date', lambda events: DateIndex(
+                events, where=lambda event: event.get('is_active', True)))
+            return [event.copy() for event in index.range(start_date, end_date)]
+    
+    # Remote queries, answered from local storage while Firebase is queried in the background
+    def _refresh_in_background(self, name: str, **filters):
+        """Query Firebase for just the matching events on the task runner and merge them in.
+        
+        A newer refresh with the same name supersedes one still queued. The
+        merged events are served by the next call.
+        """
+        def refresh() -> Optional[int]:
+            try:
+                firebase_events = firebase_query("events", **filters)
+            except FirebaseError:
+                return None
+            return self.merge_events(firebase_events_list(firebase_events or {}))
+        
+        self._refresh_tasks[name] = task_runner.submit(refresh, key=f"{name}:{id(self)}")
+    
+    def get_events_by_category(self, category: str) -> List[Dict]:
+        """Get active events in a category, refreshing them from Firebase in the background"""
+        self._refresh_in_background('events_by_category', order_by="category", equal_to=category)
+        return self.search_events('', category)
+    
+    def get_events_by_creator(self, creator_id: str) -> List[Dict]:
+        """Get active events created by a user, refreshing them from Firebase in the background"""
+        self._refresh_in_background('events_by_creator', order_by="creator_id", equal_to=creator_id)
+        return [event for event in self.get_all_events() if event.get('creator_id') == creator_id]
+    
+    def get_events_in_date_range(self, start_date: str, end_date: str) -> List[Dict]:
+        """Get active events dated within a range, refreshing them from Firebase in the background"""
+        self._refresh_in_background('events_in_date_range', order_by="date",
+                                    start_at=start_date, end_at=end_date)
+        return self.get_events_by_date_range(start_date, end_date)
+    
+    def get_events_page(self, start_after: str = None,
+                        limit: int = AppConfig.MAX_EVENTS_PER_LOAD) -> Tuple[List[Dict], Optional[str]]:
+        """Get one page of active events in key (creation) order.
+        
+        Returns (events, next_key); pass next_key back as start_after for the
+        following page. It is None on the last page. The page comes from local
+        storage, and just that page is refreshed from Firebase in the background.
+        """
+        # One past the page, so local storage learns whether there is a next page,
+        # and one more when startAt (inclusive) returns the previous page's last key
+        fetch = limit + 2 if start_after else limit + 1
+        self._refresh_in_background('events_page', order_by="$key", start_at=start_after,
+                                    limit_to_first=fetch)
+        
+        events = sorted(self.get_all_events(), key=lambda event: str(event.get('id') or ""))
+        keys = [str(event.get('id') or "") for event in events]
+        start = bisect.bisect_right(keys, start_after) if start_after else 0
+        has_more = start + limit < len(keys)
+        return events[start:start + limit], keys[start + limit - 1] if has_more else None
+    
+    def get_event_keys(self) -> List[str]:
+        """List the IDs of the local active events; get_all_events syncs them in the background"""
+        return sorted(event['id'] for event in self.get_all_events() if event.get('id'))
\ No newline at end of file
@@ -1,14 +1,25 @@
+import json
+import os
 import smtplib
+import threading
+import time
+import uuid
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from typing import Callable, Dict, List, Optional
+from kivy.logger import Logger
 
-def send_event_email(event_name, event_date, recipient_email):
-    smtp_server = "smtp.gmail.com"
-    smtp_port = 587
+SMTP_SERVER = "smtp.gmail.com"
+SMTP_PORT = 587
+SENDER_EMAIL = "volunteerapp29@gmail.com"
+SENDER_PASSWORD = "bvtc znga zvtv egyz"  # Your app password here
+
+EMAIL_OUTBOX_FILE = "data/email_outbox.json"
+# Close the SMTP session after this many idle seconds
+SMTP_IDLE_TIMEOUT = 60
 
-    sender_email = "volunteerapp29@gmail.com"
-    sender_password = "bvtc znga zvtv egyz"  # Your app password here
 
+def build_event_email(event_name, event_date, recipient_email, sender_email=SENDER_EMAIL):
     msg = MIMEMultipart()
     msg['From'] = sender_email
     msg['To'] = recipient_email
@@ -26,11 +37,16 @@ Thank you,
 Ripple App
 """
     msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+
+def send_event_email(event_name, event_date, recipient_email):
+    msg = build_event_email(event_name, event_date, recipient_email)
 
     try:
-        smtp = smtplib.SMTP(smtp_server, smtp_port)
+        smtp = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
         smtp.starttls()
-        smtp.login(sender_email, sender_password)
+        smtp.login(SENDER_EMAIL, SENDER_PASSWORD)
         smtp.send_message(msg)
         smtp.quit()
         print(f"Email sent to {recipient_email} successfully.")
@@ -38,3 +54,228 @@ Ripple App
     except Exception as e:
         print(f"Failed to send email: {e}")
         return False
+
+
+def queue_event_email(event_name, event_date, recipient_email,
+                      on_status: Optional[Callable] = None) -> Optional[str]:
+    """Queue the new-event email for background delivery; returns its message ID"""
+    msg = build_event_email(event_name, event_date, recipient_email, email_outbox.sender_email)
+    return email_outbox.enqueue(recipient_email, msg.as_string(), on_status)
+
+
+class EmailOutbox:
+    """Emails waiting to be sent, kept on disk and delivered by a background thread.
+
+    The worker keeps one authenticated SMTP session open while there is mail
+    to send and closes it after SMTP_IDLE_TIMEOUT seconds without any. A
+    failed message is retried with exponential backoff up to max_attempts
+    times. Status callbacks get (message_id, status, error) with status
+    "sent", "retrying" or "failed", and run on the worker thread.
+    """
+
+    def __init__(self, host: str = SMTP_SERVER, port: int = SMTP_PORT,
+                 username: Optional[str] = SENDER_EMAIL, password: Optional[str] = SENDER_PASSWORD,
+                 use_tls: bool = True, sender_email: str = SENDER_EMAIL,
+                 file_path: str = EMAIL_OUTBOX_FILE, max_attempts: int = 5,
+                 backoff_base: float = 5.0, backoff_max: float = 600.0, timeout: float = 30.0,
+                 on_status: Optional[Callable] = None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.sender_email = sender_email
+        self.file_path = file_path
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.on_status = on_status
+        self.sessions_opened = 0
+
+        self._lock = threading.RLock()
+        self._messages = None
+        self._callbacks = {}
+        self._smtp = None
+        self._last_used = 0.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enqueue(self, recipient: str, message: str,
+                on_status: Optional[Callable] = None) -> Optional[str]:
+        """Store a message for delivery and wake the worker; None if it could not be saved"""
+        message_id = str(uuid.uuid4())
+        with self._lock:
+            self._load().append({
+                'id': message_id,
+                'to': recipient,
+                'message': message,
+                'attempts': 0,
+                'next_attempt': 0
+            })
+            if not self._save():
+                self._messages.pop()
+                return None
+            if on_status:
+                self._callbacks[message_id] = on_status
+        self.start()
+        self._wake.set()
+        return message_id
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                message = self._next_due()
+                if message is None:
+                    self._wait_for_work()
+                    continue
+                self._deliver(message)
+        finally:
+            self._close_session()
+
+    def _next_due(self) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            return next((message for message in self._load() if message['next_attempt'] <= now), None)
+
+    def _wait_for_work(self):
+        """Sleep until a retry is due or mail is queued, closing an idle session"""
+        with self._lock:
+            retry_at = min((message['next_attempt'] for message in self._load()), default=None)
+        timeout = None if retry_at is None else max(0.0, retry_at - time.time())
+        if self._smtp is not None:
+            idle_left = self._last_used + SMTP_IDLE_TIMEOUT - time.monotonic()
+            if idle_left <= 0:
+                self._close_session()
+            else:
+                timeout = idle_left if timeout is None else min(timeout, idle_left)
+        self._wake.wait(timeout)
+        self._wake.clear()
+
+    def _deliver(self, message: Dict):
+        try:
+            self._send(message)
+        except (smtplib.SMTPException, OSError) as e:
+            self._close_session()
+            self._failed(message, e)
+            return
+        with self._lock:
+            self._messages = [queued for queued in self._load() if queued['id'] != message['id']]
+            self._save()
+        Logger.info(f"EmailSender: Sent email to {message['to']}")
+        self._report(message['id'], 'sent', None)
+
+    def _send(self, message: Dict):
+        reused = self._smtp is not None
+        try:
+            self._session().sendmail(self.sender_email, [message['to']], message['message'])
+        except smtplib.SMTPServerDisconnected:
+            if not reused:
+                raise
+            # The server dropped the idle session; reconnect once
+            self._close_session()
+            self._session().sendmail(self.sender_email, [message['to']], message['message'])
+        self._last_used = time.monotonic()
+
+    def _session(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.use_tls:
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password)
+            except (smtplib.SMTPException, OSError):
+                smtp.close()
+                raise
+            self._smtp = smtp
+            self.sessions_opened += 1
+        return self._smtp
+
+    def _close_session(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
+
+    def _failed(self, message: Dict, error: Exception):
+        with self._lock:
+            message['attempts'] += 1
+            if message['attempts'] >= self.max_attempts:
+                self._messages = [queued for queued in self._load() if queued['id'] != message['id']]
+                status = 'failed'
+            else:
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (message['attempts'] - 1))
+                message['next_attempt'] = time.time() + delay
+                status = 'retrying'
+            self._save()
+        Logger.warning(f"EmailSender: Email to {message['to']} {status} after "
+                       f"{message['attempts']} attempts - {error}")
+        self._report(message['id'], status, str(error))
+
+    def _report(self, message_id: str, status: str, error: Optional[str]):
+        with self._lock:
+            callbacks = [self.on_status]
+            if status == 'retrying':
+                callbacks.append(self._callbacks.get(message_id))
+            else:
+                callbacks.append(self._callbacks.pop(message_id, None))
+        for callback in callbacks:
+            if callback:
+                try:
+                    callback(message_id, status, error)
+                except Exception as e:
+                    Logger.error(f"EmailSender: Status callback failed - {e}")
+
+    def _load(self) -> List[Dict]:
+        if self._messages is None:
+            try:
+                with open(self.file_path, "r", encoding='utf-8') as f:
+                    content = f.read().strip()
+                self._messages = json.loads(content) if content else []
+            except FileNotFoundError:
+                self._messages = []
+            except (json.JSONDecodeError, OSError) as e:
+                Logger.error(f"EmailSender: Error loading {self.file_path} - {e}")
+                self._messages = []
+        return self._messages
+
+    def _save(self) -> bool:
+        tmp_path = f"{self.file_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding='utf-8') as f:
+                json.dump(self._messages, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.file_path)
+            return True
+        except OSError as e:
+            Logger.error(f"EmailSender: Error saving {self.file_path} - {e}")
+            return False
+
+
+# Shared outbox used by the screens
+email_outbox = EmailOutbox()
@@ -8,8 +8,16 @@ from kivy.clock import Clock
 from kivy.logger import Logger
 from kivy.metrics import dp
 from kivy.graphics import Color, RoundedRectangle
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Union
+import importlib
+import time
 import traceback
+from utils.task_runner import task_runner, Task
+
+# Tasks quicker than this finish without flashing the loading popup
+LOADING_DELAY = 0.2
+# Seconds between building screens ahead of time, one per frame
+PREBUILD_INTERVAL = 0.25
 
 class EnhancedScreenManager(ScreenManager):
     """Enhanced screen manager with transitions, error handling, and navigation history"""
@@ -31,7 +39,77 @@ class EnhancedScreenManager(ScreenManager):
         # Error handling
         self.error_popup = None
         self.loading_popup = None
-        
+        # Background tasks the loading popup is shown for
+        self._loading_tasks = 0
+        
+        # Screens registered but not built yet, and the ones to build ahead from each screen
+        self.screen_factories: Dict[str, Union[str, Callable]] = {}
+        self.next_screens: Dict[str, List[str]] = {}
+        self._prebuild_queue = []
+        self._prebuild_event = None
+        
+    def register_screen(self, name: str, factory: Union[str, Callable],
+                        next_screens: Optional[List[str]] = None):
+        """Register a screen to be built the first time it is needed.
+        
+        factory is a Screen class or callable taking name=, or a dotted
+        "module.Class" path imported only when the screen is built.
+        next_screens are built ahead, while idle, once this one is shown.
+        """
+        self.screen_factories[name] = factory
+        if next_screens:
+            self.next_screens[name] = list(next_screens)
+    
+    def get_screen(self, name):
+        if name in self.screen_factories:
+            self._build_screen(name)
+        return super().get_screen(name)
+    
+    def has_screen(self, name):
+        return name in self.screen_factories or super().has_screen(name)
+    
+    def on_current(self, instance, value):
+        super().on_current(instance, value)
+        if value is not None:
+            self.prebuild(self.next_screens.get(value, []))
+    
+    def prebuild(self, names: List[str]):
+        """Build registered screens ahead of time, one per frame while no transition runs"""
+        for name in names:
+            if name in self.screen_factories and name not in self._prebuild_queue:
+                self._prebuild_queue.append(name)
+        if self._prebuild_queue and self._prebuild_event is None:
+            self._prebuild_event = Clock.schedule_once(self._prebuild_next, PREBUILD_INTERVAL)
+    
+    def _prebuild_next(self, dt):
+        self._prebuild_event = None
+        # Building during a transition would cost it frames
+        if not self.transition.is_active:
+            name = self._prebuild_queue.pop(0)
+            if name in self.screen_factories:
+                try:
+                    self._build_screen(name)
+                except Exception as e:
+                    Logger.error(f"ScreenManager: Could not prebuild {name}: {e}")
+        if self._prebuild_queue:
+            self._prebuild_event = Clock.schedule_once(self._prebuild_next, PREBUILD_INTERVAL)
+    
+    def _build_screen(self, name: str):
+        factory = self.screen_factories.pop(name)
+        started = time.perf_counter()
+        try:
+            if isinstance(factory, str):
+                module_name, _, class_name = factory.rpartition('.')
+                factory = getattr(importlib.import_module(module_name), class_name)
+            screen = factory(name=name)
+        except Exception:
+            # Keep it registered so a later attempt can report the error again
+            self.screen_factories[name] = factory
+            raise
+        self.add_widget(screen)
+        Logger.info(f"ScreenManager: Built {name} in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return screen
+    
     def switch_to_screen(self, screen_name: str, direction: str = None, save_history: bool = True):
         """Switch to screen with custom transition and error handling"""
         try:
@@ -200,6 +278,31 @@ class EnhancedScreenManager(ScreenManager):
             self.loading_popup.dismiss()
             self.loading_popup = None
     
+    def run_task(self, func: Callable, *args, on_result: Callable = None, on_error: Callable = None,
+                 key: str = None, loading: Optional[str] = "Loading...", **kwargs) -> Task:
+        """Run func on the task runner, with the loading popup up while it is slow.
+        
+        Results come back on the UI thread. A new task with the same key
+        cancels the previous one. Pass loading=None to run without the popup.
+        """
+        show_event = None
+        if loading:
+            self._loading_tasks += 1
+            show_event = Clock.schedule_once(lambda dt: self.show_loading(loading), LOADING_DELAY)
+        
+        def on_done():
+            if show_event is None:
+                return
+            show_event.cancel()
+            self._loading_tasks -= 1
+            if not self._loading_tasks:
+                self.hide_loading()
+        
+        if on_error is None:
+            on_error = lambda error: self.handle_screen_error(self.current, error)
+        return task_runner.submit(func, *args, on_result=on_result, on_error=on_error,
+                                  on_done=on_done, key=key, **kwargs)
+    
     def show_success(self, title: str, message: str, callback: Callable = None):
         """Show success popup"""
         content = BoxLayout(orientation='vertical', spacing=dp(15), padding=dp(20))
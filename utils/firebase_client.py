@@ -0,0 +1,290 @@
+# utils/firebase_client.py - Pooled REST client for the Firebase Realtime Database
+import json
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from kivy.logger import Logger
+from utils.app_config import AppConfig
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Methods that are safe to send twice
+IDEMPOTENT_METHODS = {'GET', 'PUT', 'PATCH', 'DELETE'}
+# Written as a value, Firebase replaces it with its own time in milliseconds
+SERVER_TIMESTAMP = {'.sv': 'timestamp'}
+
+
+class FirebaseError(Exception):
+    """A call that got no usable answer: refused by the breaker, failed or not JSON"""
+
+
+class CircuitBreaker:
+    """Stops calling a service that keeps failing, then probes it once in a while.
+
+    Closed, calls go through and consecutive failures are counted. At
+    failure_threshold the breaker opens and calls are refused outright for
+    reset_timeout seconds. It then goes half-open: one probe call is let
+    through, and its result closes the breaker again or reopens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; in half-open only the probe may"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                Logger.info("FirebaseClient: Circuit closed, Firebase is reachable again")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    Logger.warning(f"FirebaseClient: Circuit open after {self._failures} failures, "
+                                   f"using local data for {self.reset_timeout:.0f}s")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class FirebaseClient:
+    """REST client for one Firebase database on a shared keep-alive session.
+
+    All calls go through one requests.Session, so connections are pooled and
+    reused instead of doing a TCP and TLS handshake per call. Failed calls are
+    retried with exponential backoff and full jitter. POST is only retried
+    when the connection could not be opened, since a lost response could
+    otherwise create a duplicate record. Each call's latency is recorded.
+    While the circuit breaker is open, calls return None at once so callers
+    fall back to local data without waiting on the network.
+    """
+
+    def __init__(self, base_url: str, timeout: float = AppConfig.API_TIMEOUT,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 pool_size: int = 10, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._metrics_lock = threading.Lock()
+        self._metrics = {}
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}{path.strip('/')}.json"
+
+    def get(self, path: str, params: Optional[Dict] = None) -> Any:
+        return self.request('GET', path, params=params)
+
+    def query(self, path: str, order_by: str = '$key', equal_to: Any = None,
+              start_at: Any = None, end_at: Any = None, limit_to_first: int = None,
+              limit_to_last: int = None) -> Optional[Dict]:
+        """Get only the children of path that match a server-side filter.
+        
+        order_by is a child key, or "$key"/"$value". Filtering on a child key
+        needs an ".indexOn" rule for it in database.rules.json. The server
+        returns an unordered object, so callers sort the results themselves.
+        """
+        params = {'orderBy': json.dumps(order_by)}
+        for name, value in (('equalTo', equal_to), ('startAt', start_at), ('endAt', end_at)):
+            if value is not None:
+                params[name] = json.dumps(value)
+        if limit_to_first is not None:
+            params['limitToFirst'] = int(limit_to_first)
+        if limit_to_last is not None:
+            params['limitToLast'] = int(limit_to_last)
+        return self.get(path, params=params)
+
+    def shallow(self, path: str) -> List[str]:
+        """List the child keys of path without downloading their contents; raises FirebaseError"""
+        result = self.get(path, params={'shallow': 'true'})
+        return list(result.keys()) if isinstance(result, dict) else []
+
+    def put(self, path: str, data: Any) -> Any:
+        return self.request('PUT', path, data=data)
+
+    def post(self, path: str, data: Any) -> Any:
+        return self.request('POST', path, data=data)
+
+    def patch(self, path: str, data: Any) -> Any:
+        return self.request('PATCH', path, data=data)
+
+    def delete(self, path: str) -> Any:
+        return self.request('DELETE', path)
+
+    def request(self, method: str, path: str, data: Any = None,
+                params: Optional[Dict] = None) -> Any:
+        """Send a request and return the decoded JSON body.
+
+        A JSON null body comes back as None; a call that failed raises
+        FirebaseError, so callers can tell an empty node from an outage.
+        """
+        if not self.breaker.allow():
+            self._record_rejected(method)
+            raise FirebaseError(f"{method} {path} refused, circuit open")
+        # A half-open probe gets a single attempt
+        max_retries = 0 if self.breaker.state == CircuitBreaker.HALF_OPEN else self.max_retries
+        url = self.url(path)
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            retry_after = None
+            try:
+                response = self.session.request(method, url, json=data, params=params,
+                                                timeout=self.timeout)
+                if response.status_code in RETRY_STATUSES:
+                    retry_after = response.headers.get('Retry-After')
+                response.raise_for_status()
+                result = response.json()
+                self.breaker.record_success()
+                self._record(method, time.perf_counter() - started, ok=True, retried=attempt)
+                return result
+            except requests.JSONDecodeError as e:
+                # The server answered with something that isn't JSON; a subclass of
+                # RequestException, so it has to be caught before it
+                self.breaker.record_success()
+                self._record(method, time.perf_counter() - started, ok=False, retried=attempt)
+                Logger.error(f"FirebaseClient: Bad response to {method} {path} - {e}")
+                raise FirebaseError(f"Bad response to {method} {path}") from e
+            except requests.RequestException as e:
+                elapsed = time.perf_counter() - started
+                if (attempt < max_retries and self._should_retry(method, e)
+                        and self.breaker.state == CircuitBreaker.CLOSED):
+                    attempt += 1
+                    delay = self._backoff(attempt, retry_after)
+                    Logger.warning(f"FirebaseClient: {method} {path} failed ({e}), "
+                                   f"retry {attempt}/{max_retries} in {delay:.2f}s")
+                    self._record(method, elapsed, ok=False, retried=0, final=False)
+                    time.sleep(delay)
+                    continue
+                if self._is_outage(e):
+                    self.breaker.record_failure()
+                else:
+                    # The server answered, so it is up even if it refused this call
+                    self.breaker.record_success()
+                self._record(method, elapsed, ok=False, retried=attempt)
+                Logger.error(f"FirebaseClient: {method} {path} failed - {e}")
+                raise FirebaseError(f"{method} {path} failed") from e
+
+    def get_metrics(self) -> Dict[str, Dict]:
+        """Per-method call counts, failures, retries and latency in milliseconds"""
+        with self._metrics_lock:
+            metrics = {}
+            for method, stats in self._metrics.items():
+                attempts = stats['attempts']
+                metrics[method] = {
+                    'calls': stats['calls'],
+                    'failures': stats['failures'],
+                    'retries': stats['retries'],
+                    'rejected': stats['rejected'],
+                    'avg_ms': round(stats['total'] / attempts * 1000, 2) if attempts else 0,
+                    'max_ms': round(stats['max'] * 1000, 2),
+                    'last_ms': round(stats['last'] * 1000, 2),
+                }
+            return metrics
+
+    def reset_metrics(self):
+        with self._metrics_lock:
+            self._metrics.clear()
+
+    def close(self):
+        self.session.close()
+
+    def _should_retry(self, method: str, error: requests.RequestException) -> bool:
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        if method not in IDEMPOTENT_METHODS:
+            return False
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+        response = getattr(error, 'response', None)
+        return response is not None and response.status_code in RETRY_STATUSES
+
+    def _is_outage(self, error: requests.RequestException) -> bool:
+        """Whether a failure means Firebase is unreachable or failing, not just refusing"""
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+        response = getattr(error, 'response', None)
+        return response is None or response.status_code in RETRY_STATUSES
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Full-jitter exponential backoff, or the server's Retry-After if it sent one"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _record(self, method: str, elapsed: float, ok: bool, retried: int, final: bool = True):
+        """Add one attempt to the metrics; final marks the attempt that ended the call"""
+        with self._metrics_lock:
+            stats = self._new_stats(method)
+            stats['attempts'] += 1
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], elapsed)
+            stats['last'] = elapsed
+            if final:
+                stats['calls'] += 1
+                stats['retries'] += retried
+                if not ok:
+                    stats['failures'] += 1
+
+    def _record_rejected(self, method: str):
+        """Count a call the open circuit refused without touching the network"""
+        with self._metrics_lock:
+            stats = self._new_stats(method)
+            stats['calls'] += 1
+            stats['failures'] += 1
+            stats['rejected'] += 1
+
+    def _new_stats(self, method: str) -> Dict:
+        return self._metrics.setdefault(method, {
+            'calls': 0, 'failures': 0, 'retries': 0, 'rejected': 0,
+            'attempts': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0
+        })
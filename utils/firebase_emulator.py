@@ -0,0 +1,382 @@
+# utils/firebase_emulator.py - Local stand-in for the Firebase Realtime Database REST API
+import argparse
+import json
+import queue
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# Seconds between keep-alive events on idle streams, as Firebase does
+KEEP_ALIVE_INTERVAL = 30
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+
+
+def _split(path: str) -> List[str]:
+    return [part for part in path.split('/') if part]
+
+
+def _resolve_server_values(value: Any, now: int) -> Any:
+    """Replace {".sv": "timestamp"} placeholders with the server time, as Firebase does"""
+    if not isinstance(value, dict):
+        return value
+    if value == {'.sv': 'timestamp'}:
+        return now
+    return {key: _resolve_server_values(child, now) for key, child in value.items()}
+
+
+def _order_key(value) -> Tuple:
+    """Firebase ordering across types: null, false, true, numbers, strings, objects"""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, str):
+        return (3, value)
+    return (4, 0)
+
+
+class FirebaseEmulator:
+    """In-process HTTP server speaking the subset of the Realtime Database REST API the app uses.
+
+    Supports GET/PUT/POST/PATCH/DELETE on ".json" paths, multi-path PATCH,
+    orderBy/equalTo/startAt/endAt/limitToFirst/limitToLast/shallow queries,
+    {".sv": "timestamp"} server values and text/event-stream listeners. Every request can be delayed by latency
+    seconds, and fails with failure_status at failure_rate or while
+    fail_next() has failures left. Point the app at it by setting
+    RIPPLE_FIREBASE_URL to its url.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 failure_rate: float = 0.0, failure_status: int = 503, data: Optional[Dict] = None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.data = data or {}
+        self.request_count = 0
+        self._forced_failures = []
+        self._listeners = []
+        self._lock = threading.RLock()
+        self._server = None
+        self._thread = None
+        self._clock = 0
+        self._push_time = 0
+        self._push_suffix = []
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    def start(self) -> 'FirebaseEmulator':
+        emulator = self
+
+        class Handler(_EmulatorHandler):
+            pass
+        Handler.emulator = emulator
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="firebase-emulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._lock:
+            for listener in self._listeners:
+                listener[1].put(None)
+            self._listeners = []
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def fail_next(self, count: int = 1, status: int = None):
+        """Make the next count requests fail with status (default failure_status)"""
+        with self._lock:
+            self._forced_failures.extend([status or self.failure_status] * count)
+
+    def get(self, path: str = "") -> Any:
+        with self._lock:
+            return json.loads(json.dumps(self._node(_split(path))))
+
+    def set(self, path: str, value: Any):
+        """Write a value directly, notifying stream listeners"""
+        with self._lock:
+            value = _resolve_server_values(value, self._now())
+            self._write(_split(path), value)
+            self._notify('put', _split(path), value)
+
+    # Request handling, called from the handler threads
+
+    def injected_failure(self) -> Optional[int]:
+        with self._lock:
+            self.request_count += 1
+            if self._forced_failures:
+                return self._forced_failures.pop(0)
+        if self.failure_rate and random.random() < self.failure_rate:
+            return self.failure_status
+        return None
+
+    def read(self, parts: List[str], params: Dict[str, str]) -> Any:
+        with self._lock:
+            node = json.loads(json.dumps(self._node(parts)))
+        if params.get('shallow') == 'true':
+            return {key: True for key in node} if isinstance(node, dict) else node
+        if 'orderBy' in params and isinstance(node, dict):
+            return self._query(node, params)
+        return node
+
+    def put(self, parts: List[str], value: Any) -> Any:
+        with self._lock:
+            value = _resolve_server_values(value, self._now())
+            self._write(parts, value)
+            self._notify('put', parts, value)
+        return value
+
+    def post(self, parts: List[str], value: Any) -> Dict:
+        with self._lock:
+            key = self._push_key()
+            value = _resolve_server_values(value, self._now())
+            self._write(parts + [key], value)
+            self._notify('put', parts + [key], value)
+        return {'name': key}
+
+    def patch(self, parts: List[str], updates: Dict) -> Dict:
+        with self._lock:
+            updates = _resolve_server_values(updates, self._now())
+            for child, value in updates.items():
+                self._write(parts + _split(child), value)
+            self._notify('patch', parts, updates)
+        return updates
+
+    def listen(self, parts: List[str]) -> queue.Queue:
+        """Register a stream listener; its queue gets (event, data) pairs, None to close"""
+        events = queue.Queue()
+        with self._lock:
+            events.put(('put', {'path': '/', 'data': json.loads(json.dumps(self._node(parts)))}))
+            self._listeners.append((parts, events))
+        return events
+
+    def unlisten(self, events: queue.Queue):
+        with self._lock:
+            self._listeners = [listener for listener in self._listeners if listener[1] is not events]
+
+    def _now(self) -> int:
+        """Server time in milliseconds, never the same twice so writes stay ordered"""
+        self._clock = max(int(time.time() * 1000), self._clock + 1)
+        return self._clock
+
+    def _node(self, parts: List[str]) -> Any:
+        node = self.data
+        for part in parts:
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    def _write(self, parts: List[str], value: Any):
+        """Set a value, deleting it for None and pruning parents left empty"""
+        if not parts:
+            self.data = value if isinstance(value, dict) else {}
+            return
+        node = self.data
+        trail = []
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                if value is None:
+                    return
+                child = node[part] = {}
+            trail.append((node, part))
+            node = child
+        if value is None or value == {}:
+            node.pop(parts[-1], None)
+            for parent, part in reversed(trail):
+                if parent[part]:
+                    break
+                del parent[part]
+        else:
+            node[parts[-1]] = json.loads(json.dumps(value))
+
+    def _notify(self, event: str, parts: List[str], data: Any):
+        for listen_parts, events in self._listeners:
+            depth = len(listen_parts)
+            if parts[:depth] == listen_parts:
+                # Change at or below the listened path
+                path = "/" + "/".join(parts[depth:])
+                events.put((event, {'path': path, 'data': data}))
+            elif listen_parts[:len(parts)] == parts:
+                # Change above it: send the listened node's new value
+                node = json.loads(json.dumps(self._node(listen_parts)))
+                events.put(('put', {'path': '/', 'data': node}))
+
+    def _query(self, node: Dict, params: Dict[str, str]) -> Dict:
+        order_by = json.loads(params['orderBy'])
+        if order_by == '$key':
+            value_of = lambda item: item[0]
+        elif order_by == '$value':
+            value_of = lambda item: item[1]
+        else:
+            value_of = lambda item: item[1].get(order_by) if isinstance(item[1], dict) else None
+        items = sorted(node.items(), key=lambda item: (_order_key(value_of(item)), item[0]))
+
+        if 'equalTo' in params:
+            target = _order_key(json.loads(params['equalTo']))
+            items = [item for item in items if _order_key(value_of(item)) == target]
+        if 'startAt' in params:
+            start = _order_key(json.loads(params['startAt']))
+            items = [item for item in items if _order_key(value_of(item)) >= start]
+        if 'endAt' in params:
+            end = _order_key(json.loads(params['endAt']))
+            items = [item for item in items if _order_key(value_of(item)) <= end]
+        if 'limitToFirst' in params:
+            items = items[:int(params['limitToFirst'])]
+        if 'limitToLast' in params:
+            items = items[-int(params['limitToLast']):]
+        return dict(items)
+
+    def _push_key(self) -> str:
+        """Chronologically ordered key like the ones Firebase generates"""
+        now = int(time.time() * 1000)
+        if now == self._push_time:
+            for i in range(len(self._push_suffix) - 1, -1, -1):
+                if self._push_suffix[i] < 63:
+                    self._push_suffix[i] += 1
+                    break
+                self._push_suffix[i] = 0
+        else:
+            self._push_time = now
+            self._push_suffix = [random.randrange(64) for _ in range(12)]
+        prefix = ""
+        for _ in range(8):
+            prefix = PUSH_CHARS[now % 64] + prefix
+            now //= 64
+        return prefix + "".join(PUSH_CHARS[i] for i in self._push_suffix)
+
+
+class _EmulatorHandler(BaseHTTPRequestHandler):
+    emulator: FirebaseEmulator = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _handle(self, method: str):
+        url = urlparse(self.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b""
+
+        if self.emulator.latency:
+            time.sleep(self.emulator.latency)
+        status = self.emulator.injected_failure()
+        if status:
+            return self._send(status, {'error': "Injected failure"})
+        if not url.path.endswith('.json'):
+            return self._send(404, {'error': "Paths must end in .json"})
+        parts = _split(url.path[:-len('.json')])
+
+        try:
+            data = json.loads(body) if body else None
+        except ValueError:
+            return self._send(400, {'error': "Invalid data; couldn't parse JSON object"})
+
+        if method == 'GET':
+            if 'text/event-stream' in self.headers.get('Accept', ''):
+                return self._stream(parts)
+            return self._send(200, self.emulator.read(parts, params))
+        if method == 'PUT':
+            return self._send(200, self.emulator.put(parts, data))
+        if method == 'POST':
+            return self._send(200, self.emulator.post(parts, data))
+        if method == 'PATCH':
+            if not isinstance(data, dict):
+                return self._send(400, {'error': "Invalid data; PATCH needs an object"})
+            return self._send(200, self.emulator.patch(parts, data))
+        return self._send(200, self.emulator.put(parts, None))
+
+    def _send(self, status: int, data: Any):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, parts: List[str]):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        events = self.emulator.listen(parts)
+        try:
+            while True:
+                try:
+                    message = events.get(timeout=KEEP_ALIVE_INTERVAL)
+                except queue.Empty:
+                    message = ('keep-alive', None)
+                if message is None:
+                    break
+                event, data = message
+                self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+        except OSError:
+            pass  # The client went away
+        finally:
+            self.emulator.unlisten(events)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local Firebase Realtime Database emulator")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument('--failure-rate', type=float, default=0.0,
+                        help="Fraction of requests answered with --failure-status")
+    parser.add_argument('--failure-status', type=int, default=503)
+    parser.add_argument('--seed', help="JSON file with the initial database contents")
+    args = parser.parse_args()
+
+    data = None
+    if args.seed:
+        with open(args.seed, "r", encoding='utf-8') as f:
+            data = json.load(f)
+    emulator = FirebaseEmulator(args.host, args.port, args.latency, args.failure_rate,
+                                args.failure_status, data).start()
+    print(f"Firebase emulator listening on {emulator.url} - "
+          f"set RIPPLE_FIREBASE_URL={emulator.url} to use it")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        emulator.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+# utils/firebase_stream.py - Realtime sync from the Firebase REST streaming endpoint
+import json
+import os
+import random
+import socket
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import requests
+import urllib3
+from kivy.logger import Logger
+from utils import storage
+from utils.firebase_client import FirebaseClient
+
+# Firebase sends a keep-alive every 30 seconds, so a silent connection is dead
+STREAM_READ_TIMEOUT = 60
+STREAM_CONNECT_TIMEOUT = 10
+STREAM_CHUNK_SIZE = 64 * 1024
+# Remote event keys mirrored into local storage, kept across restarts
+STREAM_STATE_FILE = "data/event_stream.json"
+
+
+def parse_event_stream(lines: Iterable[str]) -> Iterable[Tuple[str, str]]:
+    """Turn text/event-stream lines into (event, data) pairs"""
+    event, data = None, []
+    for line in lines:
+        if line is None:
+            continue
+        if not line:
+            if event is not None or data:
+                yield event or 'message', "\n".join(data)
+            event, data = None, []
+        elif line.startswith(':'):
+            continue
+        else:
+            field, _, value = line.partition(':')
+            value = value[1:] if value.startswith(' ') else value
+            if field == 'event':
+                event = value
+            elif field == 'data':
+                data.append(value)
+
+
+def read_stream_lines(raw) -> Iterable[str]:
+    """Lines of a streaming response body as soon as they arrive.
+    
+    response.iter_lines() waits for a full chunk before yielding, which would
+    hold back small events until more data came in.
+    """
+    read1 = getattr(raw, 'read1', None)
+    # Pieces of the current line, joined once it is complete
+    pending = []
+    while True:
+        chunk = read1(STREAM_CHUNK_SIZE) if read1 else raw.read(1)
+        if not chunk:
+            break
+        if b"\n" not in chunk:
+            pending.append(chunk)
+            continue
+        lines = chunk.split(b"\n")
+        lines[0] = b"".join(pending) + lines[0]
+        pending = [lines.pop()]
+        for line in lines:
+            yield line.rstrip(b"\r").decode('utf-8')
+    line = b"".join(pending)
+    if line:
+        yield line.rstrip(b"\r").decode('utf-8')
+
+
+def response_socket(response) -> Optional[socket.socket]:
+    """Socket a streaming requests response is read from, if it can be found"""
+    sock = getattr(getattr(response.raw, 'connection', None), 'sock', None)
+    if sock is None:
+        # http.client hands the socket over to the response when the server will close it
+        fp = getattr(getattr(response.raw, '_fp', None), 'fp', None)
+        sock = getattr(getattr(fp, 'raw', None), '_sock', None)
+    return sock
+
+
+class FirebaseStream:
+    """Background listener on one Firebase path.
+
+    Each put/patch the server sends is passed to on_change(event, path, data),
+    where path is relative to the listened path ("/" for the whole node). The
+    connection is reopened with jittered backoff when it drops; the server
+    starts every connection with a put of the full node, so nothing missed
+    while disconnected is lost.
+    """
+
+    def __init__(self, client: FirebaseClient, path: str, on_change: Callable,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0):
+        self.client = client
+        self.path = path
+        self.on_change = on_change
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.connected = False
+        self._stop = threading.Event()
+        self._thread = None
+        self._response = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"firebase-stream-{self.path}",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        response = self._response
+        if response is not None:
+            # Closing the response waits for the listener thread's blocked read,
+            # which only returns with the next keep-alive; shutting the socket
+            # down ends that read at once
+            sock = response_socket(response)
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            response.close()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        attempt = 0
+        while not self._stop.is_set():
+            if self._listen():
+                attempt = 0
+            if self._stop.is_set():
+                break
+            attempt += 1
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            Logger.info(f"FirebaseStream: Reconnecting to {self.path} in {delay:.1f}s")
+            self._stop.wait(delay)
+
+    def _listen(self) -> bool:
+        """Hold one streaming connection open; True if any event arrived on it"""
+        received = False
+        try:
+            response = self.client.session.get(
+                self.client.url(self.path),
+                # The body is read raw, so it must not come back compressed
+                headers={'Accept': 'text/event-stream', 'Accept-Encoding': 'identity'},
+                stream=True,
+                timeout=(STREAM_CONNECT_TIMEOUT, STREAM_READ_TIMEOUT)
+            )
+            self._response = response
+            with response:
+                response.raise_for_status()
+                self.connected = True
+                Logger.info(f"FirebaseStream: Listening to {self.path}")
+                for event, data in parse_event_stream(read_stream_lines(response.raw)):
+                    received = True
+                    if not self._handle(event, data):
+                        break
+        except (requests.RequestException, urllib3.exceptions.HTTPError, AttributeError,
+                ValueError) as e:
+            # Reading response.raw raises urllib3's errors, not requests' (a dropped
+            # connection, the read timeout). Closing the response from stop()
+            # surfaces as an error here too
+            if not self._stop.is_set():
+                Logger.warning(f"FirebaseStream: Connection to {self.path} lost - {e}")
+        finally:
+            self.connected = False
+            self._response = None
+        return received
+
+    def _handle(self, event: str, data: str) -> bool:
+        """Dispatch one server event; False ends the current connection"""
+        if event in ('put', 'patch'):
+            try:
+                message = json.loads(data)
+            except ValueError as e:
+                Logger.error(f"FirebaseStream: Bad {event} message on {self.path} - {e}")
+                return True
+            try:
+                self.on_change(event, message.get('path', '/'), message.get('data'))
+            except Exception as e:
+                Logger.error(f"FirebaseStream: Error applying {event} on {self.path} - {e}")
+            return True
+        if event == 'cancel':
+            # The security rules no longer let us read this path
+            Logger.error(f"FirebaseStream: Server cancelled stream on {self.path} - {data}")
+            self._stop.set()
+            return False
+        if event == 'auth_revoked':
+            Logger.warning(f"FirebaseStream: Credentials for {self.path} expired, reconnecting")
+            return False
+        return True
+
+
+class EventStreamSync:
+    """Keep the local events store in step with Firebase "events" as they change.
+
+    A mirror of the remote node is kept in memory so deltas at any depth can
+    be turned into whole events, which are then merged into local storage.
+    on_update(changed, removed_ids) is called from the listener thread after
+    each delta that changed something locally.
+
+    The keys (and local IDs) of the remote events stored locally are saved to
+    state_file. The first snapshot after a start is compared against them, so
+    events deleted remotely while the app was closed are deleted locally too.
+    Local events never seen on the stream, such as ones still waiting in the
+    outbox, are left alone.
+    """
+
+    def __init__(self, client: FirebaseClient, path: str = "events",
+                 on_update: Optional[Callable] = None, state_file: str = STREAM_STATE_FILE):
+        self.on_update = on_update
+        self.state_file = state_file
+        self._remote = {}
+        self._stored = None
+        self._lock = threading.Lock()
+        self.stream = FirebaseStream(client, path, self.apply)
+
+    def start(self):
+        self.stream.start()
+
+    def stop(self):
+        self.stream.stop()
+
+    def apply(self, event: str, path: str, data) -> int:
+        """Apply one put/patch to the mirror and local storage; returns events changed"""
+        parts = [part for part in path.split('/') if part]
+        with self._lock:
+            stored = self._load_stored()
+            if not parts and event == 'put':
+                # Full snapshot: sent when a connection opens. The first one is
+                # compared with what was stored before the app last stopped
+                previous = self._remote or {key: {'id': event_id} for key, event_id in stored.items()}
+                self._remote = data if isinstance(data, dict) else {}
+                touched = set(previous) | set(self._remote)
+                before = {key: self._event_id(key, previous.get(key)) for key in touched}
+            else:
+                updates = data.items() if event == 'patch' and isinstance(data, dict) else [(None, data)]
+                touched = set()
+                before = {}
+                for child, value in updates:
+                    # Patch keys may themselves be paths ("k1/title")
+                    target = parts + ([part for part in child.split('/') if part]
+                                      if child is not None else [])
+                    if not target:
+                        continue
+                    if target[0] not in before:
+                        before[target[0]] = self._event_id(target[0], self._remote.get(target[0]))
+                    touched.add(target[0])
+                    self._set(target, value)
+
+            changed, removed_ids = self._delta(touched, before)
+            keys = {key: self._event_id(key, self._remote.get(key)) for key in touched}
+
+            count = storage.merge_remote_events(changed, removed_ids) if changed or removed_ids else 0
+            # Only after the merge, so a key is never forgotten before its event is deleted
+            self._save_stored(keys)
+
+        if count and self.on_update:
+            self.on_update(changed, removed_ids)
+        return count
+
+    def _load_stored(self) -> Dict[str, str]:
+        """Remote event key -> local ID of the events stored locally"""
+        if self._stored is None:
+            try:
+                with open(self.state_file, "r", encoding='utf-8') as f:
+                    content = f.read().strip()
+                self._stored = json.loads(content) if content else {}
+            except FileNotFoundError:
+                self._stored = {}
+            except (json.JSONDecodeError, OSError) as e:
+                Logger.error(f"EventStreamSync: Error loading {self.state_file} - {e}")
+                self._stored = {}
+        return self._stored
+
+    def _save_stored(self, keys: Dict[str, Optional[str]]):
+        """Record the touched keys' local IDs (None for gone), writing only if one changed"""
+        stored = self._load_stored()
+        if all(stored.get(key) == event_id for key, event_id in keys.items()):
+            return
+        for key, event_id in keys.items():
+            if event_id is None:
+                stored.pop(key, None)
+            else:
+                stored[key] = event_id
+        tmp_path = f"{self.state_file}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding='utf-8') as f:
+                json.dump(stored, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            Logger.error(f"EventStreamSync: Error saving {self.state_file} - {e}")
+
+    def _set(self, parts: List[str], value):
+        """Set or (for None) delete a value in the mirror"""
+        node = self._remote
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                if value is None:
+                    return
+                child = node[part] = {}
+            node = child
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = value
+        # Firebase drops nodes left empty
+        if len(parts) > 1 and not self._remote.get(parts[0]):
+            self._remote.pop(parts[0], None)
+
+    def _event_id(self, key: str, value) -> Optional[str]:
+        """Local ID of a remote event, or None if the node is not an event"""
+        return value.get('id', key) if isinstance(value, dict) else None
+
+    def _delta(self, keys, before: Dict) -> Tuple[List[Dict], List[str]]:
+        """Events now present under the touched keys, and IDs of those that went away"""
+        changed, removed_ids = [], []
+        for key in keys:
+            current = self._remote.get(key)
+            if isinstance(current, dict):
+                event = json.loads(json.dumps(current))
+                event['id'] = event.get('id', key)
+                changed.append(event)
+            elif before.get(key) is not None:
+                removed_ids.append(before[key])
+        return changed, removed_ids
@@ -0,0 +1,499 @@
+# utils/indexes.py - In-memory indexes over stored records
+import base64
+import bisect
+import itertools
+import json
+import math
+import re
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Fields events can be listed by, and the type their values are compared as
+PAGE_SORT_FIELDS = {
+    'created_at': str,
+    'date': str,
+    'title': str,
+    'current_participants': int,
+}
+
+
+# Event fields covered by text search
+SEARCH_FIELDS = ('title', 'description', 'location')
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(str(text or "").lower())
+
+
+# Spatial grid: cell size in degrees, so a default 50 km search spans a few cells
+GEO_CELL_DEGREES = 0.5
+EARTH_RADIUS_KM = 6371
+
+
+def has_coordinates(record: Dict) -> bool:
+    """Whether a record has a usable latitude and longitude"""
+    return bool(record.get('latitude')) and bool(record.get('longitude'))
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float):
+    """Latitude range and longitude ranges enclosing a circle on the globe.
+
+    Returns (lat_min, lat_max, lon_ranges). The longitude range is split in
+    two where it crosses the antimeridian, and covers every longitude when
+    the circle contains a pole.
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    lat_min = latitude - math.degrees(angular)
+    lat_max = latitude + math.degrees(angular)
+    if lat_min <= -90 or lat_max >= 90:
+        return max(lat_min, -90.0), min(lat_max, 90.0), [(-180.0, 180.0)]
+
+    # Widest longitude offset of the circle, reached north/south of the centre
+    dlon = math.degrees(math.asin(min(1.0, math.sin(angular) / math.cos(math.radians(latitude)))))
+    lon_min, lon_max = longitude - dlon, longitude + dlon
+    if dlon >= 180:
+        lon_ranges = [(-180.0, 180.0)]
+    elif lon_min < -180:
+        lon_ranges = [(lon_min + 360, 180.0), (-180.0, lon_max)]
+    elif lon_max > 180:
+        lon_ranges = [(lon_min, 180.0), (-180.0, lon_max - 360)]
+    else:
+        lon_ranges = [(lon_min, lon_max)]
+    return lat_min, lat_max, lon_ranges
+
+
+def date_ordinal(value) -> Optional[int]:
+    """Day number of a YYYY-MM-DD date, or None if it doesn't parse"""
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').toordinal()
+    except ValueError:
+        return None
+
+
+def parse_sort(sort: str) -> Tuple[str, bool]:
+    """Split a sort spec like "-created_at" into (field, descending)"""
+    field = sort.lstrip('-')
+    if field not in PAGE_SORT_FIELDS:
+        raise ValueError(f"Unsupported sort field '{field}'")
+    return field, sort.startswith('-')
+
+
+def sort_value(record: Dict, field: str):
+    """Value of a sort field, with missing values ordered first"""
+    value = record.get(field)
+    if PAGE_SORT_FIELDS[field] is int:
+        try:
+            return int(value or 0)
+        except (TypeError, ValueError):
+            return 0
+    return str(value or "")
+
+
+def encode_cursor(sort: str, key: Tuple) -> str:
+    """Opaque cursor pointing just past the record with this sort key"""
+    payload = json.dumps([sort, list(key)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple:
+    """Sort key stored in a cursor, checked against the requested sort"""
+    try:
+        cursor_sort, key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Malformed cursor - {e}")
+    if cursor_sort != sort:
+        raise ValueError(f"Cursor was issued for sort '{cursor_sort}', not '{sort}'")
+    return tuple(key)
+
+
+class SortedIndex:
+    """Records ordered by one field, for keyset pagination.
+
+    Keys are (value, id) so every record has a unique position, and a page
+    starts with a binary search for the last key of the previous page.
+    apply() moves just the records a write changed to their new positions.
+    """
+
+    def __init__(self, field: str, records: Iterable[Dict] = (),
+                 where: Optional[Callable[[Dict], bool]] = None):
+        self.field = field
+        self.where = where
+        pairs = sorted(((self.key(record), record) for record in records
+                        if not where or where(record)), key=lambda pair: pair[0])
+        self.keys = [key for key, _ in pairs]
+        self.records = [record for _, record in pairs]
+        self.entries = {record['id']: key for key, record in pairs if record.get('id') is not None}
+
+    def key(self, record: Dict) -> Tuple:
+        return (sort_value(record, self.field), str(record.get('id') or ""))
+
+    def add(self, record: Dict):
+        """Insert a record in key order, replacing any earlier version with the same ID"""
+        record_id = record.get('id')
+        if record_id is not None:
+            self.remove(record_id)
+        if self.where and not self.where(record):
+            return
+        key = self.key(record)
+        position = bisect.bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.records.insert(position, record)
+        if record_id is not None:
+            self.entries[record_id] = key
+
+    def remove(self, record_id):
+        key = self.entries.pop(record_id, None)
+        if key is None:
+            return
+        position = bisect.bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            del self.keys[position]
+            del self.records[position]
+
+    def apply(self, changed: Iterable[Dict] = (), removed: Iterable[Dict] = ()):
+        """Update the index with records a write changed or removed"""
+        for record in removed:
+            if record.get('id') is not None:
+                self.remove(record['id'])
+        for record in changed:
+            self.add(record)
+
+    def page(self, after: Optional[Tuple] = None, limit: int = 50,
+             descending: bool = False) -> Tuple[List[Dict], Optional[Tuple]]:
+        """Get up to limit records after the given key.
+
+        Returns the records and the key of the last one, or None for the
+        key when there is nothing after this page.
+        """
+        if descending:
+            end = len(self.keys) if after is None else bisect.bisect_left(self.keys, after)
+            start = max(0, end - limit)
+            records = self.records[start:end][::-1]
+            last_key = self.keys[start] if start > 0 else None
+        else:
+            start = 0 if after is None else bisect.bisect_right(self.keys, after)
+            end = min(len(self.keys), start + limit)
+            records = self.records[start:end]
+            last_key = self.keys[end - 1] if end < len(self.keys) else None
+        return records, last_key
+
+
+class SearchIndex:
+    """Inverted index from word tokens to the records containing them.
+
+    A query matches records that contain every query token, with the last
+    token matched as a prefix so partially typed words still find results.
+    Lookups touch only the posting lists of the query tokens, and apply()
+    re-indexes just the records a write changed.
+    """
+
+    def __init__(self, records: Iterable[Dict] = (), fields: Tuple[str, ...] = SEARCH_FIELDS,
+                 where: Optional[Callable[[Dict], bool]] = None):
+        self.fields = fields
+        self.where = where
+        self.postings = {}
+        self.vocabulary = []
+        self.records = {}
+        self.record_tokens = {}
+        self.positions = {}
+        self._sequence = itertools.count()
+        for record in records:
+            self.add(record)
+
+    def record_key(self, record: Dict):
+        # Records without an ID can still be searched, they just can't be updated
+        record_id = record.get('id')
+        return record_id if record_id is not None else ('', next(self._sequence))
+
+    def add(self, record: Dict):
+        """Index a record, replacing any earlier version with the same ID"""
+        key = self.record_key(record)
+        if self.where and not self.where(record):
+            self.remove(key)
+            return
+        tokens = set()
+        for field in self.fields:
+            tokens.update(tokenize(record.get(field)))
+        old_tokens = self.record_tokens.get(key, set())
+        for token in old_tokens - tokens:
+            self._unpost(token, key)
+        for token in tokens - old_tokens:
+            if token not in self.postings:
+                self.postings[token] = set()
+                bisect.insort(self.vocabulary, token)
+            self.postings[token].add(key)
+        self.records[key] = record
+        self.record_tokens[key] = tokens
+        # Keep the original position so results stay in storage order
+        self.positions.setdefault(key, next(self._sequence))
+
+    def remove(self, key):
+        for token in self.record_tokens.pop(key, ()):
+            self._unpost(token, key)
+        self.records.pop(key, None)
+        self.positions.pop(key, None)
+
+    def apply(self, changed: Iterable[Dict] = (), removed: Iterable[Dict] = ()):
+        """Update the index with records a write changed or removed"""
+        for record in removed:
+            if record.get('id') is not None:
+                self.remove(record['id'])
+        for record in changed:
+            self.add(record)
+
+    def search(self, query: str) -> List[Dict]:
+        """Records matching every token of the query, the last one as a prefix"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        *words, prefix = tokens
+        matches = None
+        for word in sorted(set(words), key=lambda w: len(self.postings.get(w, ()))):
+            posting = self.postings.get(word)
+            if not posting:
+                return []
+            matches = set(posting) if matches is None else matches & posting
+        prefixed = set()
+        for i in range(bisect.bisect_left(self.vocabulary, prefix), len(self.vocabulary)):
+            token = self.vocabulary[i]
+            if not token.startswith(prefix):
+                break
+            if matches is None:
+                prefixed |= self.postings[token]
+            else:
+                prefixed |= matches & self.postings[token]
+        return [self.records[key] for key in sorted(prefixed, key=self.positions.get)]
+
+    def _unpost(self, token: str, key):
+        posting = self.postings.get(token)
+        if posting is None:
+            return
+        posting.discard(key)
+        if not posting:
+            del self.postings[token]
+            del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+
+
+class DateIndex:
+    """Records ordered by a YYYY-MM-DD date field, for range queries.
+
+    Dates are parsed once into day ordinals and kept sorted, so a range is
+    found with two binary searches. Records whose date doesn't parse are
+    kept aside and compared as strings.
+    """
+
+    def __init__(self, records: Iterable[Dict] = (), field: str = 'date',
+                 where: Optional[Callable[[Dict], bool]] = None):
+        self.field = field
+        self.where = where
+        self.keys = []
+        self.records = {}
+        self.entries = {}
+        self.undated = {}
+        self._sequence = itertools.count()
+        for record in records:
+            self.add(record)
+
+    def add(self, record: Dict):
+        """Index a record, replacing any earlier version with the same ID"""
+        record_id = record.get('id')
+        key = record_id if record_id is not None else ('', next(self._sequence))
+        old_entry = self.entries.get(key)
+        self.remove(key)
+        if self.where and not self.where(record):
+            return
+        ordinal = date_ordinal(record.get(self.field))
+        # Keep the original position so ties stay in storage order
+        position = old_entry[1] if old_entry else next(self._sequence)
+        entry = (ordinal, position)
+        self.entries[key] = entry
+        if ordinal is None:
+            self.undated[position] = record
+        else:
+            bisect.insort(self.keys, entry)
+            self.records[position] = record
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        ordinal, position = entry
+        if ordinal is None:
+            self.undated.pop(position, None)
+        else:
+            del self.keys[bisect.bisect_left(self.keys, entry)]
+            self.records.pop(position, None)
+
+    def apply(self, changed: Iterable[Dict] = (), removed: Iterable[Dict] = ()):
+        """Update the index with records a write changed or removed"""
+        for record in removed:
+            if record.get('id') is not None:
+                self.remove(record['id'])
+        for record in changed:
+            self.add(record)
+
+    def between(self, start_ordinal: int, end_ordinal: int) -> List[Dict]:
+        """Dated records from start to end inclusive, in date order"""
+        start = bisect.bisect_left(self.keys, (start_ordinal,))
+        end = bisect.bisect_left(self.keys, (end_ordinal + 1,))
+        return [self.records[position] for _, position in self.keys[start:end]]
+
+    def range(self, start_date: str, end_date: str) -> List[Dict]:
+        """Records with start_date <= date <= end_date, in storage order"""
+        start_ordinal, end_ordinal = date_ordinal(start_date), date_ordinal(end_date)
+        if start_ordinal is None or end_ordinal is None:
+            # Bounds that aren't plain dates can only be compared as strings
+            matches = [(position, record) for position, record in self._all()
+                       if start_date <= str(record.get(self.field, '')) <= end_date]
+        else:
+            start = bisect.bisect_left(self.keys, (start_ordinal,))
+            end = bisect.bisect_left(self.keys, (end_ordinal + 1,))
+            matches = [(position, self.records[position]) for _, position in self.keys[start:end]]
+            matches.extend((position, record) for position, record in self.undated.items()
+                           if start_date <= str(record.get(self.field, '')) <= end_date)
+        matches.sort(key=lambda match: match[0])
+        return [record for _, record in matches]
+
+    def _all(self):
+        yield from self.records.items()
+        yield from self.undated.items()
+
+
+class GeoGridIndex:
+    """Records bucketed into a latitude/longitude grid, for radius queries.
+
+    nearby() only visits the cells overlapping the search circle's bounding
+    box and returns their records as candidates; callers compute the exact
+    distance for those. Records without coordinates are kept in unlocated.
+    """
+
+    def __init__(self, records: Iterable[Dict] = (), cell_degrees: float = GEO_CELL_DEGREES,
+                 where: Optional[Callable[[Dict], bool]] = None):
+        self.cell_degrees = cell_degrees
+        self.where = where
+        self.cells = {}
+        self.entries = {}
+        self.unlocated = {}
+        self._sequence = itertools.count()
+        for record in records:
+            self.add(record)
+
+    def cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees))
+
+    def add(self, record: Dict):
+        """Index a record, replacing any earlier version with the same ID"""
+        record_id = record.get('id')
+        key = record_id if record_id is not None else ('', next(self._sequence))
+        self.remove(key)
+        if self.where and not self.where(record):
+            return
+        if not has_coordinates(record):
+            self.entries[key] = None
+            self.unlocated[key] = record
+            return
+        try:
+            cell = self.cell(float(record['latitude']), float(record['longitude']))
+        except (TypeError, ValueError):
+            return
+        self.entries[key] = cell
+        self.cells.setdefault(cell, {})[key] = record
+
+    def remove(self, key):
+        if key not in self.entries:
+            return
+        cell = self.entries.pop(key)
+        if cell is None:
+            self.unlocated.pop(key, None)
+            return
+        bucket = self.cells.get(cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self.cells[cell]
+
+    def apply(self, changed: Iterable[Dict] = (), removed: Iterable[Dict] = ()):
+        """Update the index with records a write changed or removed"""
+        for record in removed:
+            if record.get('id') is not None:
+                self.remove(record['id'])
+        for record in changed:
+            self.add(record)
+
+    def nearby(self, latitude: float, longitude: float, radius_km: float) -> List[Dict]:
+        """Records in the grid cells that may lie within radius_km of a point"""
+        lat_min, lat_max, lon_ranges = bounding_box(latitude, longitude, radius_km)
+        row_min, row_max = self.cell(lat_min, 0)[0], self.cell(lat_max, 0)[0]
+        col_ranges = [(self.cell(0, lon_min)[1], self.cell(0, lon_max)[1])
+                      for lon_min, lon_max in lon_ranges]
+
+        cell_count = (row_max - row_min + 1) * sum(high - low + 1 for low, high in col_ranges)
+        if cell_count > len(self.cells):
+            # A huge radius covers more cells than are occupied, check those instead
+            cells = [cell for cell in self.cells
+                     if row_min <= cell[0] <= row_max
+                     and any(low <= cell[1] <= high for low, high in col_ranges)]
+        else:
+            cells = [(row, col) for row in range(row_min, row_max + 1)
+                     for low, high in col_ranges for col in range(low, high + 1)]
+
+        candidates = []
+        for cell in cells:
+            candidates.extend(self.cells.get(cell, {}).values())
+        return candidates
+
+
+class GroupIndex:
+    """Records grouped by the value of one field, e.g. registrations by user.
+
+    Each group maps record IDs to records in storage order, so a lookup
+    costs the size of its group rather than a scan of every record.
+    Records without the field or an ID are not indexed.
+    """
+
+    def __init__(self, records: Iterable[Dict] = (), field: str = 'user_id'):
+        self.field = field
+        self.groups = {}
+        self.keys = {}
+        for record in records:
+            self.add(record)
+
+    def add(self, record: Dict):
+        """Index a record, replacing any earlier version with the same ID"""
+        record_id = record.get('id')
+        if record_id is None:
+            return
+        key = record.get(self.field)
+        if self.keys.get(record_id, key) != key:
+            self.remove(record_id)
+        if key is None:
+            return
+        self.groups.setdefault(key, {})[record_id] = record
+        self.keys[record_id] = key
+
+    def remove(self, record_id):
+        key = self.keys.pop(record_id, None)
+        group = self.groups.get(key)
+        if group is None:
+            return
+        group.pop(record_id, None)
+        if not group:
+            del self.groups[key]
+
+    def apply(self, changed: Iterable[Dict] = (), removed: Iterable[Dict] = ()):
+        """Update the index with records a write changed or removed"""
+        for record in removed:
+            if record.get('id') is not None:
+                self.remove(record['id'])
+        for record in changed:
+            self.add(record)
+
+    def ids(self, key) -> List:
+        """IDs of the records in a group"""
+        return list(self.groups.get(key, ()))
+
+    def get(self, key) -> List[Dict]:
+        """Records in a group, in storage order"""
+        return list(self.groups.get(key, {}).values())
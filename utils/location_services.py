@@ -1,7 +1,7 @@
 # utils/location_service.py
 import math
 import threading
-from typing import Dict, Optional, Callable
+from typing import Dict, List, Optional, Callable, Sequence, Tuple
 from kivy.logger import Logger
 
 try:
@@ -20,6 +20,26 @@ except ImportError:
     REQUESTS_AVAILABLE = False
     Logger.warning("LocationService: Requests not available - location features limited")
 
+try:
+    # For ranking many events by distance at once
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    Logger.info("LocationService: NumPy not available - batch distances use pure Python")
+
+# Radius of earth in kilometers
+EARTH_RADIUS_KM = 6371
+
+
+def _coordinate(value) -> Optional[float]:
+    """value as a float, or None if it is missing (None or zero) or not a finite number"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) and number != 0 else None
+
 class LocationService:
     def __init__(self):
         self.current_location = None
@@ -227,11 +247,12 @@ class LocationService:
     @staticmethod
     def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calculate distance between two points using Haversine formula"""
-        if not all([lat1, lon1, lat2, lon2]):
+        coordinates = [_coordinate(value) for value in (lat1, lon1, lat2, lon2)]
+        if None in coordinates:
             return float('inf')
         
         # Convert latitude and longitude from degrees to radians
-        lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+        lat1, lon1, lat2, lon2 = map(math.radians, coordinates)
         
         # Haversine formula
         dlat = lat2 - lat1
@@ -239,7 +260,71 @@ class LocationService:
         a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
         c = 2 * math.asin(math.sqrt(a))
         
-        # Radius of earth in kilometers
-        r = 6371
+        return c * EARTH_RADIUS_KM
+    
+    @staticmethod
+    def calculate_distances(lat: float, lon: float, latitudes: Sequence,
+                            longitudes: Sequence) -> List[float]:
+        """Distances in km from one point to many, in a single vectorized haversine.
+        
+        Missing (None or zero) or invalid coordinates give inf, like
+        calculate_distance.
+        Falls back to a Python loop when NumPy is not installed.
+        """
+        if not NUMPY_AVAILABLE:
+            return [LocationService.calculate_distance(lat, lon, lat2, lon2)
+                    for lat2, lon2 in zip(latitudes, longitudes)]
+        return LocationService._haversine_array(lat, lon, latitudes, longitudes).tolist()
+    
+    @staticmethod
+    def rank_by_distance(lat: float, lon: float, events: Sequence[Dict],
+                         radius_km: float = None) -> List[Tuple[Dict, float]]:
+        """Pair events with their distance from a point, nearest first.
+        
+        Events outside radius_km are dropped when a radius is given, which
+        also drops events without coordinates.
+        """
+        latitudes = [event.get('latitude') for event in events]
+        longitudes = [event.get('longitude') for event in events]
+        
+        if not NUMPY_AVAILABLE:
+            distances = LocationService.calculate_distances(lat, lon, latitudes, longitudes)
+            ranked = sorted(zip(events, distances), key=lambda pair: pair[1])
+            if radius_km is not None:
+                ranked = [pair for pair in ranked if pair[1] <= radius_km]
+            return ranked
+        
+        distances = LocationService._haversine_array(lat, lon, latitudes, longitudes)
+        order = np.argsort(distances, kind='stable')
+        if radius_km is not None:
+            order = order[distances[order] <= radius_km]
+        return [(events[i], distance) for i, distance in zip(order.tolist(), distances[order].tolist())]
+    
+    @staticmethod
+    def _haversine_array(lat: float, lon: float, latitudes: Sequence, longitudes: Sequence):
+        """NumPy haversine from one point to arrays of points, inf where coordinates are invalid"""
+        lat2 = LocationService._coordinate_array(latitudes)
+        lon2 = LocationService._coordinate_array(longitudes)
+        lat, lon = _coordinate(lat), _coordinate(lon)
+        if lat is None or lon is None:
+            return np.full(lat2.shape, np.inf)
+        
+        missing = ~np.isfinite(lat2) | ~np.isfinite(lon2) | (lat2 == 0) | (lon2 == 0)
+        lat1, lon1 = math.radians(lat), math.radians(lon)
+        lat2, lon2 = np.radians(lat2), np.radians(lon2)
         
-        return c * r
\ No newline at end of file
+        a = (np.sin((lat2 - lat1) / 2) ** 2
+             + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+        distances[missing] = np.inf
+        return distances
+    
+    @staticmethod
+    def _coordinate_array(values: Sequence):
+        """Coordinates as a float array, NaN for any that are not numbers"""
+        try:
+            # None becomes NaN when converted to a float array
+            return np.asarray(values, dtype=float)
+        except (TypeError, ValueError):
+            return np.array([np.nan if _coordinate(value) is None else float(value) for value in values],
+                            dtype=float)
\ No newline at end of file
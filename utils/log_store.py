@@ -0,0 +1,194 @@
+# utils/log_store.py - Append-only JSON-lines storage for a single entity
+import json
+import os
+import threading
+import uuid
+from typing import Dict, Iterable, List
+from kivy.logger import Logger
+
+# Compact once the log holds this many superseded lines and they outnumber live records
+COMPACT_MIN_GARBAGE = 500
+
+
+class LogStore:
+    """Append-only log of records keyed by ID.
+
+    Each line is either {"op": "put", "record": {...}} or {"op": "del", "id": ...}.
+    A later put supersedes an earlier one with the same ID, and compaction
+    rewrites the log with only the live records in a background thread.
+    """
+
+    def __init__(self, log_path: str):
+        self.log_path = log_path
+        self._lock = threading.RLock()
+        self._records = {}
+        self._offset = 0
+        self._inode = None
+        self._lines = 0
+        self._compacting = False
+
+    def signature(self):
+        """Get the (mtime, size) of the log file, or None if it does not exist"""
+        try:
+            stat = os.stat(self.log_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.log_path)
+
+    def load(self) -> List[Dict]:
+        """Replay the log, reading only lines appended since the last call"""
+        with self._lock:
+            try:
+                stat = os.stat(self.log_path)
+            except OSError:
+                self._reset()
+                return []
+
+            # A new inode or a shorter file means the log was compacted or replaced
+            if stat.st_ino != self._inode or stat.st_size < self._offset:
+                self._reset()
+                self._inode = stat.st_ino
+
+            if stat.st_size > self._offset:
+                with open(self.log_path, "rb") as f:
+                    f.seek(self._offset)
+                    chunk = f.read()
+                # Leave a torn trailing line for the next read
+                end = chunk.rfind(b"\n") + 1
+                for line in chunk[:end].splitlines():
+                    self._apply_line(line)
+                self._offset += end
+
+            return list(self._records.values())
+
+    def append(self, changed: Iterable[Dict] = (), removed: Iterable[Dict] = (), sync: bool = False) -> bool:
+        """Append put records for changed and tombstones for removed records"""
+        lines = []
+        for record in removed:
+            if record.get('id') is not None:
+                lines.append({'op': 'del', 'id': record['id']})
+        for record in changed:
+            if record.get('id') is None:
+                record['id'] = str(uuid.uuid4())
+            lines.append({'op': 'put', 'record': record})
+        if not lines:
+            return True
+
+        payload = "".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines)
+        with self._lock:
+            # Catch up first so our own lines are not replayed twice
+            self.load()
+            with open(self.log_path, "a", encoding='utf-8') as f:
+                f.write(payload)
+                if sync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            for line in lines:
+                self._apply(line)
+            self._offset = os.path.getsize(self.log_path)
+            self._inode = os.stat(self.log_path).st_ino
+
+            if self._should_compact():
+                self.compact_in_background()
+        return True
+
+    def rewrite(self, records: Iterable[Dict]) -> bool:
+        """Replace the whole log with the given records"""
+        with self._lock:
+            self._reset()
+            for record in records:
+                if record.get('id') is None:
+                    record['id'] = str(uuid.uuid4())
+                self._apply({'op': 'put', 'record': record})
+            self._write_snapshot(list(self._records.values()))
+            stat = os.stat(self.log_path)
+            self._inode = stat.st_ino
+            self._offset = stat.st_size
+        return True
+
+    def compact(self):
+        """Rewrite the log with live records only"""
+        with self._lock:
+            self.load()
+            snapshot = list(self._records.values())
+            snapshot_offset = self._offset
+
+        tmp_path = f"{self.log_path}.compact"
+        try:
+            self._write_lines(tmp_path, snapshot)
+            with self._lock:
+                # Carry over anything appended while the snapshot was written
+                if os.path.getsize(self.log_path) > snapshot_offset:
+                    with open(self.log_path, "rb") as src, open(tmp_path, "ab") as dst:
+                        src.seek(snapshot_offset)
+                        dst.write(src.read())
+                os.replace(tmp_path, self.log_path)
+                self._reset()
+                self.load()
+            Logger.info(f"LogStore: Compacted {self.log_path} to {len(snapshot)} records")
+        except Exception as e:
+            Logger.error(f"LogStore: Error compacting {self.log_path} - {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        finally:
+            self._compacting = False
+
+    def compact_in_background(self):
+        """Start compaction on a daemon thread unless one is already running"""
+        with self._lock:
+            if self._compacting:
+                return
+            self._compacting = True
+        threading.Thread(target=self.compact, daemon=True).start()
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """Convert a JSON array file into this log, giving every record an ID"""
+        with open(json_path, "r", encoding='utf-8') as f:
+            content = f.read().strip()
+        records = json.loads(content) if content else []
+        records = [record for record in records if isinstance(record, dict)]
+        self.rewrite(records)
+        Logger.info(f"LogStore: Migrated {len(records)} records from {json_path}")
+        return len(records)
+
+    def _should_compact(self) -> bool:
+        garbage = self._lines - len(self._records)
+        return garbage >= COMPACT_MIN_GARBAGE and garbage > len(self._records)
+
+    def _reset(self):
+        self._records = {}
+        self._offset = 0
+        self._inode = None
+        self._lines = 0
+
+    def _apply_line(self, line: bytes):
+        line = line.strip()
+        if not line:
+            return
+        try:
+            self._apply(json.loads(line))
+        except (ValueError, KeyError, TypeError) as e:
+            Logger.warning(f"LogStore: Skipping bad line in {self.log_path} - {e}")
+
+    def _apply(self, entry: Dict):
+        self._lines += 1
+        if entry['op'] == 'put':
+            record = entry['record']
+            self._records[record['id']] = record
+        elif entry['op'] == 'del':
+            self._records.pop(entry['id'], None)
+
+    def _write_snapshot(self, records: List[Dict]):
+        tmp_path = f"{self.log_path}.tmp"
+        self._write_lines(tmp_path, records)
+        os.replace(tmp_path, self.log_path)
+
+    def _write_lines(self, path: str, records: List[Dict]):
+        with open(path, "w", encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps({'op': 'put', 'record': record}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
@@ -0,0 +1,159 @@
+# utils/outbox.py - Persistent queue of Firebase writes made while offline
+import json
+import os
+import random
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from kivy.logger import Logger
+from utils.firebase_client import FirebaseClient, FirebaseError
+
+OUTBOX_FILE = "data/outbox.json"
+# Firebase accepts large multi-path updates, but smaller ones fail cheaper
+MAX_PATHS_PER_PATCH = 100
+
+
+def _split(path: str) -> List[str]:
+    return [part for part in path.split('/') if part]
+
+
+class Outbox:
+    """Writes waiting to reach Firebase, kept on disk until they are sent.
+
+    Each entry sets the value at one database path (None deletes it). Entries
+    are coalesced as they are queued: a later write to the same path, or to a
+    parent path, replaces the earlier ones, and a write below a queued path is
+    folded into that entry's value. So no two queued paths overlap, and the
+    queue can be sent as multi-path PATCH requests against the database root.
+    """
+
+    def __init__(self, client: FirebaseClient, file_path: str = OUTBOX_FILE,
+                 flush_interval: float = 30.0, max_paths: int = MAX_PATHS_PER_PATCH,
+                 on_flush: Optional[Callable] = None):
+        self.client = client
+        self.file_path = file_path
+        self.flush_interval = flush_interval
+        self.max_paths = max_paths
+        self.on_flush = on_flush
+        self._lock = threading.RLock()
+        self._pending = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enqueue(self, path: str, value: Any) -> bool:
+        """Queue a write of value at path and wake the worker"""
+        parts = _split(path)
+        if not parts:
+            Logger.error("Outbox: Refusing to queue a write to the database root")
+            return False
+        with self._lock:
+            pending = self._load()
+            key = "/".join(parts)
+            parent = next((queued for queued in pending if key.startswith(queued + "/")), None)
+            if parent is not None:
+                # Fold the write into the queued parent's value
+                merged = json.loads(json.dumps(pending[parent]))
+                if not isinstance(merged, dict):
+                    merged = {}
+                self._set(merged, _split(key[len(parent):]), value)
+                pending[parent] = merged
+            else:
+                for queued in [queued for queued in pending if queued.startswith(key + "/")]:
+                    del pending[queued]
+                pending.pop(key, None)
+                pending[key] = value
+            saved = self._save()
+        self._wake.set()
+        return saved
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+    def flush(self) -> int:
+        """Send queued writes, a batch of paths per PATCH; returns how many were delivered"""
+        delivered = 0
+        while True:
+            with self._lock:
+                batch = dict(list(self._load().items())[:self.max_paths])
+            if not batch:
+                break
+            try:
+                self.client.patch("", batch)
+            except FirebaseError:
+                Logger.warning(f"Outbox: Flush failed, {self.pending_count()} writes still queued")
+                break
+            with self._lock:
+                pending = self._load()
+                for path, value in batch.items():
+                    # Keep entries rewritten while the request was in flight
+                    if path in pending and pending[path] == value:
+                        del pending[path]
+                self._save()
+            delivered += len(batch)
+        if delivered:
+            Logger.info(f"Outbox: Delivered {delivered} queued writes")
+            if self.on_flush:
+                self.on_flush(delivered)
+        return delivered
+
+    def start(self):
+        """Flush in the background whenever writes are queued, retrying failures"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="firebase-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        failures = 0
+        while not self._stop.is_set():
+            if self.pending_count():
+                self.flush()
+                failures = failures + 1 if self.pending_count() else 0
+            # Back off while offline, but never wait past the regular interval
+            delay = self.flush_interval
+            if failures:
+                delay = random.uniform(0, min(self.flush_interval, 2 ** failures))
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def _set(self, node: Dict, parts: List[str], value: Any):
+        for part in parts[:-1]:
+            if not isinstance(node.get(part), dict):
+                node[part] = {}
+            node = node[part]
+        node[parts[-1]] = value
+
+    def _load(self) -> Dict[str, Any]:
+        if self._pending is None:
+            try:
+                with open(self.file_path, "r", encoding='utf-8') as f:
+                    content = f.read().strip()
+                self._pending = json.loads(content) if content else {}
+            except FileNotFoundError:
+                self._pending = {}
+            except (json.JSONDecodeError, OSError) as e:
+                Logger.error(f"Outbox: Error loading {self.file_path} - {e}")
+                self._pending = {}
+        return self._pending
+
+    def _save(self) -> bool:
+        tmp_path = f"{self.file_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding='utf-8') as f:
+                json.dump(self._pending, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.file_path)
+            return True
+        except OSError as e:
+            Logger.error(f"Outbox: Error saving {self.file_path} - {e}")
+            return False
@@ -0,0 +1,175 @@
+# utils/shard_store.py - Hash-sharded JSON storage for a single entity
+import json
+import os
+import threading
+import uuid
+import zlib
+from typing import Dict, Iterable, List, Optional
+from kivy.logger import Logger
+
+DEFAULT_SHARD_COUNT = 16
+MANIFEST_NAME = "manifest.json"
+
+
+class ShardStore:
+    """Records spread over a fixed number of JSON files by a hash of one field.
+
+    A manifest in the directory records the shard count and key field, so
+    the layout stays readable if the defaults change. Writing a record only
+    rewrites the shard it hashes to, and all records that share a key value
+    (e.g. the registrations of one event) live in the same shard. A record's
+    key value must not change once it is stored.
+    """
+
+    def __init__(self, directory: str, key_field: str, order_field: Optional[str] = None,
+                 lowercase_keys: bool = False, shard_count: int = DEFAULT_SHARD_COUNT):
+        self.directory = directory
+        self.key_field = key_field
+        self.order_field = order_field
+        self.lowercase_keys = lowercase_keys
+        self.shard_count = shard_count
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        self._lock = threading.RLock()
+        self._read_manifest()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    def shard_index(self, key) -> int:
+        """Stable shard number for a key value"""
+        if self.lowercase_keys and isinstance(key, str):
+            key = key.lower()
+        return zlib.crc32(str(key or "").encode('utf-8')) % self.shard_count
+
+    def shard_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"shard_{index:02d}.json")
+
+    def partition_path(self, key) -> str:
+        """Path of the shard holding records with this key value"""
+        return self.shard_path(self.shard_index(key))
+
+    def record_shard(self, record: Dict) -> int:
+        return self.shard_index(record.get(self.key_field))
+
+    def file_paths(self) -> List[str]:
+        """Manifest and shard files that currently exist"""
+        paths = [self.manifest_path] + [self.shard_path(i) for i in range(self.shard_count)]
+        return [path for path in paths if os.path.exists(path)]
+
+    def signature(self):
+        """Combined (mtime, size) of every shard, or None before the first write"""
+        if not self.exists():
+            return None
+        signature = []
+        for i in range(self.shard_count):
+            try:
+                stat = os.stat(self.shard_path(i))
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def load(self) -> List[Dict]:
+        """Read every shard and merge them in order_field order"""
+        records = []
+        for i in range(self.shard_count):
+            records.extend(self.load_shard(i))
+        if self.order_field:
+            records.sort(key=lambda record: str(record.get(self.order_field) or ""))
+        return records
+
+    def load_shard(self, index: int) -> List[Dict]:
+        path = self.shard_path(index)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding='utf-8') as f:
+            content = f.read().strip()
+        return json.loads(content) if content else []
+
+    def update(self, changed: Iterable[Dict] = (), removed: Iterable[Dict] = (), sync: bool = True):
+        """Apply a delta, rewriting only the shards it touches.
+
+        Each touched shard is read back and its records are replaced or
+        dropped by ID, so the cost follows the shard size, not the store size.
+        """
+        with self._lock:
+            shards = {}
+            for record in removed:
+                if record.get('id') is not None:
+                    shard = shards.setdefault(self.record_shard(record), {'changed': {}, 'removed': set()})
+                    shard['removed'].add(record['id'])
+            for record in changed:
+                if record.get('id') is None:
+                    record['id'] = str(uuid.uuid4())
+                shard = shards.setdefault(self.record_shard(record), {'changed': {}, 'removed': set()})
+                shard['changed'][record['id']] = record
+
+            self._prepare()
+            for index, delta in shards.items():
+                replaced = delta['changed']
+                shard_records = []
+                for record in self.load_shard(index):
+                    record_id = record.get('id')
+                    if record_id in delta['removed']:
+                        continue
+                    shard_records.append(replaced.pop(record_id, record))
+                shard_records.extend(replaced.values())
+                self._write_file(self.shard_path(index), shard_records, sync)
+
+    def rewrite(self, records: Iterable[Dict], sync: bool = True):
+        """Replace the stored records, rewriting every shard"""
+        with self._lock:
+            shards = [[] for _ in range(self.shard_count)]
+            for record in records:
+                if record.get('id') is None:
+                    record['id'] = str(uuid.uuid4())
+                shards[self.record_shard(record)].append(record)
+
+            self._prepare()
+            for index, shard_records in enumerate(shards):
+                self._write_file(self.shard_path(index), shard_records, sync)
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """Split a JSON array file into shards"""
+        with open(json_path, "r", encoding='utf-8') as f:
+            content = f.read().strip()
+        records = json.loads(content) if content else []
+        records = [record for record in records if isinstance(record, dict)]
+        self.rewrite(records)
+        Logger.info(f"ShardStore: Migrated {len(records)} records from {json_path} "
+                    f"into {self.shard_count} shards")
+        return len(records)
+
+    def _read_manifest(self):
+        if not self.exists():
+            return
+        try:
+            with open(self.manifest_path, "r", encoding='utf-8') as f:
+                manifest = json.load(f)
+            self.shard_count = manifest.get('shard_count', self.shard_count)
+            self.key_field = manifest.get('key_field', self.key_field)
+        except (json.JSONDecodeError, OSError) as e:
+            Logger.error(f"ShardStore: Error reading {self.manifest_path} - {e}")
+
+    def _prepare(self):
+        """Create the directory and manifest before the first write"""
+        os.makedirs(self.directory, exist_ok=True)
+        if not self.exists():
+            self._write_manifest()
+
+    def _write_manifest(self):
+        manifest = {
+            'version': 1,
+            'shard_count': self.shard_count,
+            'key_field': self.key_field
+        }
+        self._write_file(self.manifest_path, manifest, True)
+
+    def _write_file(self, path: str, data, sync: bool):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
@@ -0,0 +1,480 @@
+# utils/sqlite_store.py - SQLite backend for DataManager
+import json
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Tuple
+from kivy.logger import Logger
+from utils.indexes import PAGE_SORT_FIELDS, sort_value, tokenize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    email TEXT NOT NULL,
+    password TEXT,
+    phone TEXT,
+    preferences TEXT,
+    created_at TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users (email);
+
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    description TEXT,
+    date TEXT,
+    time TEXT,
+    location TEXT,
+    category TEXT,
+    max_participants INTEGER,
+    current_participants INTEGER NOT NULL DEFAULT 0,
+    creator_id TEXT,
+    creator_name TEXT,
+    latitude REAL,
+    longitude REAL,
+    city TEXT,
+    country TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    is_active INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_events_creator ON events (creator_id);
+CREATE INDEX IF NOT EXISTS idx_events_category ON events (category);
+CREATE INDEX IF NOT EXISTS idx_events_date ON events (date);
+CREATE INDEX IF NOT EXISTS idx_events_page_created ON events (ifnull(created_at, ''), ifnull(id, ''));
+CREATE INDEX IF NOT EXISTS idx_events_location ON events (latitude, longitude);
+CREATE INDEX IF NOT EXISTS idx_events_page_date ON events (ifnull(date, ''), ifnull(id, ''));
+
+CREATE TABLE IF NOT EXISTS registrations (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    event_id TEXT,
+    event_title TEXT,
+    event_date TEXT,
+    event_time TEXT,
+    event_location TEXT,
+    name TEXT,
+    email TEXT,
+    phone TEXT,
+    registered_at TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_registrations_user_event ON registrations (user_id, event_id);
+CREATE INDEX IF NOT EXISTS idx_registrations_event ON registrations (event_id);
+
+CREATE TABLE IF NOT EXISTS categories (
+    name TEXT PRIMARY KEY
+);
+"""
+
+# Full-text index over event text, kept in sync by triggers. FTS5 is optional
+# in SQLite builds, so search falls back to scanning when it is missing.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+    title, description, location,
+    content='events', content_rowid='rowid', tokenize='unicode61 remove_diacritics 0'
+);
+CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+    INSERT INTO events_fts (rowid, title, description, location)
+    VALUES (new.rowid, new.title, new.description, new.location);
+END;
+CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, title, description, location)
+    VALUES ('delete', old.rowid, old.title, old.description, old.location);
+END;
+CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE OF title, description, location ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, title, description, location)
+    VALUES ('delete', old.rowid, old.title, old.description, old.location);
+    INSERT INTO events_fts (rowid, title, description, location)
+    VALUES (new.rowid, new.title, new.description, new.location);
+END;
+"""
+REBUILD_EVENTS_FTS = "INSERT INTO events_fts (events_fts) VALUES ('rebuild')"
+
+EVENT_COLUMNS = [
+    'id', 'title', 'description', 'date', 'time', 'location', 'category',
+    'max_participants', 'current_participants', 'creator_id', 'creator_name',
+    'latitude', 'longitude', 'city', 'country', 'created_at', 'updated_at', 'is_active'
+]
+REGISTRATION_COLUMNS = [
+    'id', 'user_id', 'event_id', 'event_title', 'event_date', 'event_time',
+    'event_location', 'name', 'email', 'phone', 'registered_at'
+]
+NULLABLE_EVENT_FIELDS = {'latitude', 'longitude'}
+USER_COLUMNS = ['id', 'name', 'email', 'password', 'phone', 'preferences', 'created_at']
+
+# Statements are kept as constants so sqlite3's per-connection statement
+# cache prepares each one once and reuses it on every call
+INSERT_USER = f"INSERT INTO users ({', '.join(USER_COLUMNS)}) VALUES ({', '.join('?' * len(USER_COLUMNS))})"
+SELECT_USER_LOGIN = "SELECT * FROM users WHERE email = ? AND password = ?"
+UPDATE_USER_PREFERENCES = "UPDATE users SET preferences = ? WHERE id = ?"
+
+INSERT_EVENT = f"INSERT INTO events ({', '.join(EVENT_COLUMNS)}) VALUES ({', '.join('?' * len(EVENT_COLUMNS))})"
+SELECT_ACTIVE_EVENTS = "SELECT * FROM events WHERE is_active = 1 ORDER BY rowid"
+SELECT_EVENT_BY_ID = "SELECT * FROM events WHERE id = ? AND is_active = 1"
+SEARCH_EVENTS = """
+    SELECT * FROM events
+    WHERE is_active = 1
+      AND (?1 IS NULL OR category = ?1)
+      AND (instr(lower(title), ?2) > 0
+           OR instr(lower(description), ?2) > 0
+           OR instr(lower(location), ?2) > 0)
+    ORDER BY rowid
+"""
+SEARCH_EVENTS_FTS = """
+    SELECT events.* FROM events_fts JOIN events ON events.rowid = events_fts.rowid
+    WHERE events_fts MATCH ?2
+      AND events.is_active = 1
+      AND (?1 IS NULL OR events.category = ?1)
+    ORDER BY events.rowid
+"""
+# Zero coordinates count as missing, like the location checks elsewhere in the app
+SELECT_EVENTS_IN_BOX = """
+    SELECT * FROM events
+    WHERE is_active = 1
+      AND latitude BETWEEN ?1 AND ?2 AND latitude != 0 AND longitude != 0
+      AND (longitude BETWEEN ?3 AND ?4 OR longitude BETWEEN ?5 AND ?6)
+    ORDER BY rowid
+"""
+SELECT_UNLOCATED_EVENTS = """
+    SELECT * FROM events
+    WHERE is_active = 1 AND (ifnull(latitude, 0) = 0 OR ifnull(longitude, 0) = 0)
+    ORDER BY rowid
+"""
+CANCEL_EVENT = "UPDATE events SET is_active = 0, updated_at = ? WHERE id = ?"
+UPDATE_EVENT_PARTICIPANTS = """
+    UPDATE events SET current_participants = max(0, current_participants + ?), updated_at = ?
+    WHERE id = ?
+"""
+# Store an event received from the server unless the local copy is as new
+UPSERT_EVENT = INSERT_EVENT + """
+    ON CONFLICT (id) DO UPDATE SET {}
+    WHERE events.updated_at IS NULL OR excluded.updated_at > events.updated_at
+""".format(", ".join(f"{column} = excluded.{column}" for column in EVENT_COLUMNS if column != 'id'))
+SELECT_POPULAR_EVENTS = """
+    SELECT * FROM events WHERE is_active = 1
+    ORDER BY current_participants DESC, rowid LIMIT ?
+"""
+SELECT_EVENTS_BY_DATE = """
+    SELECT * FROM events WHERE is_active = 1 AND date BETWEEN ? AND ?
+    ORDER BY rowid
+"""
+# Keyset pagination: ?1/?2 are the (value, id) key of the previous page's last row
+PAGE_EVENTS_TEMPLATE = """
+    SELECT * FROM events
+    WHERE is_active = 1 AND (?1 IS NULL OR ({key}, ifnull(id, '')) {op} (?1, ?2))
+    ORDER BY {key} {order}, ifnull(id, '') {order} LIMIT ?3
+"""
+PAGE_EVENTS = {
+    (field, descending): PAGE_EVENTS_TEMPLATE.format(
+        key=f"ifnull({field}, {0 if value_type is int else repr('')})",
+        op='<' if descending else '>',
+        order='DESC' if descending else 'ASC'
+    )
+    for field, value_type in PAGE_SORT_FIELDS.items()
+    for descending in (False, True)
+}
+
+INSERT_REGISTRATION = f"INSERT INTO registrations ({', '.join(REGISTRATION_COLUMNS)}) VALUES ({', '.join('?' * len(REGISTRATION_COLUMNS))})"
+SELECT_REGISTRATION = "SELECT 1 FROM registrations WHERE user_id = ? AND event_id = ?"
+SELECT_USER_REGISTRATIONS = "SELECT * FROM registrations WHERE user_id = ? ORDER BY rowid"
+SELECT_EVENT_REGISTRATIONS = "SELECT * FROM registrations WHERE event_id = ? ORDER BY rowid"
+DELETE_REGISTRATION = "DELETE FROM registrations WHERE user_id = ? AND event_id = ?"
+
+# Imports skip rows that clash with existing IDs or emails
+IMPORT_USER = INSERT_USER.replace("INSERT", "INSERT OR IGNORE", 1)
+IMPORT_EVENT = INSERT_EVENT.replace("INSERT", "INSERT OR IGNORE", 1)
+IMPORT_REGISTRATION = INSERT_REGISTRATION.replace("INSERT", "INSERT OR IGNORE", 1)
+
+SELECT_CATEGORIES = "SELECT name FROM categories ORDER BY rowid"
+DELETE_CATEGORIES = "DELETE FROM categories"
+INSERT_CATEGORY = "INSERT OR IGNORE INTO categories (name) VALUES (?)"
+
+
+class SQLiteStore:
+    """DataManager storage backed by a SQLite database in WAL mode"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._transaction_depth = 0
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=64)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._add_missing_columns()
+        self.has_fts = self._create_fts()
+        Logger.info(f"SQLiteStore: Opened {db_path}")
+
+    def _add_missing_columns(self):
+        """Add event columns introduced after the database was created"""
+        existing = {row['name'] for row in self.conn.execute("PRAGMA table_info(events)")}
+        if 'updated_at' not in existing:
+            with self.conn:
+                self.conn.execute("ALTER TABLE events ADD COLUMN updated_at TEXT")
+
+    def _create_fts(self) -> bool:
+        """Set up the full-text index, indexing existing events the first time"""
+        existed = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'events_fts'"
+        ).fetchone() is not None
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+            if not existed:
+                with self.conn:
+                    self.conn.execute(REBUILD_EVENTS_FTS)
+            return True
+        except sqlite3.OperationalError as e:
+            Logger.warning(f"SQLiteStore: Full-text search unavailable - {e}")
+            return False
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """Run several calls in one transaction, committed when the block exits"""
+        with self._lock:
+            self._transaction_depth += 1
+            try:
+                if self._transaction_depth > 1:
+                    yield
+                else:
+                    with self.conn:
+                        yield
+            finally:
+                self._transaction_depth -= 1
+
+    @contextmanager
+    def _writing(self):
+        """Commit a single call's writes unless an outer transaction is open"""
+        with self._lock:
+            if self._transaction_depth:
+                yield
+            else:
+                with self.conn:
+                    yield
+
+    def is_empty(self) -> bool:
+        """Check whether nothing has been stored yet"""
+        with self._lock:
+            for table in ('users', 'events', 'registrations', 'categories'):
+                if self.conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                    return False
+        return True
+
+    def import_records(self, users: List[Dict], events: List[Dict],
+                       registrations: List[Dict], categories: List[str]):
+        """Bulk load records from the JSON files, skipping malformed entries"""
+        with self._writing():
+            for user in users:
+                if isinstance(user, dict) and user.get('email'):
+                    self.conn.execute(
+                        IMPORT_USER,
+                        self._user_row({**user, 'email': user['email'].lower()})
+                    )
+            for event in events:
+                if isinstance(event, dict):
+                    self.conn.execute(
+                        IMPORT_EVENT,
+                        self._event_row(event)
+                    )
+            for reg in registrations:
+                if isinstance(reg, dict):
+                    self.conn.execute(
+                        IMPORT_REGISTRATION,
+                        self._registration_row(reg)
+                    )
+            self.conn.executemany(INSERT_CATEGORY, [(c,) for c in categories if isinstance(c, str)])
+        Logger.info(f"SQLiteStore: Imported {len(events)} events, {len(users)} users, "
+                    f"{len(registrations)} registrations")
+
+    # User management
+    def create_user(self, new_user: Dict) -> Optional[Dict]:
+        try:
+            with self._writing():
+                self.conn.execute(INSERT_USER, self._user_row(new_user))
+        except sqlite3.IntegrityError:
+            return None
+
+        user_return = new_user.copy()
+        del user_return['password']
+        return user_return
+
+    def authenticate_user(self, email: str, hashed_password: str) -> Optional[Dict]:
+        with self._lock:
+            row = self.conn.execute(SELECT_USER_LOGIN, (email.lower(), hashed_password)).fetchone()
+        if row is None:
+            return None
+        user = self._user_from_row(row)
+        del user['password']
+        return user
+
+    def update_user_preferences(self, user_id: str, preferences: Dict) -> bool:
+        with self._writing():
+            cursor = self.conn.execute(UPDATE_USER_PREFERENCES, (json.dumps(preferences), user_id))
+        return cursor.rowcount > 0
+
+    # Event management
+    def create_event(self, new_event: Dict) -> Optional[Dict]:
+        with self._writing():
+            self.conn.execute(INSERT_EVENT, self._event_row(new_event))
+        return new_event
+
+    def get_all_events(self) -> List[Dict]:
+        return self._fetch_events(SELECT_ACTIVE_EVENTS)
+
+    def list_events(self, field: str, descending: bool, after: Optional[Tuple],
+                    limit: int) -> Tuple[List[Dict], Optional[Tuple]]:
+        """Get a page of active events after a sort key, plus the key of its last row"""
+        value, event_id = after if after else (None, None)
+        events = self._fetch_events(PAGE_EVENTS[(field, descending)], (value, event_id, limit + 1))
+        if len(events) <= limit:
+            return events, None
+        events = events[:limit]
+        return events, (sort_value(events[-1], field), str(events[-1].get('id') or ""))
+
+    def get_event_by_id(self, event_id: str) -> Optional[Dict]:
+        events = self._fetch_events(SELECT_EVENT_BY_ID, (event_id,))
+        return events[0] if events else None
+
+    def search_events(self, query: str, category: str = None) -> List[Dict]:
+        tokens = tokenize(query)
+        if self.has_fts and tokens:
+            # Every token must match, the last one as a prefix
+            match = " ".join(f'"{token}"' for token in tokens) + "*"
+            return self._fetch_events(SEARCH_EVENTS_FTS, (category or None, match))
+        query_lower = query.lower() if query else ""
+        return self._fetch_events(SEARCH_EVENTS, (category or None, query_lower))
+
+    def update_event(self, event_id: str, update_data: Dict) -> bool:
+        columns = [column for column in update_data if column in EVENT_COLUMNS and column != 'id']
+        if not columns:
+            return self.get_event_by_id(event_id) is not None
+        values = self._event_row(update_data)
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        params = [values[EVENT_COLUMNS.index(column)] for column in columns] + [event_id]
+        with self._writing():
+            cursor = self.conn.execute(f"UPDATE events SET {assignments} WHERE id = ?", params)
+        return cursor.rowcount > 0
+
+    def cancel_event(self, event_id: str, updated_at: str = None) -> bool:
+        with self._writing():
+            cursor = self.conn.execute(CANCEL_EVENT, (updated_at, event_id))
+        return cursor.rowcount > 0
+
+    def upsert_events(self, events: List[Dict]) -> int:
+        """Insert or replace events by ID, skipping those not newer than the stored copy"""
+        changed = 0
+        with self._writing():
+            for event in events:
+                if isinstance(event, dict) and event.get('id'):
+                    changed += self.conn.execute(UPSERT_EVENT, self._event_row(event)).rowcount
+        return changed
+
+    def get_events_in_box(self, lat_min: float, lat_max: float, lon_ranges: List[Tuple],
+                          include_unlocated: bool = False) -> List[Dict]:
+        """Active events inside a bounding box, using the location index"""
+        (lon_min, lon_max), (lon_min2, lon_max2) = lon_ranges[0], lon_ranges[-1]
+        events = self._fetch_events(SELECT_EVENTS_IN_BOX,
+                                    (lat_min, lat_max, lon_min, lon_max, lon_min2, lon_max2))
+        if include_unlocated:
+            events += self._fetch_events(SELECT_UNLOCATED_EVENTS)
+        return events
+
+    def update_event_participants(self, event_id: str, increment: int = 1,
+                                  updated_at: str = None) -> bool:
+        with self._writing():
+            cursor = self.conn.execute(UPDATE_EVENT_PARTICIPANTS, (increment, updated_at, event_id))
+        return cursor.rowcount > 0
+
+    # Registration management
+    def is_registered(self, user_id: str, event_id: str) -> bool:
+        with self._lock:
+            return self.conn.execute(SELECT_REGISTRATION, (user_id, event_id)).fetchone() is not None
+
+    def register_for_event(self, new_registration: Dict, updated_at: str = None) -> Optional[Dict]:
+        with self._writing():
+            if self.conn.execute(SELECT_REGISTRATION, (new_registration['user_id'],
+                                                       new_registration['event_id'])).fetchone():
+                return None
+            self.conn.execute(INSERT_REGISTRATION, self._registration_row(new_registration))
+            self.conn.execute(UPDATE_EVENT_PARTICIPANTS, (1, updated_at, new_registration['event_id']))
+        return new_registration
+
+    def get_user_registrations(self, user_id: str) -> List[Dict]:
+        return self._fetch(SELECT_USER_REGISTRATIONS, (user_id,))
+
+    def get_event_registrations(self, event_id: str) -> List[Dict]:
+        return self._fetch(SELECT_EVENT_REGISTRATIONS, (event_id,))
+
+    def cancel_registration(self, user_id: str, event_id: str, updated_at: str = None) -> bool:
+        with self._writing():
+            cursor = self.conn.execute(DELETE_REGISTRATION, (user_id, event_id))
+            if cursor.rowcount == 0:
+                return False
+            self.conn.execute(UPDATE_EVENT_PARTICIPANTS, (-1, updated_at, event_id))
+        return True
+
+    # Category management
+    def get_categories(self) -> List[str]:
+        with self._lock:
+            return [row['name'] for row in self.conn.execute(SELECT_CATEGORIES)]
+
+    def add_category(self, category: str) -> bool:
+        with self._writing():
+            categories = [row['name'] for row in self.conn.execute(SELECT_CATEGORIES)]
+            if category in categories:
+                return False
+            # Keep the list sorted like the JSON backend does
+            self.conn.execute(DELETE_CATEGORIES)
+            self.conn.executemany(INSERT_CATEGORY, [(c,) for c in sorted(categories + [category])])
+        return True
+
+    # Analytics and insights
+    def get_popular_events(self, limit: int = 10) -> List[Dict]:
+        return self._fetch_events(SELECT_POPULAR_EVENTS, (limit,))
+
+    def get_events_by_date_range(self, start_date: str, end_date: str) -> List[Dict]:
+        return self._fetch_events(SELECT_EVENTS_BY_DATE, (start_date, end_date))
+
+    # Row conversion helpers
+    def _fetch(self, sql: str, params=()) -> List[Dict]:
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def _fetch_events(self, sql: str, params=()) -> List[Dict]:
+        events = []
+        for event in self._fetch(sql, params):
+            # Imported legacy events lack some fields; leave them missing like the JSON backend does
+            event = {key: value for key, value in event.items()
+                     if value is not None or key in NULLABLE_EVENT_FIELDS}
+            event['is_active'] = bool(event['is_active'])
+            events.append(event)
+        return events
+
+    def _user_from_row(self, row) -> Dict:
+        user = dict(row)
+        user['preferences'] = json.loads(user['preferences']) if user['preferences'] else {}
+        return user
+
+    def _user_row(self, user: Dict) -> tuple:
+        values = dict(user)
+        values.setdefault('id', str(uuid.uuid4()))
+        values['preferences'] = json.dumps(values.get('preferences') or {})
+        return tuple(values.get(column) for column in USER_COLUMNS)
+
+    def _event_row(self, event: Dict) -> tuple:
+        values = dict(event)
+        values.setdefault('id', str(uuid.uuid4()))
+        values['current_participants'] = values.get('current_participants') or 0
+        values['is_active'] = 1 if values.get('is_active', True) else 0
+        return tuple(values.get(column) for column in EVENT_COLUMNS)
+
+    def _registration_row(self, registration: Dict) -> tuple:
+        values = dict(registration)
+        values.setdefault('id', str(uuid.uuid4()))
+        return tuple(values.get(column) for column in REGISTRATION_COLUMNS)
@@ -1,38 +1,415 @@
 # utils/storage.py - Enhanced storage with better error handling and app store optimizations
+import heapq
 import json
 import os
+import re
 import hashlib
 import uuid
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Dict, Optional
 from kivy.logger import Logger
+from utils.app_config import AppConfig
+from utils.log_store import LogStore
+from utils.shard_store import ShardStore
+from utils.indexes import SortedIndex, SearchIndex, DateIndex, GroupIndex, tokenize, parse_sort, encode_cursor, decode_cursor
 
 # File paths
 USERS_FILE = "data/users.json"
 EVENTS_FILE = "data/events.json"  
 REGISTRATIONS_FILE = "data/registrations.json"
 
+# Storage layout: "json" keeps one JSON array per entity, "jsonl" keeps an
+# append-only log per entity next to it (data/events.jsonl etc.) and
+# "sharded" splits each entity over hashed shard files in its own directory
+STORAGE_MODE = os.environ.get('RIPPLE_STORAGE_MODE', AppConfig.STORAGE_MODE)
+
+# Sharded layout per data file. Registrations are keyed by event so all of
+# an event's registrations share one shard, users by email for logins.
+SHARD_LAYOUT = {
+    USERS_FILE: {'directory': 'data/users', 'key_field': 'email',
+                 'order_field': 'created_at', 'lowercase_keys': True},
+    EVENTS_FILE: {'directory': 'data/events', 'key_field': 'id',
+                  'order_field': 'created_at'},
+    REGISTRATIONS_FILE: {'directory': 'data/registrations', 'key_field': 'event_id',
+                         'order_field': 'registered_at'},
+}
+
+# In-process cache of parsed data files, keyed by path. Each entry remembers the
+# (mtime, size) signature the file had when it was read, so changes made by
+# another process are picked up on the next load. Cached records are shared
+# between callers and never edited in place: writers replace a record with an
+# edited copy, so a failed write leaves the cache as it was. Copy a record
+# before mutating it outside this module.
+_cache = {}
+_cache_lock = threading.RLock()
+_stores = {}
+
+# Pending writes of each thread's active storage.batch(), keyed by file path
+_batches = threading.local()
+
+# Streaming reads decode JSON arrays this many characters at a time
+STREAM_CHUNK_SIZE = 64 * 1024
+_ARRAY_SEPARATOR = re.compile(r'[\s,]*')
+
 def ensure_data_dir():
     """Ensure data directory exists"""
     if not os.path.exists("data"):
         os.makedirs("data")
         Logger.info("Storage: Created data directory")
 
-# Enhanced user functions
-def load_users():
-    """Load users with enhanced error handling"""
+def _file_signature(file_path):
+    """Get the (mtime, size) signature used to validate cache entries"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _log_path(file_path):
+    """Path of the append-only log that replaces a JSON file in jsonl mode"""
+    return os.path.splitext(file_path)[0] + ".jsonl"
+
+def _get_store(file_path):
+    """Get the log or shard store backing a data file, or None for plain JSON.
+    
+    The JSON file is migrated into the store the first time it is used.
+    """
+    if STORAGE_MODE not in ('jsonl', 'sharded') or file_path not in SHARD_LAYOUT:
+        return None
+    store = _stores.get(file_path)
+    if store is None:
+        if STORAGE_MODE == 'jsonl':
+            store = LogStore(_log_path(file_path))
+        else:
+            store = ShardStore(**SHARD_LAYOUT[file_path])
+        if not store.exists() and os.path.exists(file_path):
+            store.migrate_from_json(file_path)
+        _stores[file_path] = store
+    return store
+
+def _data_file_paths():
+    """Paths of the files currently holding users, events and registrations"""
+    paths = [USERS_FILE, EVENTS_FILE, REGISTRATIONS_FILE]
+    if STORAGE_MODE == 'jsonl':
+        return [_log_path(path) for path in paths]
+    if STORAGE_MODE == 'sharded':
+        return [shard for path in paths for shard in _get_store(path).file_paths()]
+    return paths
+
+def _current_batch():
+    """Pending writes of this thread's storage.batch(), or None outside one"""
+    return getattr(_batches, 'pending', None)
+
+def _staged(file_path):
+    """This thread's batch-pending version of a file, or None"""
+    pending = _current_batch()
+    return pending.get(file_path) if pending is not None else None
+
+def _read_records(file_path, label):
+    """Load records from a JSON file, served from the cache when unchanged"""
     ensure_data_dir()
-    if not os.path.exists(USERS_FILE):
-        return []
+    staged = _staged(file_path)
+    if staged is not None:
+        return staged['records']
+    with _cache_lock:
+        store = _get_store(file_path)
+        signature = store.signature() if store else _file_signature(file_path)
+        if signature is None:
+            _cache.pop(file_path, None)
+            return []
+        
+        entry = _cache.get(file_path)
+        if entry and entry['signature'] == signature and entry['records'] is not None:
+            return entry['records']
+        # Indexes built by streaming over this version are still valid
+        indexes = entry['indexes'] if entry and entry['signature'] == signature else {}
+        
+        try:
+            if store:
+                records = store.load()
+                if store.signature() != signature:
+                    signature = store.signature()
+                    indexes = {}
+            else:
+                with open(file_path, "r", encoding='utf-8') as f:
+                    content = f.read().strip()
+                records = json.loads(content) if content else []
+        except (json.JSONDecodeError, FileNotFoundError) as e:
+            Logger.error(f"Storage: Error loading {label} - {e}")
+            _cache.pop(file_path, None)
+            return []
+        
+        _cache[file_path] = {'signature': signature, 'records': records, 'indexes': indexes}
+        return records
+
+def _iter_json_array(file_path, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the elements of a JSON array file, decoding one chunk at a time"""
+    decoder = json.JSONDecoder()
+    with open(file_path, "r", encoding='utf-8') as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer:
+            return
+        if buffer[0] != '[':
+            raise json.JSONDecodeError("Expecting '['", buffer, 0)
+        pos = 1
+        eof = False
+        while True:
+            pos = _ARRAY_SEPARATOR.match(buffer, pos).end()
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+                # A value ending exactly at the buffer end may continue in the next chunk
+                complete = end < len(buffer) or eof
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if complete:
+                yield record
+                pos = end
+                continue
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+def _iter_records(file_path, label):
+    """Yield a file's records without loading them all at once.
+    
+    Cached or batch-pending records are served as they are. Otherwise JSON
+    arrays are decoded in chunks and shards are read one at a time, and
+    nothing is added to the cache. The jsonl layout replays its log into
+    the store's own record map, which is already held in memory.
+    """
+    ensure_data_dir()
+    staged = _staged(file_path)
+    with _cache_lock:
+        if staged is not None:
+            records = staged['records']
+        else:
+            store = _get_store(file_path)
+            signature = store.signature() if store else _file_signature(file_path)
+            entry = _cache.get(file_path)
+            if signature is None:
+                return
+            records = None
+            if entry and entry['signature'] == signature:
+                records = entry['records']
+    
+    if records is not None:
+        yield from records
+        return
+    
     try:
-        with open(USERS_FILE, "r", encoding='utf-8') as f:
-            content = f.read().strip()
-            if not content:
-                return []
-            return json.loads(content)
+        if isinstance(store, ShardStore):
+            for i in range(store.shard_count):
+                yield from store.load_shard(i)
+        elif store:
+            yield from store.load()
+        else:
+            yield from _iter_json_array(file_path)
     except (json.JSONDecodeError, FileNotFoundError) as e:
-        Logger.error(f"Storage: Error loading users - {e}")
-        return []
+        Logger.error(f"Storage: Error streaming {label} - {e}")
+        with _cache_lock:
+            _cache.pop(file_path, None)
+
+def _write_records(file_path, records, indexes=None):
+    """Atomically write records to a JSON file and refresh its cache entry"""
+    with _cache_lock:
+        tmp_path = f"{file_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding='utf-8') as f:
+                json.dump(records, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
+        except Exception:
+            # Keep the old file and force a re-read next time
+            _cache.pop(file_path, None)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        _cache[file_path] = {
+            'signature': _file_signature(file_path),
+            'records': list(records),
+            'indexes': indexes or {}
+        }
+
+def _carry_indexes(file_path, changed, removed):
+    """Indexes of the cached version that can absorb a write's delta, updated with it.
+    
+    Indexes with an apply(changed, removed) method are kept up to date this
+    way; the rest are dropped and rebuilt on their next use. Nothing is kept
+    when the cached version is not the one the write is based on.
+    """
+    entry = _cache.get(file_path)
+    if entry is None or (changed is None and removed is None):
+        return {}
+    store = _get_store(file_path)
+    signature = store.signature() if store else _file_signature(file_path)
+    if entry['signature'] != signature:
+        return {}
+    
+    indexes = {}
+    for name, index in entry['indexes'].items():
+        if hasattr(index, 'apply'):
+            index.apply(changed or [], removed or [])
+            indexes[name] = index
+    return indexes
+
+def _commit(file_path, records, changed=None, removed=None):
+    """Persist a new version of a file's records.
+    
+    changed and removed describe the delta from the previous version. The
+    jsonl layout appends just that delta, the json layout rewrites the whole
+    array. Without a delta the records replace the stored contents.
+    Inside storage.batch() the write is staged and flushed when it exits.
+    """
+    if _current_batch() is not None:
+        _stage(file_path, records, changed, removed)
+        return
+    with _cache_lock:
+        _persist(file_path, records, changed, removed)
+
+def _persist(file_path, records, changed=None, removed=None, sync=False):
+    """Write a version of a file's records with the active layout"""
+    store = _get_store(file_path)
+    with _cache_lock:
+        indexes = _carry_indexes(file_path, changed, removed)
+        if store is None:
+            _write_records(file_path, records, indexes)
+            return
+        
+        try:
+            if changed is None and removed is None:
+                store.rewrite(records)
+            elif isinstance(store, ShardStore):
+                store.update(changed or [], removed or [])
+            else:
+                store.append(changed or [], removed or [], sync=sync)
+            if isinstance(store, ShardStore):
+                # Shard files may change faster than mtime resolution, drop them outright
+                for i in range(store.shard_count):
+                    _cache.pop(store.shard_path(i), None)
+        except Exception:
+            _cache.pop(file_path, None)
+            raise
+        _cache[file_path] = {
+            'signature': store.signature(),
+            'records': list(records),
+            'indexes': indexes
+        }
+
+def _stage(file_path, records, changed, removed):
+    """Record a write in this thread's batch, where only this thread's reads see it"""
+    pending = _current_batch()
+    staged = pending.get(file_path)
+    if staged is None:
+        # Indexes are rebuilt from the staged records; the cached ones are shared
+        store = _get_store(file_path)
+        staged = pending[file_path] = {
+            'records': [], 'changed': {}, 'removed': {}, 'replace': False, 'indexes': {},
+            'signature': store.signature() if store else _file_signature(file_path)
+        }
+    staged['records'] = list(records)
+    if changed is None and removed is None:
+        staged['replace'] = True
+        staged['indexes'] = {}
+    else:
+        staged['indexes'] = {name: index for name, index in staged['indexes'].items()
+                             if hasattr(index, 'apply')}
+        for index in staged['indexes'].values():
+            index.apply(changed or [], removed or [])
+    for record in changed or []:
+        staged['changed'][id(record)] = record
+    for record in removed or []:
+        staged['removed'][id(record)] = record
+
+def _rebase(current, changed, removed):
+    """Apply a batch's net delta, by record ID, to records another thread has written since"""
+    changed_by_id = {record.get('id'): record for record in changed}
+    removed_ids = {record.get('id') for record in removed}
+    records = [changed_by_id.pop(record.get('id'), record) for record in current
+               if record.get('id') not in removed_ids]
+    records.extend(changed_by_id.values())
+    return records
+
+@contextmanager
+def batch():
+    """Group writes so each touched file is flushed once when the block exits.
+    
+    Reads inside the block see the staged data. Other threads keep reading
+    and writing the stored data meanwhile and don't see the staged writes
+    until the flush; if one of them wrote a staged file, the batch's changes
+    are applied on top of its version. Nested batches join the outer one.
+    If the block raises, the staged writes are discarded.
+    """
+    if _current_batch() is not None:
+        yield
+        return
+    
+    _batches.pending = {}
+    try:
+        yield
+        pending = _batches.pending
+    finally:
+        _batches.pending = None
+    
+    with _cache_lock:
+        for file_path, staged in pending.items():
+            records = staged['records']
+            if staged['replace']:
+                _persist(file_path, records, sync=True)
+                continue
+            # Collapse the staged changes into one net delta
+            kept_ids = {record.get('id') for record in records}
+            changed = [record for record in records if id(record) in staged['changed']]
+            removed = [record for record in staged['removed'].values()
+                       if record.get('id') not in kept_ids]
+            store = _get_store(file_path)
+            if (store.signature() if store else _file_signature(file_path)) != staged['signature']:
+                records = _rebase(_read_records(file_path, file_path), changed, removed)
+            _persist(file_path, records, changed, removed, sync=True)
+
+def _get_index(file_path, name, label, builder, partition_key=None):
+    """Get a lookup structure derived from a file's records, built once per version.
+    
+    With a partition_key the sharded layout builds it from the one shard that
+    holds records with that key, instead of loading every shard.
+    """
+    staged = _staged(file_path)
+    with _cache_lock:
+        store = _get_store(file_path)
+        if staged is not None:
+            entry = staged
+        else:
+            if partition_key is not None and isinstance(store, ShardStore):
+                file_path = store.partition_path(partition_key)
+                store = None
+            signature = store.signature() if store else _file_signature(file_path)
+            if signature is None:
+                return builder([])
+            entry = _cache.get(file_path)
+            if entry is None or entry['signature'] != signature:
+                # Remember the index for this version without loading the records
+                entry = {'signature': signature, 'records': None, 'indexes': {}}
+                _cache[file_path] = entry
+        if name not in entry['indexes']:
+            entry['indexes'][name] = builder(_iter_records(file_path, label))
+        return entry['indexes'][name]
+
+def clear_cache():
+    """Drop all cached file contents"""
+    with _cache_lock:
+        _cache.clear()
+
+# Enhanced user functions
+def load_users():
+    """Load users with enhanced error handling"""
+    return list(_read_records(USERS_FILE, "users"))
 
 def save_user(user):
     """Save single user with enhanced error handling"""
@@ -43,6 +420,9 @@ def save_user(user):
         # Check if user already exists (by email)
         for i, existing_user in enumerate(users):
             if existing_user.get('email', '').lower() == user.get('email', '').lower():
+                # Keep the existing ID so the update supersedes the old record
+                if 'id' not in user and 'id' in existing_user:
+                    user['id'] = existing_user['id']
                 users[i] = user  # Update existing user
                 break
         else:
@@ -54,45 +434,52 @@ def save_user(user):
                 user['created_at'] = datetime.now().isoformat()
             users.append(user)
         
-        with open(USERS_FILE, "w", encoding='utf-8') as f:
-            json.dump(users, f, indent=2, ensure_ascii=False)
+        _commit(USERS_FILE, users, changed=[user])
         Logger.info(f"Storage: Saved user {user.get('email', 'unknown')}")
         return True
     except Exception as e:
         Logger.error(f"Storage: Error saving user - {e}")
         return False
 
+def _build_users_by_email(users):
+    by_email = {}
+    for user in users:
+        by_email.setdefault(user.get('email', '').lower().strip(), user)
+    return by_email
+
+def get_user_by_email(email):
+    """Get the user with an email address, or None.
+    
+    In the sharded layout only the shard holding that email is read.
+    """
+    users_by_email = _get_index(USERS_FILE, 'by_email', "users", _build_users_by_email,
+                                partition_key=email)
+    return users_by_email.get(email.lower().strip())
+
 def authenticate_user(email, password):
     """Authenticate user with hashed password"""
-    users = load_users()
+    user = get_user_by_email(email)
     hashed_password = hashlib.sha256(password.encode()).hexdigest()
     
-    for user in users:
-        if (user.get('email', '').lower() == email.lower() and 
-            user.get('password') == hashed_password):
-            # Return user without password
-            safe_user = user.copy()
-            safe_user.pop('password', None)
-            return safe_user
+    if user is not None and user.get('password') == hashed_password:
+        # Return user without password
+        safe_user = user.copy()
+        safe_user.pop('password', None)
+        return safe_user
     return None
 
 # Enhanced event functions  
 def load_events():
     """Load events with enhanced error handling"""
-    ensure_data_dir()
-    if not os.path.exists(EVENTS_FILE):
-        return []
-    try:
-        with open(EVENTS_FILE, "r", encoding='utf-8') as f:
-            content = f.read().strip()
-            if not content:
-                return []
-            events = json.loads(content)
-            # Filter only active events
-            return [event for event in events if event.get('is_active', True)]
-    except (json.JSONDecodeError, FileNotFoundError) as e:
-        Logger.error(f"Storage: Error loading events - {e}")
-        return []
+    events = _read_records(EVENTS_FILE, "events")
+    # Filter only active events
+    return [event for event in events if event.get('is_active', True)]
+
+def iter_events(include_inactive=False):
+    """Iterate over events without loading the whole file"""
+    for event in _iter_records(EVENTS_FILE, "events"):
+        if include_inactive or event.get('is_active', True):
+            yield event
 
 def save_event(event):
     """Save single event with enhanced error handling"""
@@ -106,6 +493,7 @@ def save_event(event):
         # Add timestamp
         if 'created_at' not in event:
             event['created_at'] = datetime.now().isoformat()
+        event['updated_at'] = datetime.now().isoformat()
         # Set as active by default
         if 'is_active' not in event:
             event['is_active'] = True
@@ -115,69 +503,160 @@ def save_event(event):
             
         events.append(event)
         
-        with open(EVENTS_FILE, "w", encoding='utf-8') as f:
-            json.dump(events, f, indent=2, ensure_ascii=False)
+        _commit(EVENTS_FILE, events, changed=[event])
         Logger.info(f"Storage: Saved event {event.get('title', 'unknown')}")
         return True
     except Exception as e:
         Logger.error(f"Storage: Error saving event - {e}")
         return False
 
+def list_events(cursor=None, limit=None, sort='created_at'):
+    """Get one page of active events ordered by a field.
+    
+    sort is a field name, prefixed with "-" for descending order. Returns
+    (events, next_cursor); pass next_cursor back to get the following page.
+    It is None on the last page. Pages come from a sorted index, so a later
+    page costs the same as the first one.
+    """
+    limit = max(1, min(limit or AppConfig.MAX_EVENTS_PER_LOAD, AppConfig.MAX_EVENTS_PER_LOAD))
+    try:
+        field, descending = parse_sort(sort)
+        after = decode_cursor(cursor, sort) if cursor else None
+    except ValueError as e:
+        Logger.error(f"Storage: Invalid event page request - {e}")
+        return [], None
+    
+    def build(events):
+        return SortedIndex(field, events, where=lambda event: event.get('is_active', True))
+    
+    index = _get_index(EVENTS_FILE, f'sorted_{field}', "events", build)
+    events, last_key = index.page(after, limit, descending)
+    return list(events), encode_cursor(sort, last_key) if last_key else None
+
 def load_all_events():
     """Load all events including inactive ones"""
-    ensure_data_dir()
-    if not os.path.exists(EVENTS_FILE):
-        return []
-    try:
-        with open(EVENTS_FILE, "r", encoding='utf-8') as f:
-            content = f.read().strip()
-            if not content:
-                return []
-            return json.loads(content)
-    except (json.JSONDecodeError, FileNotFoundError) as e:
-        Logger.error(f"Storage: Error loading all events - {e}")
-        return []
+    return list(_read_records(EVENTS_FILE, "all events"))
+
+def _build_active_event_ids(events):
+    """Map event ID to active event"""
+    by_id = {}
+    for event in events:
+        if event.get('is_active', True) and event.get('id') not in by_id:
+            by_id[event.get('id')] = event
+    return by_id
 
 def get_event_by_id(event_id):
     """Get specific event by ID"""
-    events = load_events()
-    for event in events:
-        if event.get('id') == event_id:
-            return event
-    return None
+    events_by_id = _get_index(EVENTS_FILE, 'active_by_id', "events", _build_active_event_ids,
+                              partition_key=event_id)
+    return events_by_id.get(event_id)
 
 def update_event_participants(event_id, increment=1):
     """Update event participant count"""
     try:
         events = load_all_events()
-        for event in events:
+        changed = []
+        for i, event in enumerate(events):
             if event.get('id') == event_id:
+                event = events[i] = dict(event)
                 current = event.get('current_participants', 0)
                 event['current_participants'] = max(0, current + increment)
+                event['updated_at'] = datetime.now().isoformat()
+                changed.append(event)
                 break
         
-        with open(EVENTS_FILE, "w", encoding='utf-8') as f:
-            json.dump(events, f, indent=2, ensure_ascii=False)
+        _commit(EVENTS_FILE, events, changed=changed)
         return True
     except Exception as e:
         Logger.error(f"Storage: Error updating event participants - {e}")
         return False
 
+def update_event(event_id, update_data):
+    """Update the given fields of an existing event"""
+    try:
+        events = load_all_events()
+        for i, event in enumerate(events):
+            if event.get('id') == event_id:
+                event = events[i] = dict(event)
+                for key, value in update_data.items():
+                    if key in event:
+                        event[key] = value
+                event['updated_at'] = datetime.now().isoformat()
+                _commit(EVENTS_FILE, events, changed=[event])
+                Logger.info(f"Storage: Updated event {event_id}")
+                return True
+        return False
+    except Exception as e:
+        Logger.error(f"Storage: Error updating event - {e}")
+        return False
+
+def cancel_event(event_id):
+    """Cancel an event, keeping it on file as inactive"""
+    try:
+        events = load_all_events()
+        for i, event in enumerate(events):
+            if event.get('id') == event_id:
+                event = events[i] = dict(event)
+                event['is_active'] = False  # Mark as inactive instead of deleting
+                event['updated_at'] = datetime.now().isoformat()
+                _commit(EVENTS_FILE, events, changed=[event])
+                Logger.info(f"Storage: Cancelled event {event_id}")
+                return True
+        return False
+    except Exception as e:
+        Logger.error(f"Storage: Error cancelling event - {e}")
+        return False
+
+def is_newer_or_same(local, remote):
+    """Whether the local copy of a record is at least as recent as the remote one, by updated_at"""
+    local_stamp, remote_stamp = local.get('updated_at'), remote.get('updated_at')
+    return bool(local_stamp) and (not remote_stamp or local_stamp >= remote_stamp)
+
+def merge_remote_events(events, removed_ids=()):
+    """Merge events received from the server into the local events file.
+    
+    Events are matched by ID and replace the stored copy unless it is as new
+    (see is_newer_or_same), new ones are appended, and events whose IDs are
+    in removed_ids are dropped. Nothing is written if no event changed.
+    Returns the number of events added, replaced or removed.
+    """
+    try:
+        with _cache_lock:
+            records = load_all_events()
+            positions = {record.get('id'): i for i, record in enumerate(records)}
+            changed = []
+            for event in events:
+                position = positions.get(event.get('id'))
+                if position is None:
+                    positions[event.get('id')] = len(records)
+                    records.append(event)
+                    changed.append(event)
+                elif records[position] != event and not is_newer_or_same(records[position], event):
+                    records[position] = event
+                    changed.append(event)
+            
+            removed_ids = set(removed_ids)
+            removed = [record for record in records if record.get('id') in removed_ids]
+            if removed:
+                records = [record for record in records if record.get('id') not in removed_ids]
+            if not changed and not removed:
+                return 0
+            
+            _commit(EVENTS_FILE, records, changed=changed, removed=removed)
+        Logger.info(f"Storage: Merged {len(changed)} remote events, removed {len(removed)}")
+        return len(changed) + len(removed)
+    except Exception as e:
+        Logger.error(f"Storage: Error merging remote events - {e}")
+        return 0
+
 # Enhanced registration functions
 def load_registrations():
     """Load registrations with enhanced error handling"""
-    ensure_data_dir()
-    if not os.path.exists(REGISTRATIONS_FILE):
-        return []
-    try:
-        with open(REGISTRATIONS_FILE, "r", encoding='utf-8') as f:
-            content = f.read().strip()
-            if not content:
-                return []
-            return json.loads(content)
-    except (json.JSONDecodeError, FileNotFoundError) as e:
-        Logger.error(f"Storage: Error loading registrations - {e}")
-        return []
+    return list(_read_records(REGISTRATIONS_FILE, "registrations"))
+
+def iter_registrations():
+    """Iterate over registrations without loading the whole file"""
+    return _iter_records(REGISTRATIONS_FILE, "registrations")
 
 def save_registration(registration):
     """Save single registration with enhanced error handling"""
@@ -205,23 +684,32 @@ def save_registration(registration):
             
         registrations.append(registration)
         
-        with open(REGISTRATIONS_FILE, "w", encoding='utf-8') as f:
-            json.dump(registrations, f, indent=2, ensure_ascii=False)
+        # The registration and the participant count are flushed together
+        with batch():
+            _commit(REGISTRATIONS_FILE, registrations, changed=[registration])
+            if event_id:
+                update_event_participants(event_id, 1)
         
-        # Update event participant count
-        if event_id:
-            update_event_participants(event_id, 1)
-            
+
         Logger.info(f"Storage: Saved registration for event {event_id}")
         return True
     except Exception as e:
         Logger.error(f"Storage: Error saving registration - {e}")
         return False
 
+def _build_registrations_by_user(registrations):
+    """Registrations grouped by user ID"""
+    return GroupIndex(registrations, field='user_id')
+
 def get_user_registrations(user_id):
     """Get all registrations for a specific user"""
-    registrations = load_registrations()
-    return [reg for reg in registrations if reg.get('user_id') == user_id]
+    index = _get_index(REGISTRATIONS_FILE, 'by_user', "registrations", _build_registrations_by_user)
+    return index.get(user_id)
+
+def get_user_registration_ids(user_id):
+    """Get the IDs of a user's registrations"""
+    index = _get_index(REGISTRATIONS_FILE, 'by_user', "registrations", _build_registrations_by_user)
+    return index.ids(user_id)
 
 def cancel_registration(user_id, event_id):
     """Cancel a user's registration for an event"""
@@ -229,16 +717,18 @@ def cancel_registration(user_id, event_id):
         registrations = load_registrations()
         original_count = len(registrations)
         
+        cancelled = [reg for reg in registrations 
+                     if reg.get('user_id') == user_id and 
+                        reg.get('event_id') == event_id]
         registrations = [reg for reg in registrations 
                         if not (reg.get('user_id') == user_id and 
                                reg.get('event_id') == event_id)]
         
         if len(registrations) < original_count:
-            with open(REGISTRATIONS_FILE, "w", encoding='utf-8') as f:
-                json.dump(registrations, f, indent=2, ensure_ascii=False)
-            
-            # Update event participant count
-            update_event_participants(event_id, -1)
+            # The cancellation and the participant count are flushed together
+            with batch():
+                _commit(REGISTRATIONS_FILE, registrations, removed=cancelled)
+                update_event_participants(event_id, -1)
             Logger.info(f"Storage: Cancelled registration for event {event_id}")
             return True
         
@@ -249,52 +739,45 @@ def cancel_registration(user_id, event_id):
 
 # Search and filter functions
 def search_events(query, category=None):
-    """Search events by title, description, or category"""
-    events = load_events()
+    """Search events by title, description, or location words, optionally in a category.
+    
+    Every word of the query must match, the last one as a prefix.
+    """
     if not query and not category:
-        return events
+        return load_events()
     
-    results = []
-    query_lower = query.lower() if query else ""
+    if query and tokenize(query):
+        index = _get_index(EVENTS_FILE, 'search', "events", _build_search_index)
+        results = index.search(query)
+    else:
+        results = iter_events()
     
-    for event in events:
-        # Category filter
-        if category and event.get('category') != category:
-            continue
-            
-        # Text search in title, description, location
-        if query_lower:
-            searchable_text = f"{event.get('title', '')} {event.get('description', '')} {event.get('location', '')}".lower()
-            if query_lower not in searchable_text:
-                continue
-        
-        results.append(event)
-    
-    return results
+    return [event for event in results if not category or event.get('category') == category]
+
+def _build_search_index(events):
+    """Inverted word index over active events"""
+    return SearchIndex(events, where=lambda event: event.get('is_active', True))
 
 def get_events_by_category(category):
     """Get events filtered by category"""
-    events = load_events()
-    return [event for event in events if event.get('category') == category]
+    return [event for event in iter_events() if event.get('category') == category]
 
 def get_popular_events(limit=10):
     """Get events sorted by participant count"""
-    events = load_events()
-    events.sort(key=lambda x: x.get('current_participants', 0), reverse=True)
-    return events[:limit]
+    return heapq.nlargest(limit, iter_events(), key=lambda x: x.get('current_participants', 0))
 
 # Data management and cleanup functions
 def get_data_stats():
     """Get statistics about stored data"""
     stats = {
-        'users_count': len(load_users()),
-        'events_count': len(load_events()),
-        'registrations_count': len(load_registrations()),
+        'users_count': sum(1 for _ in _iter_records(USERS_FILE, "users")),
+        'events_count': sum(1 for _ in iter_events()),
+        'registrations_count': sum(1 for _ in iter_registrations()),
         'total_files': 0,
         'total_size_mb': 0
     }
     
-    files = [USERS_FILE, EVENTS_FILE, REGISTRATIONS_FILE]
+    files = _data_file_paths()
     for file_path in files:
         if os.path.exists(file_path):
             stats['total_files'] += 1
@@ -311,6 +794,7 @@ def cleanup_old_events(days_old=30):
         
         all_events = load_all_events()
         active_events = []
+        removed_events = []
         removed_count = 0
         
         for event in all_events:
@@ -322,14 +806,14 @@ def cleanup_old_events(days_old=30):
                     event.get('is_active', True)):
                     active_events.append(event)
                 else:
+                    removed_events.append(event)
                     removed_count += 1
             except:
                 # Keep events with invalid dates
                 active_events.append(event)
         
         if removed_count > 0:
-            with open(EVENTS_FILE, "w", encoding='utf-8') as f:
-                json.dump(active_events, f, indent=2, ensure_ascii=False)
+            _commit(EVENTS_FILE, active_events, removed=removed_events)
             Logger.info(f"Storage: Cleaned up {removed_count} old events")
         
         return removed_count
@@ -347,10 +831,12 @@ def backup_data():
         os.makedirs(backup_dir, exist_ok=True)
         
         files_backed_up = 0
-        for file_path in [USERS_FILE, EVENTS_FILE, REGISTRATIONS_FILE]:
+        for file_path in _data_file_paths():
             if os.path.exists(file_path):
-                filename = os.path.basename(file_path)
-                shutil.copy2(file_path, os.path.join(backup_dir, filename))
+                # Keep the layout under data/ so shard directories don't collide
+                backup_path = os.path.join(backup_dir, os.path.relpath(file_path, "data"))
+                os.makedirs(os.path.dirname(backup_path), exist_ok=True)
+                shutil.copy2(file_path, backup_path)
                 files_backed_up += 1
         
         Logger.info(f"Storage: Backed up {files_backed_up} files to {backup_dir}")
@@ -359,13 +845,29 @@ def backup_data():
         Logger.error(f"Storage: Error creating backup - {e}")
         return None
 
+def migrate_to_log_store(overwrite=False):
+    """Convert the JSON array files into append-only logs (one-shot migration)"""
+    ensure_data_dir()
+    migrated = {}
+    with _cache_lock:
+        for file_path in [USERS_FILE, EVENTS_FILE, REGISTRATIONS_FILE]:
+            store = LogStore(_log_path(file_path))
+            if not os.path.exists(file_path) or (store.exists() and not overwrite):
+                continue
+            try:
+                migrated[os.path.basename(file_path)] = store.migrate_from_json(file_path)
+                _stores[file_path] = store
+                _cache.pop(file_path, None)
+            except Exception as e:
+                Logger.error(f"Storage: Error migrating {file_path} - {e}")
+    return migrated
+
 # Legacy compatibility functions (for existing code)
 def save_registrations(registrations):
     """Save all registrations at once (legacy compatibility)"""
     ensure_data_dir()
     try:
-        with open(REGISTRATIONS_FILE, "w", encoding='utf-8') as f:
-            json.dump(registrations, f, indent=2, ensure_ascii=False)
+        _commit(REGISTRATIONS_FILE, registrations)
         Logger.info("Storage: Saved all registrations")
         return True
     except Exception as e:
@@ -376,8 +878,7 @@ def save_events(events):
     """Save all events at once (legacy compatibility)"""
     ensure_data_dir()
     try:
-        with open(EVENTS_FILE, "w", encoding='utf-8') as f:
-            json.dump(events, f, indent=2, ensure_ascii=False)
+        _commit(EVENTS_FILE, events)
         Logger.info("Storage: Saved all events")
         return True
     except Exception as e:
@@ -388,8 +889,7 @@ def save_users(users):
     """Save all users at once (legacy compatibility)"""
     ensure_data_dir()
     try:
-        with open(USERS_FILE, "w", encoding='utf-8') as f:
-            json.dump(users, f, indent=2, ensure_ascii=False)
+        _commit(USERS_FILE, users)
         Logger.info("Storage: Saved all users")
         return True
     except Exception as e:
@@ -442,63 +942,45 @@ def validate_event_data(event_data):
     
     return True, "Valid"
 
+def _build_date_index(events):
+    """Active events ordered by date"""
+    return DateIndex(events, where=lambda event: event.get('is_active', True))
+
 def get_events_by_date_range(start_date, end_date):
     """Get events within a date range"""
-    events = load_events()
-    filtered_events = []
-    
-    for event in events:
-        event_date = event.get('date', '')
-        if start_date <= event_date <= end_date:
-            filtered_events.append(event)
-    
-    return filtered_events
+    index = _get_index(EVENTS_FILE, 'by_date', "events", _build_date_index)
+    return index.range(start_date, end_date)
 
 def get_upcoming_events(days_ahead=30):
-    """Get upcoming events within specified days"""
-    from datetime import datetime, timedelta
-    
-    today = datetime.now().date()
-    end_date = today + timedelta(days=days_ahead)
-    
-    events = load_events()
-    upcoming = []
-    
-    for event in events:
-        try:
-            # Assuming date format is YYYY-MM-DD
-            event_date = datetime.strptime(event.get('date', ''), '%Y-%m-%d').date()
-            if today <= event_date <= end_date:
-                upcoming.append(event)
-        except ValueError:
-            # Skip events with invalid date format
-            continue
-    
-    # Sort by date
-    upcoming.sort(key=lambda x: x.get('date', ''))
-    return upcoming
+    """Get upcoming events within specified days, sorted by date"""
+    today = datetime.now().date().toordinal()
+    # Events with an invalid date format are skipped
+    index = _get_index(EVENTS_FILE, 'by_date', "events", _build_date_index)
+    return index.between(today, today + days_ahead)
+
+def _build_registration_pairs(registrations):
+    """Set of (user_id, event_id) pairs with a registration"""
+    return {(reg.get('user_id'), reg.get('event_id')) for reg in registrations}
+
+def _build_registration_counts(registrations):
+    """Map event ID to number of registrations"""
+    counts = {}
+    for reg in registrations:
+        event_id = reg.get('event_id')
+        counts[event_id] = counts.get(event_id, 0) + 1
+    return counts
 
 def is_user_registered(user_id, event_id):
     """Check if user is already registered for an event"""
-    registrations = load_registrations()
-    
-    for reg in registrations:
-        if (reg.get('user_id') == user_id and 
-            reg.get('event_id') == event_id):
-            return True
-    
-    return False
+    pairs = _get_index(REGISTRATIONS_FILE, 'pairs', "registrations", _build_registration_pairs,
+                       partition_key=event_id)
+    return (user_id, event_id) in pairs
 
 def get_registration_count(event_id):
     """Get number of registrations for an event"""
-    registrations = load_registrations()
-    count = 0
-    
-    for reg in registrations:
-        if reg.get('event_id') == event_id:
-            count += 1
-    
-    return count
+    counts = _get_index(REGISTRATIONS_FILE, 'counts', "registrations", _build_registration_counts,
+                        partition_key=event_id)
+    return counts.get(event_id, 0)
 
 # Privacy and GDPR compliance
 def export_user_data(user_id):
@@ -511,13 +993,11 @@ def export_user_data(user_id):
         }
         
         # Get user's events
-        events = load_events()
-        user_events = [event for event in events if event.get('creator_id') == user_id]
+        user_events = [event for event in iter_events() if event.get('creator_id') == user_id]
         user_data['events_created'] = user_events
         
         # Get user's registrations
-        registrations = load_registrations()
-        user_registrations = [reg for reg in registrations if reg.get('user_id') == user_id]
+        user_registrations = [reg for reg in iter_registrations() if reg.get('user_id') == user_id]
         user_data['registrations'] = user_registrations
         
         return user_data
@@ -525,49 +1005,6 @@ def export_user_data(user_id):
         Logger.error(f"Storage: Error exporting user data - {e}")
         return None
 
-def delete_user_data(user_id):
-    """Delete all data for a specific user (GDPR compliance)"""
-    try:
-        deleted_items = {'users': 0, 'registrations': 0, 'events_deactivated': 0}
-        
-        # Remove user from users file
-        users = load_users()
-        original_user_count = len(users)
-        users = [user for user in users if user.get('id') != user_id]
-        deleted_items['users'] = original_user_count - len(users)
-        
-        if deleted_items['users'] > 0:
-            with open(USERS_FILE, "w", encoding='utf-8') as f:
-                json.dump(users, f, indent=2, ensure_ascii=False)
-        
-        # Remove user registrations
-        registrations = load_registrations()
-        original_reg_count = len(registrations)
-        registrations = [reg for reg in registrations if reg.get('user_id') != user_id]
-        deleted_items['registrations'] = original_reg_count - len(registrations)
-        
-        if deleted_items['registrations'] > 0:
-            with open(REGISTRATIONS_FILE, "w", encoding='utf-8') as f:
-                json.dump(registrations, f, indent=2, ensure_ascii=False)
-        
-        # Deactivate user's created events (don't delete to preserve other users' registrations)
-        events = load_all_events()
-        for event in events:
-            if event.get('creator_id') == user_id:
-                event['is_active'] = False
-                event['creator_name'] = 'Deleted User'
-                deleted_items['events_deactivated'] += 1
-        
-        if deleted_items['events_deactivated'] > 0:
-            with open(EVENTS_FILE, "w", encoding='utf-8') as f:
-                json.dump(events, f, indent=2, ensure_ascii=False)
-        
-        Logger.info(f"Storage: Deleted user data - {deleted_items}")
-        return deleted_items
-    except Exception as e:
-        Logger.error(f"Storage: Error deleting user data - {e}")
-        return None
-
 # New helper functions for app store optimization
 def get_app_data_size() -> Dict[str, int]:
     """Get size of app data for storage management"""
@@ -620,13 +1057,11 @@ def export_user_data(user_id: str) -> Optional[Dict]:
         }
         
         # Get user registrations
-        registrations = load_registrations()
-        user_registrations = [reg for reg in registrations if reg.get('user_id') == user_id]
+        user_registrations = [reg for reg in iter_registrations() if reg.get('user_id') == user_id]
         user_data['registrations'] = user_registrations
         
         # Get user created events
-        events = load_events()
-        user_events = [event for event in events if event.get('creator_id') == user_id]
+        user_events = [event for event in iter_events() if event.get('creator_id') == user_id]
         user_data['events'] = user_events
         
         return user_data
@@ -639,13 +1074,15 @@ def delete_user_data(user_id: str) -> bool:
     try:
         # Remove user registrations
         registrations = load_registrations()
+        removed_registrations = [reg for reg in registrations if reg.get('user_id') == user_id]
         updated_registrations = [reg for reg in registrations if reg.get('user_id') != user_id]
-        save_registrations(updated_registrations)
+        _commit(REGISTRATIONS_FILE, updated_registrations, removed=removed_registrations)
         
         # Remove user from users file
         users = load_users()
+        removed_users = [user for user in users if user.get('id') == user_id]
         updated_users = [user for user in users if user.get('id') != user_id]
-        save_users(updated_users)
+        _commit(USERS_FILE, updated_users, removed=removed_users)
         
         Logger.info(f"Storage: Deleted data for user {user_id}")
         return True
@@ -0,0 +1,110 @@
+# utils/task_runner.py - Worker pool that runs screen I/O off the UI thread
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+
+class Task:
+    """Handle to a call submitted to a TaskRunner"""
+
+    def __init__(self, key: Optional[str] = None):
+        self.key = key
+        self.cancelled = False
+        self.future: Optional[Future] = None
+
+    def cancel(self):
+        """Drop the result; the call is skipped too if it hasn't started yet"""
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+
+class TaskRunner:
+    """Runs blocking calls on a small thread pool and hands the results to the UI thread.
+
+    on_result(result) or on_error(exception) is called through
+    Clock.schedule_once, so it may touch widgets. A task submitted with a
+    key supersedes the unfinished task with the same key: the older one is
+    cancelled and its result dropped, so a slow, stale load never
+    overwrites a newer one. on_done() runs on the UI thread after every
+    task, cancelled or not.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._latest: Dict[str, Task] = {}
+
+    def submit(self, func: Callable, *args, on_result: Optional[Callable] = None,
+               on_error: Optional[Callable] = None, on_done: Optional[Callable] = None,
+               key: Optional[str] = None, **kwargs) -> Task:
+        task = Task(key)
+        previous = None
+        with self._lock:
+            if key is not None:
+                previous = self._latest.get(key)
+                self._latest[key] = task
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="task-runner")
+            task.future = self._executor.submit(func, *args, **kwargs)
+        # Outside the lock: cancelling a queued task runs its _finished callback right away
+        if previous is not None:
+            previous.cancel()
+        task.future.add_done_callback(
+            lambda future: self._finished(task, future, on_result, on_error, on_done))
+        return task
+
+    def cancel(self, key: str):
+        """Cancel the unfinished task submitted with key, if any"""
+        with self._lock:
+            task = self._latest.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def shutdown(self):
+        """Stop the workers, dropping tasks that haven't started"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            tasks, self._latest = list(self._latest.values()), {}
+        for task in tasks:
+            task.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _finished(self, task: Task, future: Future, on_result, on_error, on_done):
+        """Called on the worker thread (or the cancelling one) when a task ends"""
+        with self._lock:
+            if task.key is not None and self._latest.get(task.key) is task:
+                del self._latest[task.key]
+        result, error = None, None
+        if not future.cancelled():
+            error = future.exception()
+            if error is None:
+                result = future.result()
+        Clock.schedule_once(lambda dt: self._deliver(task, result, error, on_result, on_error, on_done))
+
+    def _deliver(self, task: Task, result, error, on_result, on_error, on_done):
+        # Checked here, on the UI thread, so a cancel made after the call finished still counts
+        try:
+            if task.cancelled:
+                pass
+            elif error is not None:
+                if on_error:
+                    on_error(error)
+                else:
+                    Logger.error(f"TaskRunner: Background task failed - {error}")
+            elif on_result:
+                on_result(result)
+        except Exception as e:
+            Logger.error(f"TaskRunner: Error handling task result - {e}")
+        finally:
+            if on_done:
+                on_done()
+
+
+# Shared runner used by the screens
+task_runner = TaskRunner()